@@ -0,0 +1,234 @@
+# 异步批量调用 LLM：复用连接池、限制并发、429/503 退避重试、按提示语哈希缓存回复
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError, AsyncOpenAI
+
+from request_llm import BASE_URL, MODEL, SYSTEM_PROMPT, error_message, resolve_api_key
+
+# 需要退避后重试的状态码：限流与服务器临时故障
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+REPORT_PROMPT = (
+    "以下是一个ETF轮动策略的回测绩效指标（收益率、波动率、回撤等为小数，0.05 表示5%）。"
+    "请用简短的中文点评其收益、风险与回撤，指出可能存在的问题（如过拟合、回撤过大、相对基准的表现），"
+    "不超过200字。\n\n{title}{metrics}"
+)
+
+
+def format_metrics(metrics: dict) -> str:
+    """把 calc_metrics / report_detail 风格的指标 dict 转为逐行的 '指标: 数值' 文本（浮点数保留4位小数）"""
+    lines = []
+    for key, value in metrics.items():
+        try:
+            value = f"{float(value):.4f}"
+        except (TypeError, ValueError):
+            pass
+        lines.append(f"{key}: {value}")
+    return "\n".join(lines)
+
+
+def report_prompt(metrics: dict, title: str = None) -> str:
+    """由绩效指标生成点评提示语，title 为策略/参数说明，如 'MACD(12,26,9)'"""
+    return REPORT_PROMPT.format(title=f"策略: {title}\n" if title else "", metrics=format_metrics(metrics))
+
+
+class ResponseCache:
+    """
+    LLM 回复的磁盘缓存：键为 (模型, 系统提示, 提示语, 温度) 的 sha256，每条回复一个 <键>.json 文件。
+    先写临时文件再原子替换，并发写入同一条也不会读到半个文件。
+    """
+
+    def __init__(self, path="llm_cache"):
+        self.path = path
+
+    @staticmethod
+    def key(model: str, system: str, prompt: str, temperature: float) -> str:
+        text = json.dumps([model, system, prompt, temperature], ensure_ascii=False)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key + ".json")
+
+    def get(self, key: str):
+        try:
+            with open(self._file(key), encoding="utf-8") as f:
+                return json.load(f)["response"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def put(self, key: str, prompt: str, response: str):
+        os.makedirs(self.path, exist_ok=True)
+        path = self._file(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"prompt": prompt, "response": response}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+class LLMClient:
+    """
+    异步 LLM 客户端，适合对成百上千份回测/参数扫描报告批量生成点评。
+
+    - 整个生命周期只创建一个 AsyncOpenAI，所有请求共用其 HTTP 连接池
+    - asyncio.Semaphore 限制同时在途的请求数
+    - 429/5xx 与连接超时按指数退避（带随机抖动）重试，服务器给出 Retry-After 时按其等待
+    - 成功的回复按提示语哈希写入磁盘缓存，相同提示语不再请求
+    - 失败时与 request_llm 一样返回错误信息文本，批量任务中单条失败不影响其他条
+
+    参数：
+    - api_key: API 密钥，默认读取环境变量 DEEPSEEK_API_KEY，两者都没有时抛出 ValueError
+    - base_url: 接口地址，测试时可指向本地桩服务器（见 stub_server.py）
+    - max_concurrency: 最大并发请求数
+    - max_retries: 每条提示语最多重试次数
+    - backoff / max_backoff: 首次退避秒数与单次退避上限
+    - cache_dir: 回复缓存目录，None 表示不缓存
+    """
+
+    def __init__(self, api_key: str = None, base_url: str = BASE_URL, model: str = MODEL,
+                 system_prompt: str = SYSTEM_PROMPT, temperature: float = 1.0, max_concurrency: int = 8,
+                 max_retries: int = 5, backoff: float = 1.0, max_backoff: float = 30.0, timeout: float = 60.0,
+                 cache_dir: str = "llm_cache"):
+        # 重试由本类按状态码处理，SDK 自带的重试关闭
+        self.client = AsyncOpenAI(api_key=resolve_api_key(api_key), base_url=base_url, timeout=timeout,
+                                  max_retries=0)
+        self.model = model
+        self.system_prompt = system_prompt
+        self.temperature = temperature
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.stats = {"requests": 0, "retries": 0, "cache_hits": 0, "errors": 0}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.close()
+
+    def _delay(self, attempt: int, error: Exception) -> float:
+        """第 attempt 次重试前的等待秒数：优先使用 Retry-After，否则指数退避加随机抖动"""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        return delay * (0.5 + random.random() / 2)
+
+    async def _request(self, prompt: str) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    self.stats["requests"] += 1
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": self.system_prompt},
+                            {"role": "user", "content": prompt},
+                        ],
+                        temperature=self.temperature,
+                        stream=False,
+                    )
+                return response.choices[0].message.content
+            except (APIStatusError, APIConnectionError, APITimeoutError) as e:
+                retryable = not isinstance(e, APIStatusError) or e.status_code in RETRY_STATUS
+                if not retryable or attempt == self.max_retries:
+                    raise
+                self.stats["retries"] += 1
+                # 退避期间不占用并发名额
+                await asyncio.sleep(self._delay(attempt, e))
+
+    async def complete(self, prompt: str) -> str:
+        """返回一条提示语的回复：先查缓存，未命中时请求接口并缓存；失败时返回错误信息"""
+        key = None
+        if self.cache is not None:
+            key = ResponseCache.key(self.model, self.system_prompt, prompt, self.temperature)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                return cached
+        try:
+            response = await self._request(prompt)
+        except Exception as e:
+            self.stats["errors"] += 1
+            return error_message(e)
+        if self.cache is not None:
+            self.cache.put(key, prompt, response)
+        return response
+
+    async def complete_many(self, prompts) -> list:
+        """并发请求多条提示语，返回顺序与 prompts 一致"""
+        return await asyncio.gather(*(self.complete(prompt) for prompt in prompts))
+
+    async def comment_reports(self, reports, titles=None) -> list:
+        """
+        对多份绩效指标批量生成点评。
+
+        参数：
+        - reports: 指标 dict 列表（calc_metrics / report_detail 的返回值，或参数扫描结果表的行）
+        - titles: 与 reports 对应的策略/参数说明，可省略
+        """
+        titles = titles if titles is not None else [None] * len(reports)
+        return await self.complete_many([report_prompt(m, t) for m, t in zip(reports, titles)])
+
+
+def comment_reports(reports, titles=None, **kwargs) -> list:
+    """comment_reports 的同步封装：在新的事件循环中批量生成点评，kwargs 传给 LLMClient"""
+    async def run():
+        async with LLMClient(**kwargs) as client:
+            return await client.comment_reports(reports, titles)
+    return asyncio.run(run())
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="对参数扫描结果CSV（param_sweep.py --out）的每一行批量生成LLM点评")
+    parser.add_argument("csv", help="参数扫描结果CSV")
+    parser.add_argument("--params", default="short,long,signal,N", help="作为策略说明的参数列，逗号分隔")
+    parser.add_argument("--top", type=int, default=None, help="只点评前几行")
+    parser.add_argument("--out", default=None, help="带 点评 列的结果CSV保存路径，默认只打印")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--concurrency", type=int, default=8, help="最大并发请求数")
+    parser.add_argument("--cache-dir", default="llm_cache", help="回复缓存目录")
+    return parser
+
+
+def main(argv=None):
+    import pandas as pd
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        resolve_api_key()
+    except ValueError as e:
+        parser.error(str(e))
+    table = pd.read_csv(args.csv)
+    if args.top:
+        table = table.head(args.top)
+    params = [col for col in args.params.split(",") if col in table.columns]
+    # 按列转换，整数参数不会像 iterrows 那样变成浮点数
+    titles = [", ".join(f"{col}={value}" for col, value in row.items()) for row in table[params].to_dict("records")]
+    reports = [{k: v for k, v in row.items() if pd.notna(v)} for row in table.drop(columns=params).to_dict("records")]
+    comments = comment_reports(reports, titles, base_url=args.base_url, model=args.model,
+                               max_concurrency=args.concurrency, cache_dir=args.cache_dir)
+    table["点评"] = comments
+    if args.out:
+        table.to_csv(args.out, index=False)
+    for title, comment in zip(titles, comments):
+        print(f"\n[{title}]\n{comment}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,83 @@
 # 请先安装 OpenAI SDK: `pip3 install openai`
+import os
 
 from openai import OpenAI
 
+# 未显式传入 api_key 时读取的环境变量
+API_KEY_ENV = "DEEPSEEK_API_KEY"
+BASE_URL = "https://api.deepseek.com"
+MODEL = "deepseek-chat"
+SYSTEM_PROMPT = "You are a helpful assistant"
+
+# 错误码及解决方法提示
+ERROR_MAP = {
+    400: "格式错误：请根据错误信息提示修改请求体。",
+    401: "认证失败：请检查您的 API key 是否正确。",
+    402: "余额不足：请确认账户余额，并充值。",
+    422: "参数错误：请根据错误信息提示修改相关参数。",
+    429: "请求速率达到上限：请合理规划您的请求速率。",
+    500: "服务器故障：请等待后重试。",
+    503: "服务器繁忙：请稍后重试您的请求。",
+}
+
+# 按 (api_key, base_url) 复用的客户端，连续调用共用同一个连接池
+_CLIENTS = {}
+
+
+def resolve_api_key(api_key: str = None) -> str:
+    """返回 api_key，未给出时读取环境变量 DEEPSEEK_API_KEY；都没有时抛出 ValueError"""
+    api_key = api_key or os.environ.get(API_KEY_ENV)
+    if not api_key:
+        raise ValueError(f"未提供 API key：请设置环境变量 {API_KEY_ENV} 或传入 api_key")
+    return api_key
+
+
+def error_message(e: Exception) -> str:
+    """把接口异常转换为带解决方法提示的错误信息"""
+    code = getattr(e, "status_code", None)
+    if code in ERROR_MAP:
+        return f"错误码 {code}：{ERROR_MAP[code]}"
+    return f"调用失败，错误信息：{str(e)}"
+
+
+def get_client(api_key: str = None, base_url: str = BASE_URL) -> OpenAI:
+    """返回 (api_key, base_url) 对应的 OpenAI 客户端，首次调用时创建；没有 API key 时抛出 ValueError"""
+    api_key = resolve_api_key(api_key)
+    key = (api_key, base_url)
+    if key not in _CLIENTS:
+        _CLIENTS[key] = OpenAI(api_key=api_key, base_url=base_url)
+    return _CLIENTS[key]
+
 
 def request_llm(prompt: str, api_key: str = None) -> str:
     """
     请求 LLM 接口，获取模型的回复。
 
     :param prompt: 用户输入的提示语
-    :param api_key: OpenAI API 密钥
+    :param api_key: OpenAI API 密钥，默认读取环境变量 DEEPSEEK_API_KEY，两者都没有时抛出 ValueError
     :return: 模型的回复内容或错误信息
     """
-    if api_key is None:
-        api_key = "sk-2c55102070a54aa0acf8c21766719e45"
+    client = get_client(api_key)
     try:
-        client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
         response = client.chat.completions.create(
-            model="deepseek-chat",
+            model=MODEL,
             messages=[
-                {"role": "system", "content": "You are a helpful assistant"},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
             stream=False
         )
         return response.choices[0].message.content
     except Exception as e:
-        # 错误码及解决方法提示
-        error_map = {
-            400: "格式错误：请根据错误信息提示修改请求体。",
-            401: "认证失败：请检查您的 API key 是否正确。",
-            402: "余额不足：请确认账户余额，并充值。",
-            422: "参数错误：请根据错误信息提示修改相关参数。",
-            429: "请求速率达到上限：请合理规划您的请求速率。",
-            500: "服务器故障：请等待后重试。",
-            503: "服务器繁忙：请稍后重试您的请求。",
-        }
-        # 获取错误码
-        code = getattr(e, "status_code", None)
-        if code in error_map:
-            return f"错误码 {code}：{error_map[code]}"
-        return f"调用失败，错误信息：{str(e)}"
+        return error_message(e)
 
 # 示例用法
 if __name__ == "__main__":
+    try:
+        resolve_api_key()
+    except ValueError as e:
+        raise SystemExit(str(e))
+
     prompt = "What's the highest mountain in the world?"
     assistant_msg = request_llm(prompt)
     print(f"Assistant: {assistant_msg}")
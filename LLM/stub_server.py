@@ -0,0 +1,117 @@
+# 本地桩服务器：模拟 OpenAI 兼容的 /chat/completions 接口，用于离线测试 llm_client.py
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def echo_reply(prompt):
+    """桩服务器对 prompt 的回复：'echo: ' 加完整提示语 sha256 的前16位"""
+    return "echo: " + hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class StubServer:
+    """
+    在后台线程运行的 HTTP 桩服务器，对每个 POST .../chat/completions 返回 echo_reply(提示语)，
+    即完整提示语的哈希，不同提示语的回复必然不同。
+
+    - fail_every: 每第 fail_every 个请求返回 fail_status（默认429，带 Retry-After: 0），用于测试退避重试；0 为不失败
+    - delay: 每个请求的处理秒数，用于观察并发
+    - requests / failures / max_in_flight: 收到的请求数、返回错误数、同时在途请求数的最大值
+
+    用法：
+        with StubServer(fail_every=5) as stub:
+            client = LLMClient(base_url=stub.url, api_key="test")
+    """
+
+    def __init__(self, fail_every=0, fail_status=429, delay=0.0, host="127.0.0.1", port=0):
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+        self.delay = delay
+        self.requests = 0
+        self.failures = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                    n = stub.requests
+                    stub._in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub._in_flight)
+                try:
+                    if stub.delay:
+                        time.sleep(stub.delay)
+                    if not self.path.endswith("/chat/completions"):
+                        self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                        return
+                    if stub.fail_every and n % stub.fail_every == 0:
+                        with stub._lock:
+                            stub.failures += 1
+                        self._send(stub.fail_status, {"error": {"message": "stub failure", "code": stub.fail_status}},
+                                   {"Retry-After": "0"})
+                        return
+                    prompt = request["messages"][-1]["content"]
+                    self._send(200, {
+                        "id": f"stub-{n}",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": request.get("model", "stub"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": echo_reply(prompt)},
+                            "finish_reason": "stop",
+                        }],
+                        "usage": {"prompt_tokens": len(prompt), "completion_tokens": 1,
+                                  "total_tokens": len(prompt) + 1},
+                    })
+                finally:
+                    with stub._lock:
+                        stub._in_flight -= 1
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -1,7 +1,72 @@
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+
 import request_llm
-while True:
-    user_input = input("请输入提示语：")
-    if user_input.lower() == "exit":
-        break
-    response = request_llm.request_llm(user_input)
-    print(f"模型回复：{response}")
\ No newline at end of file
+
+
+def interactive():
+    try:
+        request_llm.resolve_api_key()
+    except ValueError as e:
+        raise SystemExit(str(e))
+    while True:
+        user_input = input("请输入提示语：")
+        if user_input.lower() == "exit":
+            break
+        response = request_llm.request_llm(user_input)
+        print(f"模型回复：{response}")
+
+
+async def stub_check(n_reports=200, concurrency=8, fail_every=7, delay=0.02):
+    """
+    用本地桩服务器检查 LLMClient：批量点评全部成功、429 后退避重试、并发不超过上限、
+    第二轮全部命中磁盘缓存而不再请求。
+    """
+    from llm_client import LLMClient, report_prompt
+    from stub_server import StubServer, echo_reply
+
+    reports = [{'总收益率': 0.1 * i, '年化收益率': 0.01 * i, '夏普比率': i / 100, '最大回撤': -0.2} for i in range(n_reports)]
+    titles = [f"MACD(short={i})" for i in range(n_reports)]
+    cache_dir = tempfile.mkdtemp(prefix="llm_cache_")
+    try:
+        with StubServer(fail_every=fail_every, delay=delay) as stub:
+            async with LLMClient(api_key="stub", base_url=stub.url, max_concurrency=concurrency, backoff=0.01,
+                                 cache_dir=cache_dir) as client:
+                start = time.perf_counter()
+                first = await client.comment_reports(reports, titles)
+                elapsed = time.perf_counter() - start
+                served = stub.requests
+                second = await client.comment_reports(reports, titles)
+            print(f"第一轮: {n_reports} 份报告 {elapsed:.2f}s，请求 {stub.requests} 次（其中 {stub.failures} 次返回429），"
+                  f"最大并发 {stub.max_in_flight}，客户端统计 {client.stats}")
+            expected = [echo_reply(report_prompt(m, t)) for m, t in zip(reports, titles)]
+            assert len(set(expected)) == n_reports, "测试提示语有重复"
+            assert first == expected, "存在失败或与提示语不对应的回复"
+            assert stub.failures > 0 and client.stats["retries"] == stub.failures, "429 未被重试"
+            assert stub.max_in_flight <= concurrency, "并发超过上限"
+            assert served == n_reports + stub.failures, "第一轮请求次数不对"
+            assert stub.requests == served, "第二轮仍向服务器发出了请求"
+            assert client.stats["cache_hits"] == n_reports, "第二轮未全部命中缓存"
+            assert second == expected, "缓存的回复与提示语不对应"
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    print("桩服务器检查通过")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="LLM接口测试：默认交互问答，--stub 时用本地桩服务器检查异步批量客户端")
+    parser.add_argument("--stub", action="store_true", help="不联网，用本地桩服务器检查 llm_client.LLMClient")
+    parser.add_argument("--reports", type=int, default=200, help="--stub 时的报告份数")
+    parser.add_argument("--concurrency", type=int, default=8, help="--stub 时的最大并发请求数")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    if args.stub:
+        asyncio.run(stub_check(args.reports, args.concurrency))
+    else:
+        interactive()
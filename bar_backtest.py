@@ -0,0 +1,156 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from quant_part.backtest_core import portfolio_returns, signals_to_positions
+from quant_part.report_detail import (BAR_MINUTES, StreamingMetrics, infer_bar, periods_per_year,
+                                      print_details, print_summary)
+
+# 每块读取的K线根数；1分钟K线每年约52万根，一块约两周
+CHUNKSIZE = 20_000
+
+
+def read_candles(path, chunksize=CHUNKSIZE, time_col='ts', price_col='close'):
+    """
+    分块读取K线CSV（如 rere.fetch_okx_candles 的输出），逐块返回以时间为索引的收盘价 pd.Series。
+    只读取时间与收盘价两列，内存占用与文件长度无关。
+    """
+    reader = pd.read_csv(path, usecols=[time_col, price_col], chunksize=chunksize)
+    for chunk in reader:
+        index = pd.DatetimeIndex(pd.to_datetime(chunk[time_col]), name='date')
+        yield pd.Series(chunk[price_col].to_numpy(dtype=np.float64), index=index, name=price_col)
+
+
+def _ewm_continue(values, prev, span):
+    """在上一块末尾的 EMA 值之后继续计算 ewm(adjust=False)，与整段计算逐位一致"""
+    if np.isnan(prev):
+        return pd.Series(values).ewm(span=span, adjust=False).mean().to_numpy()
+    return pd.Series(np.r_[prev, values]).ewm(span=span, adjust=False).mean().to_numpy()[1:]
+
+
+class MACDBarBacktest:
+    """
+    单品种MACD策略的分块（out-of-core）回测，适用于任意周期的K线（1m/1H/4H/1D）。
+
+    跨块保存 EMA短/EMA长/DEA、上一根K线的 DIFF/DEA 与收盘价，以及当前持仓，
+    因此按块喂入与一次性对整段序列计算的结果相同；绩效指标由 StreamingMetrics 累计，按 bar 年化。
+
+    lag: 收盘信号到计入收益之间的K线数。默认 1，即第 t 根K线的收益属于第 t-1 根收盘后的持仓；
+    lag=0 为 MACDStrategy 的日线口径（当根收盘的持仓计入当根收益），与
+    calculate_macd + run_signal_backtest 对整段序列的结果一致，但在日内K线上会高估收益。
+    """
+
+    def __init__(self, short=12, long=26, signal=9, bar='1D', days_per_year=365, lag=1):
+        if lag not in (0, 1):
+            raise ValueError("lag 只能为 0 或 1")
+        self.short = short
+        self.long = long
+        self.signal = signal
+        self.bar = bar
+        self.lag = lag
+        self.periods_per_year = periods_per_year(bar, days_per_year)
+        self.ema_short = self.ema_long = self.dea = np.nan
+        self.prev_diff = self.prev_dea = self.prev_close = np.nan
+        self.position = False
+        self.metrics = StreamingMetrics(self.periods_per_year)
+
+    def update(self, close):
+        """
+        处理一块收盘价（pd.Series，按时间顺序），返回该块每根K线的结果 pd.DataFrame：
+        收盘价/diff/dea/macd/信号/持仓/涨幅/策略收益率。NaN 价格视为缺失，直接跳过。
+        """
+        close = close.dropna()
+        x = close.to_numpy(dtype=np.float64)
+        if len(x) == 0:
+            return pd.DataFrame(columns=['收盘价', 'diff', 'dea', 'macd', '信号', '持仓', '涨幅', '策略收益率'])
+        ema_short = _ewm_continue(x, self.ema_short, self.short)
+        ema_long = _ewm_continue(x, self.ema_long, self.long)
+        diff = ema_short - ema_long
+        dea = _ewm_continue(diff, self.dea, self.signal)
+        # 上一根K线的 DIFF/DEA，块内第一根取上一块的最后一根（整段的第一根为 NaN，不产生信号）
+        prev_diff = np.r_[self.prev_diff, diff[:-1]]
+        prev_dea = np.r_[self.prev_dea, dea[:-1]]
+        signals = np.where((diff > dea) & (prev_diff <= prev_dea), 1,
+                           np.where((diff < dea) & (prev_diff >= prev_dea), -1, 0))
+        positions = signals_to_positions(signals[:, None], [self.position])[:, 0]
+        changes = x / np.r_[self.prev_close, x[:-1]] - 1
+        changes = np.nan_to_num(changes)
+        held = np.r_[self.position, positions[:-1]] if self.lag else positions
+        strategy_returns = portfolio_returns(held[:, None], changes[:, None], 1.0)
+
+        self.ema_short, self.ema_long, self.dea = ema_short[-1], ema_long[-1], dea[-1]
+        self.prev_diff, self.prev_dea, self.prev_close = diff[-1], dea[-1], x[-1]
+        self.position = bool(positions[-1])
+        result = pd.DataFrame({
+            '收盘价': x, 'diff': diff, 'dea': dea, 'macd': 2 * (diff - dea), '信号': signals,
+            '持仓': positions.astype(np.int8), '涨幅': changes, '策略收益率': strategy_returns,
+        }, index=close.index)
+        self.metrics.update(result['策略收益率'])
+        return result
+
+    def run(self, chunks, out=None):
+        """
+        依次处理 chunks（收盘价 pd.Series 的迭代器，如 read_candles），返回绩效指标 dict。
+        out 给出时把逐根K线的结果追加写入该CSV，内存中只保留当前块。
+        """
+        header = True
+        for close in chunks:
+            result = self.update(close)
+            if out and len(result):
+                result.to_csv(out, mode='w' if header else 'a', header=header, index_label='date')
+                header = False
+        return self.metrics.result()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="K线CSV的分块MACD回测（任意K线周期，内存占用与数据长度无关）")
+    parser.add_argument('path', help="K线CSV路径，需包含时间列与收盘价列（如 rere.py 下载的 BTC_USDT_4H.csv）")
+    parser.add_argument('--bar', choices=list(BAR_MINUTES), default=None,
+                        help="K线周期，默认由文件名（如 _4H.csv）或前几根K线的时间间隔推断")
+    parser.add_argument('--days-per-year', type=float, default=365,
+                        help="每年交易天数，加密货币为365，A股为252")
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE, help="每块读取的K线根数")
+    parser.add_argument('--time-col', default='ts')
+    parser.add_argument('--price-col', default='close')
+    parser.add_argument('--short', type=int, default=12)
+    parser.add_argument('--long', type=int, default=26)
+    parser.add_argument('--signal', type=int, default=9)
+    parser.add_argument('--lag', type=int, choices=[0, 1], default=1,
+                        help="信号滞后K线数：1 为下一根K线起计入收益，0 为 MACDStrategy 的当根计入口径")
+    parser.add_argument('--out', default=None, help="逐根K线结果的输出CSV路径")
+    return parser
+
+
+def guess_bar(path, time_col='ts'):
+    """
+    由文件名后缀（<symbol>_<bar>.csv）推断K线周期，失败时读取前几根K线的时间间隔。
+    小时/日/周后缀不区分大小写（'1d'、'4h' 即 '1D'、'4H'）；分钟只认小写 m，与月线 M 区分。
+    """
+    suffix = os.path.splitext(os.path.basename(path))[0].rsplit('_', 1)[-1]
+    for bar in (suffix, suffix[:-1] + suffix[-1:].upper()):
+        if bar in BAR_MINUTES:
+            return bar
+    head = pd.read_csv(path, usecols=[time_col], nrows=100)
+    return infer_bar(pd.to_datetime(head[time_col]))
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    bar = args.bar or guess_bar(args.path, args.time_col)
+    backtest = MACDBarBacktest(args.short, args.long, args.signal, bar, args.days_per_year, args.lag)
+    print(f"MACD({args.short}, {args.long}, {args.signal}) 分块回测: {args.path}，"
+          f"K线周期 {bar}，年化系数 {backtest.periods_per_year:g}")
+    try:
+        metrics = backtest.run(read_candles(args.path, args.chunksize, args.time_col, args.price_col), args.out)
+    except ValueError as e:
+        # 文件为空或K线不足两根
+        raise SystemExit(f"{args.path}: {e}，无法回测")
+    print_summary(metrics)
+    print_details(metrics)
+    return metrics
+
+
+if __name__ == "__main__":
+    main()
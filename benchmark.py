@@ -0,0 +1,225 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')  # 基准测试不弹出窗口
+logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)  # 无中文字体时的告警刷屏
+import numpy as np
+import pandas as pd
+
+from data_manager import get_etf_data
+from price_store import PriceStore
+from quant_part.plot_nav import plot_nav
+from quant_part.report_detail import report_detail
+from strategies.macd_strategy import MACDStrategy
+from strategies.feature_cache import FeatureCache
+from strategies.momentum_strategy import MomentumStrategy
+
+
+def synthetic_panel(n_symbols, n_days, seed=0, start='2012-01-04', listed_ratio=0.3):
+    """
+    生成可复现的合成ETF收盘价面板（几何布朗运动）。
+
+    与真实CSV一样，部分ETF在区间中途才上市，上市前为 NaN。第一列固定命名为
+    510300，使报告中的基准对比分支也被覆盖。
+
+    参数：
+    - n_symbols / n_days: ETF数与交易日数
+    - seed: 随机种子，相同参数生成完全相同的数据
+    - listed_ratio: 中途上市的ETF比例
+
+    返回：
+    - pd.DataFrame，index为工作日日期（名为 date），列为6位ETF代码
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(start, periods=n_days, name='date')
+    mu = rng.normal(0.0003, 0.0003, n_symbols)
+    sigma = rng.uniform(0.008, 0.025, n_symbols)
+    log_returns = rng.standard_normal((n_days, n_symbols)) * sigma + (mu - sigma ** 2 / 2)
+    prices = rng.uniform(0.5, 5.0, n_symbols) * np.exp(np.cumsum(log_returns, axis=0))
+    late = rng.random(n_symbols) < listed_ratio
+    late[0] = False
+    listing = np.where(late, rng.integers(0, max(n_days // 2, 1), n_symbols), 0)
+    prices[np.arange(n_days)[:, None] < listing[None, :]] = np.nan
+    columns = ['510300'] + [f'{159000 + i:06d}' for i in range(1, n_symbols)]
+    return pd.DataFrame(prices.round(3), index=index, columns=columns)
+
+
+def _stages(store_path, codes, start_date, end_date, macd_params, momentum_n):
+    """
+    按流水线顺序返回 (阶段名, 可调用对象) 列表，后面的阶段依赖前面阶段的结果。
+    每次调用都新建特征缓存，重复运行与内存测量都包含 EMA/动量等特征的计算，不命中上一轮的缓存。
+    """
+    state = {}
+    cache = FeatureCache()
+
+    def load():
+        state['data'] = get_etf_data(codes, codes, start_date, end_date, store_path=store_path, refresh=False)
+
+    def macd():
+        strategy = MACDStrategy(codes, codes, start_date, end_date, *macd_params, cache=cache)
+        strategy.data = state['data'].copy()
+        strategy.run_strategy()
+        state['macd'] = strategy
+
+    def momentum():
+        strategy = MomentumStrategy(codes, codes, start_date, end_date, N=momentum_n, cache=cache)
+        strategy.data = state['data'].copy()
+        strategy.calculate_momentum()
+        state['momentum'] = strategy
+
+    def report():
+        report_detail(state['macd'].data, codes, codes, panel=state['macd'].panel)
+
+    def plot():
+        plot_nav(state['macd'].data, codes, codes, path=os.path.join(store_path, 'nav.png'))
+
+    return [
+        ('get_etf_data', load),
+        ('MACDStrategy.run_strategy', macd),
+        ('MomentumStrategy.calculate_momentum', momentum),
+        ('report_detail', report),
+        ('plot_nav', plot),
+    ]
+
+
+def _run_pipeline(store_path, codes, start_date, end_date, macd_params, momentum_n, memory):
+    results = {}
+    for name, func in _stages(store_path, codes, start_date, end_date, macd_params, momentum_n):
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        seconds = time.perf_counter() - start
+        if memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name] = peak / 2 ** 20
+        else:
+            results[name] = seconds
+    return results
+
+
+def run_benchmarks(symbols, days, macd_grid, momentum_grid, repeat=1, seed=0, memory=True):
+    """
+    对每个 (ETF数, 交易日数, 参数) 组合运行完整流水线，记录各阶段耗时与峰值内存。
+
+    耗时取 repeat 次中的最小值；峰值内存单独再跑一遍（tracemalloc 开启时会拖慢计时）。
+
+    返回：
+    - list[dict]，每项包含 stage/n_symbols/n_days/params/seconds/peak_mb
+    """
+    records = []
+    with warnings.catch_warnings(), tempfile.TemporaryDirectory() as tmp:
+        warnings.simplefilter('ignore')
+        for n_symbols in symbols:
+            for n_days in days:
+                panel = synthetic_panel(n_symbols, n_days, seed=seed)
+                store_path = os.path.join(tmp, f'{n_symbols}_{n_days}')
+                PriceStore(store_path).write(panel)
+                codes = list(panel.columns)
+                start_date, end_date = panel.index[0], panel.index[-1]
+                for macd_params, momentum_n in zip(macd_grid, momentum_grid):
+                    args = (store_path, codes, start_date, end_date, macd_params, momentum_n)
+                    timings = [_run_pipeline(*args, memory=False) for _ in range(repeat)]
+                    peaks = _run_pipeline(*args, memory=True) if memory else {}
+                    for stage in timings[0]:
+                        records.append({
+                            'stage': stage,
+                            'n_symbols': n_symbols,
+                            'n_days': n_days,
+                            'params': {'macd': list(macd_params), 'N': momentum_n},
+                            'seconds': min(t[stage] for t in timings),
+                            'peak_mb': peaks.get(stage),
+                        })
+    return records
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _key(record):
+    return (record['stage'], record['n_symbols'], record['n_days'], json.dumps(record['params'], sort_keys=True))
+
+
+def compare(baseline, current):
+    """按 (阶段, 规模, 参数) 对齐两次结果，返回耗时与内存的比值表（>1 表示变慢/变大）"""
+    base = {_key(r): r for r in baseline['results']}
+    rows = []
+    for r in current['results']:
+        b = base.get(_key(r))
+        if b is None:
+            continue
+        rows.append({
+            'stage': r['stage'], 'n_symbols': r['n_symbols'], 'n_days': r['n_days'],
+            'seconds': r['seconds'], 'baseline_seconds': b['seconds'],
+            'time_ratio': r['seconds'] / b['seconds'] if b['seconds'] else np.nan,
+            'memory_ratio': (r['peak_mb'] / b['peak_mb']) if r['peak_mb'] and b['peak_mb'] else np.nan,
+        })
+    return pd.DataFrame(rows)
+
+
+def _parse_ints(text):
+    return [int(v) for v in text.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="合成数据上的全流程性能基准")
+    parser.add_argument('--symbols', type=_parse_ints, default=[5, 50, 300], help="ETF数，逗号分隔")
+    parser.add_argument('--days', type=_parse_ints, default=[1000, 3000], help="交易日数，逗号分隔")
+    parser.add_argument('--macd', nargs='+', default=['12:26:9'], help="MACD参数 short:long:signal，可给多组")
+    parser.add_argument('--N', type=_parse_ints, default=None, help="动量窗口，与 --macd 逐组对应，默认20")
+    parser.add_argument('--repeat', type=int, default=1, help="计时重复次数，取最小值")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help="不测量峰值内存")
+    parser.add_argument('--out', default='bench_results.json', help="结果JSON路径")
+    parser.add_argument('--compare', default=None, help="与之前保存的结果JSON对比")
+    args = parser.parse_args(argv)
+
+    macd_grid = [tuple(int(v) for v in p.split(':')) for p in args.macd]
+    momentum_grid = args.N or [20] * len(macd_grid)
+    if len(momentum_grid) != len(macd_grid):
+        parser.error("--N 的个数需与 --macd 组数一致")
+
+    results = run_benchmarks(args.symbols, args.days, macd_grid, momentum_grid,
+                             repeat=args.repeat, seed=args.seed, memory=not args.no_memory)
+    report = {
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'seed': args.seed,
+        'results': results,
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    table = pd.DataFrame(results).drop(columns='params')
+    print(table.to_string(index=False))
+    print(f"结果已保存到 {args.out}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print(compare(json.load(f), report).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,101 @@
 import os
+import numpy as np
 import pandas as pd
 from quant_part.etf_data import fetch_etf_data
-from datetime import datetime
-
-def get_etf_data(pool_list, etf_names, start_date, end_date, data_path="etf_data_20120101_today.csv"):
-    if not os.path.exists(data_path):
-        print("本地无数据，正在下载2012年至今的全部数据...")
-        all_data = fetch_etf_data(pool_list, etf_names, "20120101", datetime.now().strftime('%Y%m%d'))
-        all_data.to_csv(data_path)
-    else:
-        all_data = pd.read_csv(data_path, index_col=0, parse_dates=True)
-    # 按回测日期切片
-    return all_data.loc[start_date:end_date] 
\ No newline at end of file
+from price_store import PriceStore, import_csv
+from quant_part.profiling import profiled
+from datetime import datetime, timedelta
+
+HISTORY_START = "20120101"
+
+
+def latest_trading_day(now=None):
+    """
+    最近一个已收盘的工作日（15:00前视为当日尚未收盘）。
+    节假日不在这里处理：update_store 向数据源确认过某天没有新数据后记在价格库中，不再重复下载。
+    """
+    now = now or datetime.now()
+    day = now.date() if now.hour >= 15 else now.date() - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return pd.Timestamp(day)
+
+
+def update_store(store, pool_list, etf_names, now=None):
+    """
+    增量更新价格库：
+    - pool_list 中价格库尚未收录的代码，下载2012年至今的全部历史
+    - 已收录但最后日期早于最近交易日的代码，只下载缺失的尾部
+    - 结果原地并入价格库，下载成功的代码记为已确认到最近交易日；最近交易日是节假日
+      （或代码停牌）时下载不到新数据，确认记录使之后的调用不再联网
+
+    尾部下载从已存的最后一天开始，多取的这一天用来核对前复权价格：若与库中
+    不一致（期间发生过除权除息，历史复权价整体变化），改为重新下载该代码的全部历史；
+    数据源缺少这一天时无法核对，只追加之后的新数据。
+
+    返回：
+    - 本次写入价格库的代码列表
+    """
+    names = dict(zip(pool_list, etf_names))
+    target = latest_trading_day(now)
+    end = target.strftime('%Y%m%d')
+    last_dates = store.last_dates() if store.exists() else {}
+    checked = store.checked_dates() if store.exists() else {}
+
+    new_codes = [code for code in pool_list if code not in last_dates]
+    if new_codes:
+        print(f"本地无 {new_codes} 的数据")
+    stale = {}
+    for code in pool_list:
+        if code in last_dates and max(last_dates[code], checked.get(code, last_dates[code])) < target:
+            stale.setdefault(last_dates[code], []).append(code)
+
+    frames = []
+    fetched = []
+    if stale:
+        stored = store.read(min(stale), symbols=[code for codes in stale.values() for code in codes])
+    for last, codes in stale.items():
+        tail = fetch_etf_data(codes, [names[code] for code in codes], last.strftime('%Y%m%d'), end)
+        if tail is None:
+            continue
+        tail.index = pd.DatetimeIndex(tail.index).normalize()
+        for code in codes:
+            if code not in tail.columns:
+                continue
+            overlap = tail[code].get(last, np.nan)
+            if np.isnan(overlap) or np.isclose(overlap, stored.at[last, code]):
+                # 缺少重叠日（停牌或数据源没有这一天）时无法核对，直接追加之后的新数据
+                new_rows = tail.loc[tail.index > last, [code]].dropna()
+                if len(new_rows):
+                    frames.append(new_rows)
+                fetched.append(code)
+            else:
+                print(f"{code} 复权价格已变化，重新下载全部历史")
+                new_codes.append(code)
+    if new_codes:
+        print(f"正在下载 {new_codes} 2012年至今的全部数据...")
+        history = fetch_etf_data(new_codes, [names[code] for code in new_codes], HISTORY_START, end)
+        if history is not None:
+            frames.append(history)
+            fetched.extend(history.columns)
+
+    if frames:
+        store.merge(pd.concat(frames, axis=1, sort=True))
+    if fetched:
+        store.mark_checked(fetched, target)
+    return [code for frame in frames for code in frame.columns]
+
+
+@profiled('get_etf_data')
+def get_etf_data(pool_list, etf_names, start_date, end_date, data_path="etf_data_20120101_today.csv",
+                 store_path="etf_store", refresh=True):
+    store = PriceStore(store_path)
+    if not store.exists() and os.path.exists(data_path):
+        # CSV 只在首次使用时导入一次，之后直接读取列式价格库
+        store = import_csv(data_path, store_path)
+    if refresh or not store.exists():
+        update_store(store, pool_list, etf_names)
+    if not store.exists():
+        return None
+    # 按回测日期切片，只读取区间内的行
+    return store.read(start_date, end_date)
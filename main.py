@@ -1,46 +1,222 @@
-# 通用基础包
+# 命令行入口：只导入标准库，策略、画图、报告等依赖在对应子命令中按需导入
+import argparse
 import os
-import numpy as np
-import pandas as pd
+import sys
 from datetime import datetime
 
-# 画图与分析
-import matplotlib.pyplot as plt
+from strategies import STRATEGIES, load_strategy, strategy_params
 
+POOL_LIST = ['510300', '510880', '159915', '513100', '518880']
+ETF_NAMES = ['沪深300ETF', '红利ETF', '创业板ETF', '纳指ETF', '黄金ETF']
+# 与 quant_part.result_cache.DEFAULT_PATH 一致（入口处不导入 pandas/numpy）
+DEFAULT_CACHE = 'result_cache'
 
-# sklearn（如动量策略用到）
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score
 
-# 项目内部模块
-from strategies.macd_strategy import MACDStrategy
-from strategies.momentum_strategy import MomentumStrategy
-from quant_part.plot_nav import plot_nav
-from quant_part.report_detail import report_detail
-from data_manager import get_etf_data
+def build_strategy(args):
+    pool_list = args.pool.split(',')
+    etf_names = args.names.split(',') if args.names else (ETF_NAMES if pool_list == POOL_LIST else pool_list)
+    params = {name: getattr(args, name) for name in strategy_params(args.strategy)}
+    strategy_cls = load_strategy(args.strategy)
+    strategy = strategy_cls(pool_list, etf_names, args.start, args.end, **params)
+    if getattr(args, 'periods_per_year', None):
+        strategy.periods_per_year = args.periods_per_year
+    return strategy
 
-if __name__ == "__main__":
-    pool_list = ['510300','510880', '159915', '513100', '518880']
-    etf_names = ['沪深300ETF', '红利ETF','创业板ETF','纳指ETF', '黄金ETF']
-    start_date = '20200101'
-    end_date = datetime.now().strftime('%Y%m%d')
 
-    # 策略选择：macd 或 momentum
-    strategy_type = 'macd'  # 可改为 'momentum'
+def open_results(args):
+    """按命令行参数打开回测结果缓存，--no-cache 时返回 None"""
+    if not args.cache:
+        return None
+    from quant_part.result_cache import ResultCache
+    return ResultCache(args.cache_dir, max_bytes=int(args.cache_size * 2 ** 20))
 
-    if strategy_type == 'macd':
-        strategy = MACDStrategy(pool_list, etf_names, start_date, end_date, short=12, long=26, signal=9)
-        strategy.fetch_data()
-        strategy.run_strategy()
-        strategy.show_results()
-        plot_nav(strategy.data, strategy.name_list, etf_names)
-    elif strategy_type == 'momentum':
-        strategy = MomentumStrategy(pool_list, etf_names, start_date, end_date, N=20)
-        strategy.fetch_data()
+
+def cmd_backtest(args):
+    strategy = build_strategy(args)
+    strategy.fetch_data(refresh=args.refresh)
+    results = open_results(args)
+    # 价格数据、策略版本与参数都没变时直接恢复上次的回测结果与绩效指标
+    cached = results is not None and strategy.load_result(results)
+    if not cached:
         strategy.calculate_momentum()
-        strategy.show_latest_momentum()
+    strategy.show_latest_momentum()
+    if not cached:
         strategy.run_strategy()
+    had_metrics = strategy.metrics is not None
+    if args.report:
         strategy.show_results()
-        plot_nav(strategy.data, strategy.name_list, etf_names)
+    if results is not None and (not cached or (strategy.metrics is not None and not had_metrics)):
+        strategy.save_result(results)
+    if args.trades and strategy.ledger is not None:
+        strategy.ledger.export(args.trades)
+        print(f"成交记录（{len(strategy.ledger)}笔）已保存到 {args.trades}")
+    if args.bootstrap:
+        from quant_part.bootstrap import report_bootstrap
+        report_bootstrap(strategy.data['轮动策略日收益率'], n_paths=args.bootstrap, block=args.block,
+                         method=args.bootstrap_method, seed=0, workers=os.cpu_count(),
+                         periods_per_year=strategy.periods_per_year)
+    if args.plot or args.plot_out:
+        from quant_part.plot_nav import plot_nav
+        plot_nav(strategy.data, strategy.name_list, strategy.etf_names, path=args.plot_out)
+
+
+def cmd_signals(args):
+    strategy = build_strategy(args)
+    strategy.fetch_data(refresh=args.refresh)
+    strategy.calculate_momentum()
+    if hasattr(strategy, 'show_latest_signals'):
+        strategy.run_strategy()
+        strategy.show_latest_signals()
     else:
-        print("未知策略类型") 
\ No newline at end of file
+        strategy.show_latest_momentum()
+
+
+def cmd_sweep(args):
+    import param_sweep
+    param_sweep.main(args.sweep_args)
+
+
+def cmd_walkforward(args):
+    import walk_forward
+    walk_forward.main(args.walk_args)
+
+
+def cmd_portfolio(args):
+    import portfolio
+    portfolio.main(args.portfolio_args)
+
+
+def cmd_candles(args):
+    import bar_backtest
+    bar_backtest.main(args.candle_args)
+
+
+def cmd_fetch(args):
+    from data_manager import update_store
+    from price_store import PriceStore
+    pool_list = args.pool.split(',')
+    etf_names = args.names.split(',') if args.names else pool_list
+    updated = update_store(PriceStore(args.store), pool_list, etf_names)
+    print(f"已更新: {updated}" if updated else "本地数据已是最新")
+
+
+def add_strategy_args(parser):
+    parser.add_argument('--strategy', choices=list(STRATEGIES), default='macd')
+    parser.add_argument('--pool', default=','.join(POOL_LIST), help="ETF代码，逗号分隔")
+    parser.add_argument('--names', default=None, help="ETF名称，逗号分隔，与 --pool 对应")
+    parser.add_argument('--start', default='20200101', help="起始日期 YYYYMMDD")
+    parser.add_argument('--end', default=datetime.now().strftime('%Y%m%d'), help="结束日期 YYYYMMDD")
+    parser.add_argument('--short', type=int, default=12)
+    parser.add_argument('--long', type=int, default=26)
+    parser.add_argument('--signal', type=int, default=9)
+    parser.add_argument('--stop-loss', type=float, default=0.0, help="MACD策略止损比例，如 0.08；0 为不启用")
+    parser.add_argument('--trailing-stop', type=float, default=0.0, help="MACD策略移动止损比例（自持仓后最高价回撤）")
+    parser.add_argument('--cooldown', type=int, default=0, help="MACD策略平仓后不再买入的交易日数")
+    parser.add_argument('--max-hold', type=int, default=0, help="MACD策略最长持仓交易日数")
+    parser.add_argument('--N', type=int, default=20)
+    parser.add_argument('--top-k', type=int, default=1, help="动量策略每日持有的ETF数")
+    parser.add_argument('--rank-by', choices=['涨幅', '得分'], default='涨幅', help="动量策略的排名依据")
+    parser.add_argument('--weighting', choices=['equal', 'score'], default='equal', help="动量策略持仓权重：等权/按分值")
+    parser.add_argument('--offline', dest='refresh', action='store_false', help="不联网更新，直接使用本地数据")
+    parser.add_argument('--profile', default=None, metavar='JSON',
+                        help="记录取数/信号/回测/报告/画图各阶段的耗时与峰值内存，报告写入该JSON文件")
+    parser.add_argument('--cprofile', default=None, metavar='PROF', help="与 --profile 同时使用，另存 cProfile 结果")
+    parser.add_argument('--profile-no-memory', dest='profile_memory', action='store_false',
+                        help="不用 tracemalloc 记录内存（计时更准确）")
+
+
+def add_cache_args(parser):
+    parser.add_argument('--no-cache', dest='cache', action='store_false',
+                        help="不读写回测结果缓存，总是重新计算")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE, help="回测结果缓存目录")
+    parser.add_argument('--cache-size', type=float, default=512, metavar='MB',
+                        help="结果缓存大小上限，超过时删除最久未使用的结果")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="ETF轮动策略命令行")
+    sub = parser.add_subparsers(dest='command')
+
+    backtest = sub.add_parser('backtest', help="回测并输出绩效报告")
+    add_strategy_args(backtest)
+    backtest.add_argument('--no-report', dest='report', action='store_false', help="不输出详细报告")
+    backtest.add_argument('--plot', action='store_true', help="绘制净值曲线")
+    backtest.add_argument('--trades', default=None, metavar='PATH', help="成交记录导出路径（.csv 或 .parquet）")
+    backtest.add_argument('--plot-out', default=None, metavar='PATH',
+                          help="把净值曲线写入图片文件（.png/.svg），不打开窗口")
+    backtest.add_argument('--bootstrap', type=int, default=0, metavar='PATHS',
+                          help="自助法重抽样路径数，给出时输出夏普比率等指标的置信区间")
+    backtest.add_argument('--block', type=int, default=20, help="重抽样（平均）块长，交易日")
+    backtest.add_argument('--bootstrap-method', choices=['stationary', 'block'], default='stationary')
+    backtest.add_argument('--periods-per-year', type=float, default=None, metavar='N',
+                          help="报告与自助法的年化系数（一年的K线根数），默认按日线252")
+    add_cache_args(backtest)
+    backtest.set_defaults(func=cmd_backtest)
+
+    signals = sub.add_parser('signals', help="只计算并显示最新信号（不画图、不出报告）")
+    add_strategy_args(signals)
+    signals.set_defaults(func=cmd_signals)
+
+    sweep = sub.add_parser('sweep', help="参数扫描，其余参数原样传给 param_sweep.py", add_help=False)
+    sweep.add_argument('sweep_args', nargs=argparse.REMAINDER)
+    sweep.set_defaults(func=cmd_sweep)
+
+    walk = sub.add_parser('walkforward', help="walk-forward 优化，其余参数原样传给 walk_forward.py", add_help=False)
+    walk.add_argument('walk_args', nargs=argparse.REMAINDER)
+    walk.set_defaults(func=cmd_walkforward)
+
+    combo = sub.add_parser('portfolio', help="多策略组合，其余参数原样传给 portfolio.py", add_help=False)
+    combo.add_argument('portfolio_args', nargs=argparse.REMAINDER)
+    combo.set_defaults(func=cmd_portfolio)
+
+    candles = sub.add_parser('candles', help="K线CSV的分块MACD回测，其余参数原样传给 bar_backtest.py",
+                             add_help=False)
+    candles.add_argument('candle_args', nargs=argparse.REMAINDER)
+    candles.set_defaults(func=cmd_candles)
+
+    fetch = sub.add_parser('fetch', help="增量更新本地价格库")
+    fetch.add_argument('--pool', default=','.join(POOL_LIST), help="ETF代码，逗号分隔")
+    fetch.add_argument('--names', default=None, help="ETF名称，逗号分隔，与 --pool 对应")
+    fetch.add_argument('--store', default='etf_store', help="价格库目录")
+    fetch.set_defaults(func=cmd_fetch)
+    return parser
+
+
+# 参数原样转交给对应脚本的子命令 -> (处理函数, 参数列表字段名)
+PASSTHROUGH = {
+    'sweep': (cmd_sweep, 'sweep_args'),
+    'walkforward': (cmd_walkforward, 'walk_args'),
+    'portfolio': (cmd_portfolio, 'portfolio_args'),
+    'candles': (cmd_candles, 'candle_args'),
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser()
+    # 不带子命令时等同于 backtest（默认MACD策略）
+    if not argv or argv[0] not in ('backtest', 'signals', 'sweep', 'walkforward', 'portfolio', 'candles', 'fetch', '-h', '--help'):
+        argv = ['backtest'] + list(argv)
+    if argv[0] in PASSTHROUGH:
+        # 这些子命令的参数（含 --help 等以 -- 开头的选项）argparse.REMAINDER 收不到，原样交给对应脚本解析
+        func, dest = PASSTHROUGH[argv[0]]
+        args = argparse.Namespace(func=func, **{dest: list(argv[1:])})
+    else:
+        args = parser.parse_args(argv)
+    if getattr(args, 'cprofile', None) and not args.profile:
+        parser.error("--cprofile 需要与 --profile 一起使用")
+    if getattr(args, 'trades', None) and args.trades.endswith('.parquet'):
+        # 回测前检查，避免跑完整个回测后才因缺少依赖失败
+        from quant_part.ledger import parquet_available
+        if not parquet_available():
+            parser.error("--trades 导出 .parquet 需要安装 pyarrow 或 fastparquet，或改用 .csv 路径")
+    if getattr(args, 'profile', None):
+        from quant_part.profiling import profile_session
+        with profile_session(args.profile, memory=args.profile_memory, cprofile=args.cprofile, command=argv):
+            args.func(args)
+    else:
+        args.func(args)
+
+
+if __name__ == "__main__":
+    main()
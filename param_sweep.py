@@ -0,0 +1,295 @@
+import argparse
+import itertools
+import os
+from datetime import datetime
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from data_manager import get_etf_data
+from quant_part.backtest_core import signals_to_positions, portfolio_returns
+from quant_part.report_detail import calc_metrics
+from quant_part.result_cache import DEFAULT_PATH, ResultCache, data_version, result_key
+from quant_part.rolling_score import rolling_score
+from quant_part.trading_calendar import TradingCalendar
+from strategies.base import cached_feature
+from strategies.macd_strategy import macd_from_emas, cross_signals
+
+BENCHMARK = '510300'
+# _macd_returns / _momentum_returns 逻辑版本号，修改后加1，结果缓存中的旧指标随之失效
+SWEEP_VERSION = 1
+
+# 工作进程内共享的价格面板（由 _init_worker 挂载共享内存后设置）
+_PANEL = None
+_RETURNS = None
+_CALENDAR = None
+_VERSION = None
+_SHM = None
+
+
+def _set_panel(prices):
+    global _PANEL, _RETURNS, _CALENDAR, _VERSION
+    _PANEL = prices
+    # MACD策略的日收益率：pct_change().fillna(0)，与各ETF的有效价格位置一样每个进程只算一次
+    _RETURNS = prices.pct_change().fillna(0)
+    _CALENDAR = TradingCalendar.from_frame(prices)
+    # 面板在进程内不变，特征缓存直接用整个面板的版本，不必每次查缓存时重新计算
+    _VERSION = data_version(prices)
+
+
+def _init_worker(shm_name, shape, index, columns):
+    global _SHM
+    # 只挂载父进程创建的共享内存，价格数据不随任务序列化
+    _SHM = shared_memory.SharedMemory(name=shm_name)
+    values = np.ndarray(shape, dtype=np.float64, buffer=_SHM.buf)
+    _set_panel(pd.DataFrame(values, index=index, columns=columns, copy=False))
+
+
+def _macd_returns(short, long, signal):
+    """与 MACDStrategy.run_strategy 相同的组合日收益率"""
+    prices, calendar = _PANEL, _CALENDAR
+    signals = np.zeros(prices.shape, dtype=np.int8)
+    for j, code in enumerate(prices.columns):
+        if calendar.count[code] < max(long, 2):
+            continue
+        # 在有效价格上计算；同一进程内不同参数组合共享相同周期的EMA
+        valid = calendar.valid(prices, code)
+        macd_df = macd_from_emas(cached_feature(valid, 'ema', short, version=_VERSION),
+                                 cached_feature(valid, 'ema', long, version=_VERSION), signal)
+        signals[calendar.rows(code), j] = cross_signals(macd_df).to_numpy()
+    positions = signals_to_positions(signals)
+    daily = portfolio_returns(positions, _RETURNS.to_numpy(), 1.0 / len(prices.columns))
+    benchmark = _RETURNS[BENCHMARK] if BENCHMARK in prices.columns else None
+    return pd.Series(daily, index=prices.index), benchmark
+
+
+def _momentum_returns(N):
+    """与 MomentumStrategy.calculate_momentum + run_strategy 相同的组合日收益率"""
+    # 与 MomentumStrategy 一样先截到所有ETF都已上市的区间
+    prices = _PANEL.iloc[_CALENDAR.common_span()]
+    scores = rolling_score(prices, N)
+    change = prices / prices.shift(N) - 1.0
+    valid = (scores.notna() & change.notna()).all(axis=1).to_numpy()
+    change = change.to_numpy()[valid]
+    returns = (prices / prices.shift(1) - 1.0).to_numpy()[valid]
+    index = prices.index[valid]
+    if len(index) < 2:
+        return pd.Series(dtype=np.float64), None
+    # 前一日涨幅最大的ETF作为当日持仓
+    held = np.argmax(change, axis=1)[:-1]
+    returns = returns[1:]
+    keep = ~np.isnan(returns).any(axis=1)
+    daily = returns[np.arange(len(held)), held][keep]
+    if not daily.size:
+        return pd.Series(dtype=np.float64), None
+    daily[0] = 0.0
+    index = index[1:][keep]
+    benchmark = None
+    if BENCHMARK in prices.columns:
+        benchmark = pd.Series(returns[keep, prices.columns.get_loc(BENCHMARK)], index=index)
+    return pd.Series(daily, index=index), benchmark
+
+
+def _strategy_returns(task):
+    strategy, params = task
+    if strategy == 'macd':
+        return _macd_returns(params['short'], params['long'], params['signal'])
+    return _momentum_returns(params['N'])
+
+
+def _daily_returns(task):
+    return _strategy_returns(task)[0]
+
+
+def _evaluate(task):
+    daily, benchmark = _strategy_returns(task)
+    row = dict(task[1])
+    row['交易日数'] = len(daily)
+    if len(daily) > 0:
+        row.update(calc_metrics(daily, benchmark_returns=benchmark))
+    return row
+
+
+def expand_grid(strategy, grid):
+    """
+    将参数网格展开为参数组合列表，MACD组合中 short >= long 的无效组合会被剔除。
+
+    参数：
+    - strategy: 'macd' 或 'momentum'
+    - grid: dict，参数名 -> 取值列表，如 {'short': [8, 12], 'long': [26], 'signal': [9]}
+    """
+    keys = ['short', 'long', 'signal'] if strategy == 'macd' else ['N']
+    missing = [key for key in keys if key not in grid]
+    if missing:
+        raise ValueError(f"参数网格缺少: {missing}")
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+    if strategy == 'macd':
+        combos = [p for p in combos if p['short'] < p['long']]
+    return combos
+
+
+def run_sweep(strategy, grid, prices, workers=None, chunksize=None, results=None):
+    """
+    在已加载的价格面板上并行扫描参数网格，返回每组参数的绩效指标表（不打印、不画图）。
+
+    参数：
+    - strategy: 'macd' 或 'momentum'
+    - grid: dict，参数名 -> 取值列表
+    - prices: pd.DataFrame，index为日期，列为ETF收盘价（如 get_etf_data 的返回值）
+    - workers: 进程数，默认CPU核数；为1时在当前进程内顺序执行
+    - chunksize: 每次派发给工作进程的参数组数
+    - results: ResultCache，给出时按 (价格数据, 策略, 参数) 读取已算过的指标，只回测未命中的参数组
+
+    返回：
+    - pd.DataFrame，每行一组参数及其 calc_metrics 指标
+    """
+    if strategy not in ('macd', 'momentum'):
+        raise ValueError(f"未知策略类型: {strategy}")
+    tasks = [(strategy, params) for params in expand_grid(strategy, grid)]
+    if results is None:
+        return pd.DataFrame(_map_tasks(_evaluate, tasks, prices, workers, chunksize))
+    keys = [result_key(prices, f'param_sweep.{strategy}', SWEEP_VERSION, params) for _, params in tasks]
+    rows = [results.get(key) for key in keys]
+    missing = [i for i, row in enumerate(rows) if row is None]
+    if missing:
+        computed = _map_tasks(_evaluate, [tasks[i] for i in missing], prices, workers, chunksize)
+        for i, row in zip(missing, computed):
+            rows[i] = row
+            results.put(keys[i], row)
+    return pd.DataFrame(rows)
+
+
+def sweep_returns(strategy, grid, prices, workers=None, chunksize=None):
+    """
+    与 run_sweep 相同地并行回测参数网格，但返回每组参数在整个区间上的组合日收益率，
+    供 walk-forward 等需要在不同子区间反复评估的场景切片复用。
+
+    返回：
+    - (combos, returns)：combos 为参数字典列表；returns 为 pd.DataFrame，
+      index为日期，第 i 列对应 combos[i]，该组参数尚无收益的日期为 NaN
+    """
+    if strategy not in ('macd', 'momentum'):
+        raise ValueError(f"未知策略类型: {strategy}")
+    combos = expand_grid(strategy, grid)
+    series = _map_tasks(_daily_returns, [(strategy, params) for params in combos], prices, workers, chunksize)
+    returns = pd.DataFrame({i: daily for i, daily in enumerate(series)}, index=prices.index,
+                           columns=range(len(combos)))
+    return combos, returns
+
+
+def _map_tasks(func, tasks, prices, workers=None, chunksize=None):
+    """在共享内存价格面板上对 tasks 逐个执行 func，workers 为1时在当前进程内顺序执行"""
+    prices = prices.astype(np.float64)
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, max(len(tasks), 1))
+
+    if workers == 1:
+        _set_panel(prices)
+        rows = [func(task) for task in tasks]
+    else:
+        values = np.ascontiguousarray(prices.to_numpy())
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        try:
+            np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+            if chunksize is None:
+                chunksize = max(1, len(tasks) // (workers * 8))
+            initargs = (shm.name, values.shape, prices.index, prices.columns)
+            with Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+                rows = list(pool.imap(func, tasks, chunksize=chunksize))
+        finally:
+            shm.close()
+            shm.unlink()
+    return rows
+
+
+def load_prices(pool_list, etf_names, start_date, end_date, refresh=True):
+    """通过 get_etf_data 加载价格面板，只保留 pool_list 中有数据的ETF"""
+    data = get_etf_data(pool_list, etf_names, start_date, end_date, refresh=refresh)
+    if data is None:
+        raise RuntimeError("数据获取失败")
+    return data[[code for code in pool_list if code in data.columns]]
+
+
+def sweep(strategy, grid, pool_list, etf_names, start_date, end_date, workers=None, chunksize=None, refresh=True):
+    """价格面板只加载一次，再调用 run_sweep 扫描参数网格"""
+    prices = load_prices(pool_list, etf_names, start_date, end_date, refresh)
+    return run_sweep(strategy, grid, prices, workers=workers, chunksize=chunksize)
+
+
+def parse_values(text):
+    """解析参数取值：'5:30' / '5:30:5'（含终点的区间）或 '5,10,20'"""
+    if ':' in text:
+        parts = [int(v) for v in text.split(':')]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1
+        return list(range(start, stop + 1, step))
+    return [int(v) for v in text.split(',')]
+
+
+def add_grid_args(parser):
+    """参数扫描与 walk-forward 共用的命令行参数：策略、ETF池、区间、参数网格、进程数"""
+    parser.add_argument('strategy', choices=['macd', 'momentum'])
+    parser.add_argument('--pool', default='510300,510880,159915,513100,518880', help="ETF代码，逗号分隔")
+    parser.add_argument('--start', default='20200101', help="起始日期 YYYYMMDD")
+    parser.add_argument('--end', default=datetime.now().strftime('%Y%m%d'), help="结束日期 YYYYMMDD")
+    parser.add_argument('--short', type=parse_values, default=[12])
+    parser.add_argument('--long', type=parse_values, default=[26])
+    parser.add_argument('--signal', type=parse_values, default=[9])
+    parser.add_argument('--N', type=parse_values, default=[20])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--offline', dest='refresh', action='store_false', help="不联网更新，直接使用本地数据")
+
+
+def grid_from_args(args):
+    if args.strategy == 'macd':
+        return {'short': args.short, 'long': args.long, 'signal': args.signal}
+    return {'N': args.N}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="MACD / 动量策略参数扫描")
+    add_grid_args(parser)
+    parser.add_argument('--sort', default='夏普比率', help="结果排序指标")
+    parser.add_argument('--top', type=int, default=20, help="打印排名前几的参数组")
+    parser.add_argument('--out', default=None, help="结果CSV保存路径")
+    parser.add_argument('--plot-dir', default=None, help="为排名前 --top 的参数组各画一张净值图，保存到该目录")
+    parser.add_argument('--plot-format', choices=['png', 'svg'], default='png')
+    parser.add_argument('--no-cache', dest='cache', action='store_false', help="不读写结果缓存，全部重新回测")
+    parser.add_argument('--cache-dir', default=DEFAULT_PATH, help="结果缓存目录")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    pool_list = args.pool.split(',')
+    prices = load_prices(pool_list, pool_list, args.start, args.end, args.refresh)
+    cache = ResultCache(args.cache_dir) if args.cache else None
+    results = run_sweep(args.strategy, grid_from_args(args), prices, workers=args.workers, results=cache)
+    if args.sort in results.columns:
+        results = results.sort_values(args.sort, ascending=False)
+    if args.out:
+        results.to_csv(args.out, index=False)
+    print(results.head(args.top).to_string(index=False))
+    if args.plot_dir:
+        plot_top(args.strategy, results.head(args.top), prices, args.plot_dir, args.plot_format, args.workers)
+
+
+def plot_top(strategy, results, prices, out_dir, fmt='png', workers=None):
+    """对 results 中的每组参数重新回测（多进程），并行把净值曲线写入 out_dir/<策略>_<参数>.<fmt>"""
+    from quant_part.plot_nav import render_many
+
+    keys = ['short', 'long', 'signal'] if strategy == 'macd' else ['N']
+    combos = [{key: int(row[key]) for key in keys} for _, row in results.iterrows()]
+    series = _map_tasks(_daily_returns, [(strategy, params) for params in combos], prices, workers)
+    navs = {}
+    for params, daily in zip(combos, series):
+        name = strategy + '_' + '_'.join(f'{key}{value}' for key, value in params.items())
+        navs[name] = (1.0 + daily).cumprod().rename('轮动策略')
+    paths = render_many(navs, out_dir, fmt=fmt, workers=workers)
+    print(f"已保存 {len(paths)} 张净值图到 {out_dir}")
+    return paths
+
+
+if __name__ == "__main__":
+    main()
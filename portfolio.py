@@ -0,0 +1,176 @@
+import argparse
+import contextlib
+import io
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_manager import get_etf_data
+from quant_part.report_detail import batch_metrics, calc_metrics, print_details, print_summary
+from strategies import STRATEGIES, load_strategy, strategy_params
+
+BENCHMARK = '510300'
+POOL_LIST = ['510300', '510880', '159915', '513100', '518880']
+
+# 再平衡频率 -> pandas Period 频率；None 为不再平衡（买入后各子策略权重随净值漂移）
+REBALANCE = {'D': 'D', 'W': 'W', 'M': 'M', 'Q': 'Q', 'Y': 'Y'}
+
+
+def parse_sleeve(text):
+    """
+    解析子策略描述 '<策略>[:参数=值,参数=值]'，如 'macd:short=8,long=21' 或 'momentum:N=20,top_k=2'。
+    返回 (策略名, 参数 dict)，数值参数自动转换为 int/float。
+    """
+    name, _, rest = text.partition(':')
+    if name not in STRATEGIES:
+        raise ValueError(f"未知策略类型: {name}")
+    params = {}
+    for item in filter(None, rest.split(',')):
+        key, _, value = item.partition('=')
+        if key not in strategy_params(name):
+            raise ValueError(f"{name} 策略没有参数 {key}，可用参数: {strategy_params(name)}")
+        for cast in (int, float):
+            try:
+                value = cast(value)
+                break
+            except ValueError:
+                continue
+        params[key] = value
+    return name, params
+
+
+def run_sleeves(sleeves, data, pool_list, etf_names, start_date, end_date, verbose=False):
+    """
+    在同一份价格面板上依次运行各子策略，返回各子策略日收益率组成的 pd.DataFrame（列为子策略标签）。
+
+    每个策略只拿到 data 中本策略ETF池的列（pandas 写时复制，策略内部增删列、按日期切片都不会改动 data），
+    收益率、EMA等特征按数据内容缓存，在子策略之间共享，因此 N 个子策略只有一次取数与 N 次信号计算。
+
+    参数：
+    - sleeves: dict 标签 -> (策略名, 参数 dict)
+    - verbose: 是否输出各策略运行过程中的打印
+    """
+    returns = {}
+    for label, (name, params) in sleeves.items():
+        strategy = load_strategy(name)(pool_list, etf_names, start_date, end_date, **params)
+        strategy.set_data(data)
+        with contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO()):
+            strategy.calculate_momentum()
+            strategy.run_strategy()
+        returns[label] = strategy.data['轮动策略日收益率']
+    return pd.DataFrame(returns)
+
+
+def blend_returns(returns, weights, rebalance='M'):
+    """
+    按子策略权重合成组合日收益率。
+
+    - rebalance=None：期初按 weights 分配资金后不再调整，各子策略权重随其净值漂移
+    - rebalance='D'/'W'/'M'/'Q'/'Y'：每个周期的第一个交易日开盘前把权重恢复为 weights
+
+    参数：
+    - returns: pd.DataFrame，index为日期，每列一个子策略的日收益率（NaN 记为0）
+    - weights: 与列对应的权重序列，会归一化为和为1
+
+    返回：
+    - pd.Series，组合日收益率
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if len(weights) != returns.shape[1]:
+        raise ValueError(f"权重个数 {len(weights)} 与子策略个数 {returns.shape[1]} 不一致")
+    weights = weights / weights.sum()
+    r = returns.fillna(0.0).to_numpy(dtype=np.float64)
+    if rebalance == 'D':
+        return pd.Series(r @ weights, index=returns.index, name='组合日收益率')
+    if rebalance is None:
+        keys = np.zeros(len(r), dtype=np.int64)
+    elif rebalance in REBALANCE:
+        keys = pd.DatetimeIndex(returns.index).to_period(REBALANCE[rebalance]).asi8
+    else:
+        raise ValueError(f"未知再平衡频率: {rebalance}")
+    # 每个周期内：各子策略相对期初的累计增长 × 权重 = 组合相对期初的净值，相邻两日之比即组合日收益
+    starts = np.r_[True, keys[1:] != keys[:-1]]
+    group = np.cumsum(starts) - 1
+    growth = pd.DataFrame(1.0 + r).groupby(group).cumprod().to_numpy()
+    nav = growth @ weights
+    prev = np.r_[1.0, nav[:-1]]
+    prev[starts] = 1.0
+    return pd.Series(nav / prev - 1.0, index=returns.index, name='组合日收益率')
+
+
+def run_portfolio(sleeves, weights, pool_list, etf_names, start_date, end_date, rebalance='M', refresh=True,
+                  verbose=False):
+    """
+    多策略组合：只取数一次，在只读的价格面板上运行各子策略，再按权重合成一条组合净值。
+
+    返回：
+    - (returns, combined, data)：returns 为各子策略日收益率（只保留所有子策略都有收益的日期），
+      combined 为组合日收益率，data 为加载的价格面板
+    """
+    data = get_etf_data(pool_list, etf_names, start_date, end_date, refresh=refresh)
+    if data is None:
+        raise RuntimeError("数据获取失败")
+    returns = run_sleeves(sleeves, data, pool_list, etf_names, start_date, end_date, verbose).dropna()
+    if returns.empty:
+        raise ValueError("各子策略没有共同的回测日期")
+    return returns, blend_returns(returns, weights, rebalance), data
+
+
+def report_portfolio(returns, combined, data, periods_per_year=252):
+    """打印各子策略与组合的主要指标、子策略收益相关系数，以及组合的详细报告"""
+    benchmark = None
+    if BENCHMARK in data.columns:
+        benchmark = data[BENCHMARK].pct_change().reindex(combined.index).fillna(0)
+    table = batch_metrics(pd.concat([returns, combined.rename('组合')], axis=1), periods_per_year=periods_per_year)
+    print(f"\n组合回测区间: {combined.index[0]} 到 {combined.index[-1]}，共 {len(combined)} 个交易日")
+    print("\n各子策略与组合指标:")
+    print(table[['总收益率', '年化收益率', '年化波动率', '夏普比率', '最大回撤']].to_string(float_format='{:.4f}'.format))
+    if returns.shape[1] > 1:
+        print("\n子策略日收益率相关系数:")
+        print(returns.corr().to_string(float_format='{:.3f}'.format))
+    print("\n组合绩效统计:")
+    metrics = calc_metrics(combined, benchmark_returns=benchmark, periods_per_year=periods_per_year)
+    print_summary(metrics)
+    print_details(metrics)
+    return metrics
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="多策略组合：一次取数，按权重合成各子策略的收益")
+    parser.add_argument('--sleeve', action='append', required=True,
+                        help="子策略，可重复给出，如 --sleeve macd --sleeve momentum:N=20,top_k=2")
+    parser.add_argument('--weights', default=None, help="子策略权重，逗号分隔，默认等权")
+    parser.add_argument('--rebalance', choices=list(REBALANCE) + ['none'], default='M',
+                        help="再平衡频率：D/W/M/Q/Y，none 为期初分配后不再平衡")
+    parser.add_argument('--pool', default=','.join(POOL_LIST), help="ETF代码，逗号分隔")
+    parser.add_argument('--start', default='20200101', help="起始日期 YYYYMMDD")
+    parser.add_argument('--end', default=datetime.now().strftime('%Y%m%d'), help="结束日期 YYYYMMDD")
+    parser.add_argument('--offline', dest='refresh', action='store_false', help="不联网更新，直接使用本地数据")
+    parser.add_argument('--verbose', action='store_true', help="输出各子策略运行过程中的打印")
+    parser.add_argument('--out', default=None, help="各子策略与组合日收益率、组合净值的CSV保存路径")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    pool_list = args.pool.split(',')
+    # 子策略以描述文本为标签，同一策略可用不同参数出现多次
+    if len(set(args.sleeve)) != len(args.sleeve):
+        parser.error("--sleeve 有重复")
+    sleeves = {text: parse_sleeve(text) for text in args.sleeve}
+    weights = [float(w) for w in args.weights.split(',')] if args.weights else [1.0] * len(sleeves)
+    if len(weights) != len(sleeves):
+        parser.error(f"--weights 给出 {len(weights)} 个权重，但有 {len(sleeves)} 个子策略")
+    rebalance = None if args.rebalance == 'none' else args.rebalance
+    returns, combined, data = run_portfolio(sleeves, weights, pool_list, pool_list, args.start, args.end,
+                                            rebalance=rebalance, refresh=args.refresh, verbose=args.verbose)
+    report_portfolio(returns, combined, data)
+    if args.out:
+        out = returns.assign(组合日收益率=combined, 组合净值=(1.0 + combined).cumprod())
+        out.to_csv(args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+# 日期轴按该块数预留空位，追加新交易日时原地写入，约一年才需要整体重写一次
+DATE_CHUNK = 256
+
+
+class PriceStore:
+    """
+    本地列式价格库：所有ETF共用一个日期索引，收盘价按 ETF × 日期 存成一个
+    float64 矩阵，每只ETF的历史在文件中连续存放。
+
+    目录结构：
+    - dates.npy      datetime64[D]，升序交易日，末尾预留 NaT 空位
+    - prices.npy     形状 (ETF数, 日期容量) 的收盘价，缺失与预留空位为 NaN
+    - meta.json      {"symbols": [...], "n_dates": 有效交易日数, "last_dates": {代码: 'YYYY-MM-DD'},
+                     "checked": {代码: 'YYYY-MM-DD'}}，prices.npy 的行顺序、每只ETF最后一个
+                     有效交易日，以及已向数据源确认过截至哪一天
+
+    读取时以内存映射方式打开，按日期二分定位后只拷贝所需ETF的所需日期区间。
+    增量更新（merge）在预留空位内原地追加新交易日、只改写有变化的ETF行，最后原子替换
+    meta.json 使新的 n_dates 生效；读者在替换前只看到旧的日期范围。
+    """
+
+    def __init__(self, path="etf_store"):
+        self.path = path
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def exists(self):
+        return all(os.path.exists(self._file(name)) for name in ('meta.json', 'dates.npy', 'prices.npy'))
+
+    def _meta(self):
+        with open(self._file('meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_meta(self, meta):
+        tmp = self._file('meta.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, self._file('meta.json'))
+
+    @property
+    def symbols(self):
+        return self._meta()['symbols']
+
+    @property
+    def dates(self):
+        return self._dates(self._meta())
+
+    def _dates(self, meta):
+        dates = np.load(self._file('dates.npy'), mmap_mode='r')
+        # 旧版本价格库没有预留空位，也没有记录 n_dates
+        return dates[:meta.get('n_dates', len(dates))]
+
+    def write(self, data):
+        """
+        用 DataFrame（index为日期，列为ETF代码）整体重写价格库。
+        每个文件先写到临时文件再原子替换，读者不会看到写了一半的文件。
+        """
+        self._write(data, {})
+
+    def _write(self, data, checked):
+        os.makedirs(self.path, exist_ok=True)
+        data = data.sort_index()
+        dates = pd.DatetimeIndex(data.index).values.astype('datetime64[D]')
+        symbols = [str(code) for code in data.columns]
+        values = data.to_numpy(dtype=np.float64).T
+        n_dates = len(dates)
+        capacity = (n_dates // DATE_CHUNK + 1) * DATE_CHUNK
+        padded_dates = np.full(capacity, np.datetime64('NaT'), dtype='datetime64[D]')
+        padded_dates[:n_dates] = dates
+        padded_values = np.full((len(symbols), capacity), np.nan)
+        padded_values[:, :n_dates] = values
+        self._save('dates.npy', padded_dates)
+        self._save('prices.npy', padded_values)
+        self._write_meta({'symbols': symbols, 'n_dates': n_dates,
+                          'last_dates': _last_valid_dates(symbols, dates, values),
+                          'checked': {code: day for code, day in checked.items() if code in symbols}})
+
+    def last_dates(self):
+        """每只ETF最后一个有效收盘价的日期，dict: 代码 -> pd.Timestamp（无有效数据的ETF不在其中）"""
+        meta = self._meta()
+        last_dates = meta.get('last_dates')
+        if last_dates is None:
+            # 旧版本价格库没有记录，直接从价格矩阵推算
+            dates = self._dates(meta)
+            prices = np.load(self._file('prices.npy'), mmap_mode='r')
+            last_dates = _last_valid_dates(meta['symbols'], dates, prices[:, :len(dates)])
+        return {code: pd.Timestamp(day) for code, day in last_dates.items()}
+
+    def checked_dates(self):
+        """每只ETF已向数据源确认过截至哪一天（之后没有新数据，如节假日），dict: 代码 -> pd.Timestamp"""
+        return {code: pd.Timestamp(day) for code, day in self._meta().get('checked', {}).items()}
+
+    def mark_checked(self, codes, day):
+        """记录 codes 已向数据源确认到 day，之后在 day 之前的更新检查可以跳过"""
+        meta = self._meta()
+        checked = meta.setdefault('checked', {})
+        for code in codes:
+            checked[str(code)] = str(pd.Timestamp(day).date())
+        self._write_meta(meta)
+
+    def merge(self, data):
+        """
+        将新数据并入价格库：新日期追加、新ETF新增一行，重叠部分以新数据为准（新数据为 NaN 处保留原值）。
+
+        常见的增量更新（已收录ETF的尾部新交易日、复权价变化后重下的整段历史）在内存映射上
+        原地写入：只改写 data 中各ETF对应的行，新交易日写进预留空位。出现新ETF、日期插在
+        已有日期中间或预留空位用完时，才整体重写。
+
+        参数：
+        - data: pd.DataFrame，index为日期，列为ETF代码
+        """
+        data = data.copy()
+        data.columns = [str(code) for code in data.columns]
+        data.index = pd.DatetimeIndex(data.index).normalize()
+        data = data.sort_index()
+        if not self.exists():
+            self.write(data)
+            return
+        meta = self._meta()
+        symbols = meta['symbols']
+        dates = np.asarray(self._dates(meta))
+        n_dates = len(dates)
+        new_dates = data.index.values.astype('datetime64[D]')
+        known = np.isin(new_dates, dates)
+        appended = new_dates[~known]
+        capacity = np.load(self._file('dates.npy'), mmap_mode='r').shape[0]
+        if (any(code not in symbols for code in data.columns) or n_dates == 0
+                or (len(appended) and appended[0] <= dates[-1]) or n_dates + len(appended) > capacity):
+            old = self.read()
+            columns = list(old.columns) + [code for code in data.columns if code not in old.columns]
+            self._write(data.combine_first(old)[columns], meta.get('checked', {}))
+            return
+
+        n_total = n_dates + len(appended)
+        all_dates = np.concatenate([dates, appended])
+        prices = np.load(self._file('prices.npy'), mmap_mode='r+')
+        # 上次中断的追加可能在空位里留下数据，先清空本次要启用的日期列
+        prices[:, n_dates:n_total] = np.nan
+        position = np.searchsorted(all_dates, new_dates)
+        rows = {code: i for i, code in enumerate(symbols)}
+        values = data.to_numpy(dtype=np.float64)
+        last_dates = meta.get('last_dates') or _last_valid_dates(symbols, dates, prices[:, :n_dates])
+        for j, code in enumerate(data.columns):
+            valid = ~np.isnan(values[:, j])
+            prices[rows[code], position[valid]] = values[valid, j]
+            last_dates.pop(code, None)
+            last_dates.update(_last_valid_dates([code], all_dates, prices[rows[code]:rows[code] + 1, :n_total]))
+        prices.flush()
+        if len(appended):
+            dates_file = np.load(self._file('dates.npy'), mmap_mode='r+')
+            dates_file[n_dates:n_total] = appended
+            dates_file.flush()
+        # 最后替换 meta.json，新的日期范围与各ETF最后日期同时生效
+        meta.update(n_dates=int(n_total), last_dates=last_dates)
+        self._write_meta(meta)
+
+    def _save(self, name, array):
+        tmp = self._file(name + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp, self._file(name))
+
+    def read(self, start_date=None, end_date=None, symbols=None):
+        """
+        读取 [start_date, end_date] 区间（含两端）的收盘价。
+
+        参数：
+        - start_date / end_date: 'YYYYMMDD' 或任意 pd.Timestamp 可解析的日期，None 表示不限
+        - symbols: ETF代码列表，None 表示全部
+
+        返回：
+        - pd.DataFrame，index为日期（名为 date），列为ETF代码
+        """
+        meta = self._meta()
+        dates = self._dates(meta)
+        lo = 0 if not start_date else np.searchsorted(dates, np.datetime64(pd.Timestamp(start_date), 'D'), 'left')
+        hi = len(dates) if not end_date else np.searchsorted(dates, np.datetime64(pd.Timestamp(end_date), 'D'), 'right')
+        stored = meta['symbols']
+        prices = np.load(self._file('prices.npy'), mmap_mode='r')
+        if symbols is None:
+            symbols = stored
+            values = prices[:, lo:hi].T.copy()
+        else:
+            position = {code: i for i, code in enumerate(stored)}
+            symbols = [str(code) for code in symbols if str(code) in position]
+            values = prices[[position[code] for code in symbols], lo:hi].T.copy()
+        index = pd.DatetimeIndex(np.asarray(dates[lo:hi]).astype('datetime64[ns]'), name='date')
+        return pd.DataFrame(values, index=index, columns=symbols)
+
+
+def _last_valid_dates(symbols, dates, values):
+    last_dates = {}
+    for code, row in zip(symbols, values):
+        valid = np.flatnonzero(~np.isnan(row))
+        if len(valid):
+            last_dates[code] = str(dates[valid[-1]])
+    return last_dates
+
+
+def import_csv(csv_path, store_path="etf_store"):
+    """将宽表CSV（首列为日期，其余列为ETF收盘价）一次性导入价格库"""
+    data = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+    data.columns = [str(code) for code in data.columns]
+    store = PriceStore(store_path)
+    store.write(data)
+    return store
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "etf_data_20120101_today.csv"
+    store_path = sys.argv[2] if len(sys.argv) > 2 else "etf_store"
+    store = import_csv(csv_path, store_path)
+    print(f"已导入 {csv_path} -> {store_path}，共 {len(store.symbols)} 只ETF，{len(store.dates)} 个交易日")
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+
+def signals_to_positions(signals, initial=None):
+    """
+    将信号矩阵一次性转换为持仓矩阵：1 开仓，-1 平仓，0 维持前一日状态。
+
+    参数：
+    - signals: 二维数组 (日期 × ETF)，取值为 1/0/-1
+    - initial: 每只ETF的初始持仓(0/1)，默认全部空仓
+
+    返回：
+    - np.ndarray(bool)，形状与 signals 相同，True 表示当日收盘后持仓
+    """
+    signals = np.asarray(signals)
+    n_days, n_codes = signals.shape
+    if initial is None:
+        initial = np.zeros(n_codes, dtype=bool)
+    initial = np.asarray(initial, dtype=bool)
+    # 每个位置最近一次出现非零信号的行号，没有则为 -1
+    rows = np.arange(n_days)[:, None]
+    last = np.maximum.accumulate(np.where(signals != 0, rows, -1), axis=0)
+    cols = np.arange(n_codes)[None, :]
+    latest = signals[np.maximum(last, 0), cols]
+    return np.where(last >= 0, latest == 1, initial[None, :])
+
+
+def portfolio_returns(positions, returns, weight):
+    """
+    按持仓矩阵计算组合日收益率：持仓ETF按 weight 加权收益之和，未持仓记 0。
+
+    参数：
+    - positions: 二维布尔数组 (日期 × ETF)
+    - returns: 二维数组 (日期 × ETF)，各ETF日收益率
+    - weight: 每只ETF的资金权重（标量或长度为ETF数的数组）
+
+    返回：
+    - np.ndarray，长度为日期数
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    return np.where(positions, weight * returns, 0.0).sum(axis=1)
+
+
+def holdings_labels(positions, codes, empty='Cash'):
+    """
+    将持仓矩阵转换为每日持仓标签：持有ETF代码以逗号连接，空仓为 'Cash'。
+    相同的持仓组合只拼接一次字符串。
+
+    参数：
+    - positions: 二维布尔数组 (日期 × ETF)
+    - codes: ETF代码列表，顺序与 positions 的列一致
+    - empty: 空仓时的标签
+
+    返回：
+    - np.ndarray(object)，长度为日期数
+    """
+    positions = np.asarray(positions, dtype=bool)
+    if positions.shape[0] == 0:
+        return np.array([], dtype=object)
+    patterns, inverse = np.unique(positions, axis=0, return_inverse=True)
+    codes = np.asarray(codes, dtype=object)
+    labels = np.array([','.join(codes[row]) if row.any() else empty for row in patterns], dtype=object)
+    return labels[inverse.reshape(-1)]
+
+
+def select_top_k(values, k=1, weighting='equal'):
+    """
+    横截面选股：每行（日期）取 values 最大的 k 列，并给出持仓权重。
+
+    k=1 时用 argmax（并列取第一列，与 idxmax 一致），否则用 argpartition，整体为 O(日期数 × ETF数)。
+    NaN 不参与排名；有效ETF不足 k 只时只持有有效的，全部为 NaN 时空仓。
+
+    参数：
+    - values: 二维数组 (日期 × ETF)，排序依据（如涨幅、得分）
+    - k: 每日持有的ETF数
+    - weighting: 'equal' 等权；'score' 按 values 的正值部分加权（全部非正时退化为等权）
+
+    返回：
+    - (picks, weights)：picks 为 (日期 × k) 的列号，weights 为对应权重，未选中/无效处为 0
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_days, n_codes = values.shape
+    k = max(1, min(k, n_codes))
+    ranked = np.where(np.isnan(values), -np.inf, values)
+    if k == 1:
+        picks = np.argmax(ranked, axis=1)[:, None]
+    elif k == n_codes:
+        picks = np.broadcast_to(np.arange(n_codes), (n_days, n_codes)).copy()
+    else:
+        picks = np.argpartition(-ranked, k - 1, axis=1)[:, :k]
+    picked = np.take_along_axis(values, picks, axis=1)
+    valid = ~np.isnan(picked)
+    if weighting == 'equal':
+        raw = valid.astype(np.float64)
+    elif weighting == 'score':
+        raw = np.where(valid, np.maximum(picked, 0.0), 0.0)
+        # 入选ETF的分值全部非正时无法按分值分配，改为等权
+        raw = np.where(raw.sum(axis=1, keepdims=True) > 0, raw, valid.astype(np.float64))
+    else:
+        raise ValueError(f"未知权重方式: {weighting}")
+    total = raw.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weights = np.where(total > 0, raw / total, 0.0)
+    return picks, weights
+
+
+def gather_returns(returns, picks, weights):
+    """
+    按 select_top_k 的结果取出持仓ETF的收益并加权求和（权重为 0 的位置不读取，NaN 不会扩散）。
+
+    参数：
+    - returns: 二维数组 (日期 × ETF)，各ETF日收益率
+    - picks / weights: (日期 × k)，与 returns 的行对齐
+
+    返回：
+    - np.ndarray，长度为日期数的组合日收益率
+    """
+    picked = np.take_along_axis(np.asarray(returns, dtype=np.float64), picks, axis=1)
+    return np.where(weights != 0, weights * picked, 0.0).sum(axis=1)
+
+
+def weight_matrix(picks, weights, n_codes):
+    """将 (日期 × k) 的选股结果展开为 (日期 × ETF) 的权重矩阵"""
+    matrix = np.zeros((picks.shape[0], n_codes))
+    np.put_along_axis(matrix, picks, weights, axis=1)
+    return matrix
+
+
+def run_signal_backtest(signals, returns, codes, weight, initial=None, prices=None, rules=None):
+    """
+    信号 → 持仓 → 组合收益 的矩阵化回测核心，MACD等多空切换类策略共用。
+
+    参数：
+    - signals: pd.DataFrame (日期 × ETF)，取值为 1/0/-1，列顺序与 codes 一致
+    - returns: pd.DataFrame (日期 × ETF)，各ETF日收益率
+    - codes: ETF代码列表
+    - weight: 每只ETF的资金权重
+    - initial: 每只ETF的初始持仓(0/1)，默认全部空仓
+    - prices / rules: 给出 rules（stop_loss/trailing_stop/cooldown/max_hold，见 kernels.risk_positions）
+      时按收盘价 prices (日期 × ETF) 运行带风控规则的持仓状态机
+
+    返回：
+    - (组合日收益率 pd.Series, 持仓标签 pd.Series, 持仓矩阵 pd.DataFrame)
+    """
+    if rules:
+        from quant_part.kernels import risk_positions
+        positions = risk_positions(signals.to_numpy(), prices.to_numpy(), initial=initial, **rules)
+    else:
+        positions = signals_to_positions(signals.to_numpy(), initial)
+    daily_returns = portfolio_returns(positions, returns.to_numpy(), weight)
+    labels = holdings_labels(positions, codes)
+    index = signals.index
+    return (pd.Series(daily_returns, index=index),
+            pd.Series(labels.tolist(), index=index),
+            pd.DataFrame(positions.astype(np.int8), index=index, columns=list(codes)))
@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+from quant_part.profiling import profiled
+
+# 每个分块的最大元素数（路径数 × 交易日数），约 64MB 的 float64
+_CHUNK_ELEMENTS = 8_000_000
+
+BOOTSTRAP_METRICS = ('年化收益率', '夏普比率', '最大回撤', '95% CVaR')
+
+
+def bootstrap_indices(n_days, n_paths, block=20, method='stationary', rng=None):
+    """
+    批量生成重抽样下标，形状 (n_paths, n_days)，保留收益率在块内的自相关。
+
+    - 'block': 循环块自助法，每块长度固定为 block，块起点均匀随机
+    - 'stationary': 平稳自助法（Politis-Romano），块长服从均值为 block 的几何分布，块起点均匀随机
+    块内下标连续递增，超过末尾时回到开头（循环）。
+    """
+    rng = np.random.default_rng(rng)
+    block = max(1, min(int(block), n_days))
+    # 下标用 int32，减少大批量路径时的内存带宽
+    positions = np.arange(n_days, dtype=np.int32)
+    if method == 'block':
+        n_blocks = -(-n_days // block)
+        starts = rng.integers(0, n_days, (n_paths, n_blocks), dtype=np.int32)
+        idx = (starts[:, :, None] + positions[:block]) % n_days
+        return idx.reshape(n_paths, -1)[:, :n_days]
+    if method != 'stationary':
+        raise ValueError(f"未知重抽样方式: {method}")
+    # 只为每个块抽取块长与起点（约 n_days/block 个），而不是为每个位置抽随机数
+    n_blocks = 2 * (-(-n_days // block)) + 16
+    lengths = rng.geometric(1.0 / block, (n_paths, n_blocks))
+    ends = np.minimum(np.cumsum(lengths, axis=1), n_days).astype(np.int32)
+    # 块数不够覆盖整条路径（概率极低）时，最后一块延长到末尾
+    ends[:, -1] = n_days
+    starts = rng.integers(0, n_days, (n_paths, n_blocks), dtype=np.int32)
+    # 在每个新块开始的位置做标记，累加得到每个位置所属的块号
+    marks = np.zeros((n_paths, n_days), dtype=np.int32)
+    rows, cols = np.nonzero(ends[:, :-1] < n_days)
+    marks[rows, ends[rows, cols]] = 1
+    block_id = np.cumsum(marks, axis=1, out=marks)
+    # 位置 t 在块内的下标为 起点 + (t - 块开始位置)，按块预先算好 起点 - 块开始位置，只需一次 gather
+    block_begin = np.concatenate([np.zeros((n_paths, 1), dtype=np.int32), ends[:, :-1]], axis=1)
+    idx = np.take_along_axis(starts - block_begin, block_id, axis=1)
+    idx += positions
+    idx %= n_days
+    return idx
+
+
+def _path_metrics(r, periods_per_year):
+    """对每条路径 (行) 计算年化收益率、夏普比率、最大回撤与 95% CVaR，口径与 batch_metrics 一致"""
+    n_days = r.shape[1]
+    nav = np.cumprod(1.0 + r, axis=1)
+    annual_return = nav[:, -1] ** (periods_per_year / n_days) - 1
+    # 方差由 Σr 与 Σr² 一次遍历得到（日收益率均值远小于波动，无明显精度损失）
+    total = r.sum(axis=1)
+    sum_sq = np.einsum('ij,ij->i', r, r)
+    variance = np.maximum(sum_sq - total * total / n_days, 0.0) / (n_days - 1)
+    volatility = np.sqrt(variance) * np.sqrt(periods_per_year)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe_ratio = np.where(volatility > 0, annual_return / volatility, 0.0)
+    # 复用 r 的内存存放历史最高净值与回撤比例
+    np.maximum.accumulate(nav, axis=1, out=r)
+    np.divide(nav, r, out=r)
+    max_drawdown = r.min(axis=1) - 1
+    return annual_return, sharpe_ratio, max_drawdown
+
+
+def _chunk_metrics(task):
+    """计算一个分块内所有路径的指标，task = (收益率, 路径数, 块长, 方式, 年化系数, 随机种子)"""
+    r, n_paths, block, method, periods_per_year, seed = task
+    n_days = len(r)
+    paths = r[bootstrap_indices(n_days, n_paths, block, method, np.random.default_rng(seed))]
+    # 95% VaR 取第5百分位（线性插值，同 np.percentile），CVaR 为不高于 VaR 的收益均值
+    tail_rank = 0.05 * (n_days - 1)
+    lo_rank, hi_rank = int(np.floor(tail_rank)), int(np.ceil(tail_rank))
+    ordered = np.partition(paths, (lo_rank, hi_rank), axis=1)
+    var_95 = ordered[:, lo_rank] + (ordered[:, hi_rank] - ordered[:, lo_rank]) * (tail_rank - lo_rank)
+    del ordered
+    tail = paths <= var_95[:, None]
+    cvar_95 = np.sum(paths, axis=1, where=tail) / np.count_nonzero(tail, axis=1)
+    del tail
+    annual_return, sharpe_ratio, max_drawdown = _path_metrics(paths, periods_per_year)
+    return np.column_stack([annual_return, sharpe_ratio, max_drawdown, cvar_95])
+
+
+def bootstrap_metrics(returns, n_paths=10000, block=20, method='stationary', periods_per_year=252,
+                      seed=None, chunk_elements=_CHUNK_ELEMENTS, workers=1):
+    """
+    对日收益率做块/平稳自助重抽样，批量计算每条路径的 年化收益率/夏普比率/最大回撤/95% CVaR。
+
+    路径按块生成与计算，每块不超过 chunk_elements 个元素，内存占用与 n_paths 无关。每块使用
+    由 seed 派生的独立随机种子，因此结果只取决于 seed 与 chunk_elements，与 workers 无关。
+
+    参数：
+    - returns: pd.Series 或一维数组，策略日收益率（如 轮动策略日收益率），NaN 会被去掉
+    - n_paths: 重抽样路径数
+    - block: 块长（stationary 为平均块长）
+    - method: 'stationary' 或 'block'
+    - seed: 随机种子
+    - workers: 进程数，大于1时各分块在进程池中并行计算
+
+    返回：
+    - pd.DataFrame，每行一条路径，列为 BOOTSTRAP_METRICS
+    """
+    r = np.asarray(returns, dtype=np.float64)
+    r = r[~np.isnan(r)]
+    n_days = len(r)
+    if n_days < 2:
+        raise ValueError("收益率序列过短，无法重抽样")
+    per_chunk = max(1, chunk_elements // n_days)
+    sizes = [min(per_chunk, n_paths - lo) for lo in range(0, n_paths, per_chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(r, size, block, method, periods_per_year, child) for size, child in zip(sizes, seeds)]
+    if workers and workers > 1 and len(tasks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_chunk_metrics, tasks))
+    else:
+        chunks = [_chunk_metrics(task) for task in tasks]
+    values = np.concatenate(chunks) if chunks else np.empty((0, len(BOOTSTRAP_METRICS)))
+    return pd.DataFrame(values, columns=list(BOOTSTRAP_METRICS))
+
+
+def bootstrap_ci(returns, n_paths=10000, block=20, method='stationary', confidence=0.95,
+                 periods_per_year=252, seed=None, workers=1):
+    """
+    各指标的自助法置信区间。
+
+    返回：
+    - pd.DataFrame，index为指标名，列为 原始值/中位数/下限/上限（双侧 confidence 区间）
+    """
+    paths = bootstrap_metrics(returns, n_paths, block, method, periods_per_year, seed, workers=workers)
+    r = np.asarray(returns, dtype=np.float64)
+    r = r[~np.isnan(r)]
+    observed = _path_metrics(r[None, :].copy(), periods_per_year)
+    var_95 = np.percentile(r, 5)
+    observed = dict(zip(BOOTSTRAP_METRICS, [v[0] for v in observed] + [r[r <= var_95].mean()]))
+    tail = (1.0 - confidence) / 2
+    lower, median, upper = np.percentile(paths.to_numpy(), [tail * 100, 50, (1 - tail) * 100], axis=0)
+    return pd.DataFrame({'原始值': [observed[name] for name in BOOTSTRAP_METRICS],
+                         '中位数': median, '下限': lower, '上限': upper}, index=list(BOOTSTRAP_METRICS))
+
+
+@profiled('bootstrap')
+def report_bootstrap(returns, n_paths=10000, block=20, method='stationary', confidence=0.95, seed=None,
+                     workers=1, periods_per_year=252):
+    """打印 bootstrap_ci 的结果；periods_per_year 为年化系数，非日线K线用 report_detail.periods_per_year(bar)"""
+    ci = bootstrap_ci(returns, n_paths, block, method, confidence, periods_per_year=periods_per_year, seed=seed,
+                      workers=workers)
+    label = '平稳' if method == 'stationary' else '块'
+    unit = '天' if periods_per_year == 252 else '根K线'
+    print(f"\n稳健性分析（{label}自助法，{n_paths}条路径，平均块长{block}{unit}，{confidence*100:.0f}%置信区间）:")
+    for name, row in ci.iterrows():
+        if name == '夏普比率':
+            print(f"{name}: {row['原始值']:.4f}  [{row['下限']:.4f}, {row['上限']:.4f}]  中位数 {row['中位数']:.4f}")
+        else:
+            print(f"{name}: {row['原始值']*100:.2f}%  [{row['下限']*100:.2f}%, {row['上限']*100:.2f}%]"
+                  f"  中位数 {row['中位数']*100:.2f}%")
+    return ci
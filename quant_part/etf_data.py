@@ -1,7 +1,155 @@
-import akshare as ak
+import threading
+import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 
-def fetch_etf_data(pool_list, etf_names, start_date, end_date):
+# 可重试的 HTTP 状态码：限流与服务器临时故障
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def akshare_source(symbol, period, start_date, end_date, adjust):
+    """默认数据源：akshare 的 ETF 历史行情接口（按需导入 akshare）"""
+    import akshare as ak
+    return ak.fund_etf_hist_em(symbol=symbol, period=period, start_date=start_date, end_date=end_date, adjust=adjust)
+
+
+def is_transient(error):
+    """
+    网络抖动、超时、限流与服务器临时故障视为可重试；其余异常（缺少依赖、字段或参数错误等
+    程序与配置问题）重试也不会成功，应立即抛出。
+    """
+    if isinstance(error, (ConnectionError, TimeoutError, urllib.error.URLError)):
+        return True
+    try:
+        import requests
+    except ImportError:
+        return False
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)):
+        return True
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRY_STATUS
+    return False
+
+
+class RateLimiter:
+    """线程安全的限速器：保证相邻两次请求的发起时间间隔不小于 1/rate 秒"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class ETFFetcher:
+    """
+    并发拉取ETF日线数据：有界线程池 + 全局限速 + 指数退避重试 + 按代码缓存结果。
+
+    参数：
+    - source: 数据源函数，签名同 akshare_source，返回含 '日期'/'收盘' 列的 DataFrame
+    - max_workers: 线程池大小
+    - rate: 每秒最多发起的请求数，<=0 表示不限速
+    - retries: 单个代码遇到网络类错误（见 is_transient）后的最大重试次数，其他异常直接抛出
+    - backoff: 首次重试前的等待秒数，之后每次翻倍
+    """
+
+    def __init__(self, source=akshare_source, max_workers=8, rate=5.0, retries=3, backoff=1.0):
+        self.source = source
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def fetch_symbol(self, symbol, start_date, end_date, adjust="qfq"):
+        """
+        拉取单个ETF的收盘价序列，成功的结果按 (代码, 起止日期, 复权方式) 缓存。
+
+        返回：
+        - (pd.Series 或 None, 提示信息)，Series 的 index 为日期、name 为代码；网络类错误重试用尽时为 None，
+          其他异常不重试、直接抛出
+        """
+        key = (symbol, start_date, end_date, adjust)
+        with self._lock:
+            if key in self._cache:
+                series = self._cache[key]
+                return series, f"记录数：{len(series)}（缓存）"
+        for attempt in range(self.retries + 1):
+            self.limiter.wait()
+            try:
+                temp_df = self.source(symbol=symbol, period="daily", start_date=start_date,
+                                      end_date=end_date, adjust=adjust)
+                break
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                if attempt == self.retries:
+                    return None, f"获取 {symbol} 数据时出错（已重试{self.retries}次）: {e}"
+                time.sleep(self.backoff * 2 ** attempt)
+        # 检查字段
+        if temp_df is None or temp_df.empty:
+            return None, f"{symbol} 数据为空，跳过"
+        if '日期' not in temp_df.columns or '收盘' not in temp_df.columns:
+            return None, f"{symbol} 数据字段不匹配，实际字段: {temp_df.columns.tolist()}"
+
+        temp_df = temp_df[['日期', '收盘']].copy()
+        temp_df['日期'] = pd.to_datetime(temp_df['日期'])
+        temp_df.set_index('日期', inplace=True)
+        # 丢弃收盘价缺失数据
+        series = temp_df['收盘'][temp_df['收盘'].notnull()].rename(symbol)
+        if series.empty:
+            return None, f"{symbol} 处理后无有效数据，跳过"
+        with self._lock:
+            self._cache[key] = series
+        return series, f"记录数：{len(series)}"
+
+    def fetch(self, pool_list, etf_names, start_date, end_date, adjust="qfq"):
+        """并发拉取多个ETF，返回以ETF代码为列的收盘价 DataFrame，全部失败时返回 None"""
+        workers = max(1, min(self.max_workers, len(pool_list)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda symbol: self.fetch_symbol(symbol, start_date, end_date, adjust),
+                                        pool_list))
+        data_dict = {}
+        for i, (symbol, (series, message)) in enumerate(zip(pool_list, results)):
+            if series is None:
+                print(message)
+                continue
+            data_dict[symbol] = series
+            print(f"已获取 {symbol} ({etf_names[i]}) 数据，{message}")
+        if not data_dict:
+            return None
+        data = pd.DataFrame(data_dict)
+        data.sort_index(inplace=True)
+        return data
+
+
+_default_fetcher = None
+
+
+def get_default_fetcher():
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = ETFFetcher()
+    return _default_fetcher
+
+
+def fetch_etf_data(pool_list, etf_names, start_date, end_date, fetcher=None):
     """
     拉取多个ETF的历史日线数据（前复权），返回DataFrame，索引为日期，列为ETF代码的收盘价。
 
@@ -10,50 +158,15 @@ def fetch_etf_data(pool_list, etf_names, start_date, end_date):
     - etf_names: ETF名称列表，与pool_list对应
     - start_date: 起始日期，格式'YYYYMMDD'，如'20120101'
     - end_date: 结束日期，格式'YYYYMMDD'，如'20250723'
+    - fetcher: ETFFetcher 实例，默认使用进程内共享的实例（共享限速与缓存）
 
     返回：
     - pd.DataFrame，index为日期(datetime)，columns为ETF代码，值为复权后收盘价
     """
     print("正在获取ETF历史数据...")
-    data_dict = {}
-
-    for i, symbol in enumerate(pool_list):
-        try:
-            temp_df = ak.fund_etf_hist_em(
-                symbol=symbol,
-                period="daily",
-                start_date=start_date,
-                end_date=end_date,
-                adjust="qfq"  # 前复权
-            )
-            # 检查字段
-            if temp_df.empty:
-                print(f"{symbol} 数据为空，跳过")
-                continue
-            if '日期' not in temp_df.columns or '收盘' not in temp_df.columns:
-                print(f"{symbol} 数据字段不匹配，实际字段: {temp_df.columns.tolist()}")
-                continue
-
-            temp_df = temp_df[['日期', '收盘']].copy()
-            temp_df['日期'] = pd.to_datetime(temp_df['日期'])
-            temp_df.set_index('日期', inplace=True)
-            temp_df.rename(columns={'收盘': symbol}, inplace=True)
-
-            # 丢弃收盘价缺失数据
-            temp_df = temp_df[temp_df[symbol].notnull()]
-            if temp_df.empty:
-                print(f"{symbol} 处理后无有效数据，跳过")
-                continue
-
-            data_dict[symbol] = temp_df[symbol]
-            print(f"已获取 {symbol} ({etf_names[i]}) 数据，记录数：{len(temp_df)}")
-
-        except Exception as e:
-            print(f"获取 {symbol} 数据时出错: {e}")
-
-    if data_dict:
-        data = pd.DataFrame(data_dict)
-        data.sort_index(inplace=True)
+    fetcher = fetcher or get_default_fetcher()
+    data = fetcher.fetch(pool_list, etf_names, start_date, end_date)
+    if data is not None:
         print(f"数据合并完成，共 {len(data)} 条记录")
         print("数据预览（前10行）：")
         print(data.head(10))
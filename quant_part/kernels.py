@@ -0,0 +1,138 @@
+import numpy as np
+
+# Numba 为可选依赖：安装后状态机按 ETF×日期 的标量循环编译执行，否则用按日期循环、跨ETF向量化的 NumPy 版本
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+ENGINES = ('numba', 'numpy', 'python')
+
+
+def _risk_loop(signals, prices, initial, stop_loss, trailing_stop, cooldown, max_hold):
+    """
+    带风控规则的 信号 → 持仓 状态机（标量循环版本，可被 Numba 编译）。
+
+    每只ETF独立处理，第 t 日收盘时：
+    - 持仓中：持仓天数+1，更新最高价；出现死叉(-1)、收盘价跌破 买入价×(1-stop_loss)、
+      跌破 最高价×(1-trailing_stop)、或持仓天数达到 max_hold 时平仓，之后 cooldown 天内不再买入
+    - 空仓：冷却期内只递减冷却天数；否则出现金叉(1)时按当日收盘价买入
+    价格为 NaN 的日期不触发价格类规则；初始持仓的买入价取第一个有效价格。参数为 0 表示不启用该规则。
+    """
+    n_days, n_codes = signals.shape
+    positions = np.zeros((n_days, n_codes), dtype=np.bool_)
+    for j in range(n_codes):
+        held = initial[j]
+        entry = np.nan
+        peak = np.nan
+        days = 0
+        wait = 0
+        for t in range(n_days):
+            p = prices[t, j]
+            s = signals[t, j]
+            if held:
+                days += 1
+                valid = not np.isnan(p)
+                if valid:
+                    if np.isnan(entry):
+                        entry = p
+                        peak = p
+                    if p > peak:
+                        peak = p
+                exit = s == -1
+                if valid and stop_loss > 0 and p <= entry * (1 - stop_loss):
+                    exit = True
+                if valid and trailing_stop > 0 and p <= peak * (1 - trailing_stop):
+                    exit = True
+                if max_hold > 0 and days >= max_hold:
+                    exit = True
+                if exit:
+                    held = False
+                    wait = cooldown
+            elif wait > 0:
+                wait -= 1
+            elif s == 1:
+                held = True
+                entry = p
+                peak = p
+                days = 0
+            positions[t, j] = held
+    return positions
+
+
+def _risk_numpy(signals, prices, initial, stop_loss, trailing_stop, cooldown, max_hold):
+    """与 _risk_loop 相同的状态机：按日期循环，每日对所有ETF做向量化更新"""
+    n_days, n_codes = signals.shape
+    positions = np.zeros((n_days, n_codes), dtype=bool)
+    held = initial.copy()
+    entry = np.full(n_codes, np.nan)
+    peak = np.full(n_codes, np.nan)
+    days = np.zeros(n_codes, dtype=np.int64)
+    wait = np.zeros(n_codes, dtype=np.int64)
+    for t in range(n_days):
+        p = prices[t]
+        s = signals[t]
+        valid = ~np.isnan(p)
+        days += held
+        fill = held & valid & np.isnan(entry)
+        entry = np.where(fill, p, entry)
+        peak = np.where(fill, p, peak)
+        peak = np.where(held & valid & (p > peak), p, peak)
+        exit = held & (s == -1)
+        if stop_loss > 0:
+            exit |= held & valid & (p <= entry * (1 - stop_loss))
+        if trailing_stop > 0:
+            exit |= held & valid & (p <= peak * (1 - trailing_stop))
+        if max_hold > 0:
+            exit |= held & (days >= max_hold)
+        waiting = ~held & (wait > 0)
+        enter = ~held & ~waiting & (s == 1)
+        wait = np.where(waiting, wait - 1, np.where(exit, cooldown, wait))
+        entry = np.where(enter, p, entry)
+        peak = np.where(enter, p, peak)
+        days = np.where(enter, 0, days)
+        held = (held & ~exit) | enter
+        positions[t] = held
+    return positions
+
+
+_risk_compiled = njit(cache=True, nogil=True)(_risk_loop) if HAS_NUMBA else None
+
+
+def risk_positions(signals, prices, stop_loss=0.0, trailing_stop=0.0, cooldown=0, max_hold=0, initial=None,
+                   engine=None):
+    """
+    对整个 (日期 × ETF) 信号/价格矩阵运行带止损、移动止损、再入场冷却与最长持仓的持仓状态机。
+    不启用任何规则时与 signals_to_positions 结果相同。
+
+    参数：
+    - signals: 二维数组 (日期 × ETF)，取值为 1/0/-1
+    - prices: 二维数组 (日期 × ETF)，收盘价，NaN 表示当日无价格
+    - stop_loss / trailing_stop: 止损与移动止损比例，如 0.08 表示下跌8%平仓
+    - cooldown: 平仓后不再买入的交易日数
+    - max_hold: 最长持仓交易日数
+    - initial: 每只ETF的初始持仓(0/1)，默认全部空仓
+    - engine: 'numba'（已安装时默认）、'numpy'（未安装 Numba 时默认）或 'python'（未编译的标量循环），
+      三者结果完全相同
+
+    返回：
+    - np.ndarray(bool)，True 表示当日收盘后持仓
+    """
+    signals = np.ascontiguousarray(signals, dtype=np.int8)
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    if signals.shape != prices.shape:
+        raise ValueError(f"信号矩阵 {signals.shape} 与价格矩阵 {prices.shape} 形状不一致")
+    n_codes = signals.shape[1]
+    initial = np.zeros(n_codes, dtype=bool) if initial is None else np.asarray(initial, dtype=bool)
+    engine = engine or ('numba' if HAS_NUMBA else 'numpy')
+    if engine not in ENGINES:
+        raise ValueError(f"未知计算引擎: {engine}")
+    if engine == 'numba' and not HAS_NUMBA:
+        raise ImportError("未安装 numba，请使用 engine='numpy'")
+    args = (signals, prices, initial, float(stop_loss), float(trailing_stop), int(cooldown), int(max_hold))
+    if engine == 'numba':
+        return _risk_compiled(*args)
+    if engine == 'numpy':
+        return _risk_numpy(*args)
+    return _risk_loop(*args)
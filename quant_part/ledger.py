@@ -0,0 +1,123 @@
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+SIDE_LABELS = ['卖出', '买入']
+
+
+class TradeLedger:
+    """
+    列式成交记录：每笔成交一行，按列存放在 numpy 数组中（日期、ETF序号、方向、价格、成交后权重），
+    ETF代码只在 symbols 中存一份，可以按代码/日期筛选，导出为 CSV 或 Parquet。
+
+    - dates: datetime64 数组，成交日期（按该日收盘价成交）
+    - codes: int32 数组，ETF在 symbols 中的序号
+    - sides: int8 数组，1 买入（加仓），-1 卖出（减仓）
+    - prices: float64 数组，成交价格
+    - weights: float64 数组，成交后该ETF的目标权重（0 表示清仓）
+    """
+
+    def __init__(self, dates, symbols, codes, sides, prices, weights):
+        self.dates = np.asarray(dates, dtype='datetime64[ns]')
+        self.symbols = list(symbols)
+        self.codes = np.asarray(codes, dtype=np.int32)
+        self.sides = np.asarray(sides, dtype=np.int8)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+
+    @classmethod
+    def from_weights(cls, weights, prices, index, symbols, initial=None):
+        """
+        由每日收盘后的目标权重矩阵生成成交记录：权重变化的 (日期, ETF) 即为一笔成交。
+
+        参数：
+        - weights: 二维数组 (日期 × ETF)，第 t 行为第 t 日收盘后的目标权重
+        - prices: 二维数组 (日期 × ETF)，收盘价，作为成交价格
+        - index: 日期索引，与 weights 的行对应
+        - symbols: ETF代码，与 weights 的列对应
+        - initial: 第一日之前的权重，默认全部空仓
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        if initial is None:
+            initial = np.zeros(weights.shape[1])
+        change = np.diff(np.vstack([np.asarray(initial, dtype=np.float64)[None, :], weights]), axis=0)
+        # 按行优先取非零位置，成交记录天然按日期、再按ETF顺序排列
+        rows, cols = np.nonzero(change)
+        return cls(np.asarray(index)[rows], symbols, cols, np.sign(change[rows, cols]),
+                   np.asarray(prices, dtype=np.float64)[rows, cols], weights[rows, cols])
+
+    def __len__(self):
+        return len(self.dates)
+
+    def select(self, symbol=None, start=None, end=None, side=None):
+        """按ETF代码、日期区间（含端点）、方向筛选，返回新的 TradeLedger"""
+        mask = np.ones(len(self), dtype=bool)
+        if symbol is not None:
+            mask &= self.codes == self.symbols.index(symbol)
+        if start is not None:
+            mask &= self.dates >= np.datetime64(pd.Timestamp(start))
+        if end is not None:
+            mask &= self.dates <= np.datetime64(pd.Timestamp(end))
+        if side is not None:
+            mask &= self.sides == side
+        return TradeLedger(self.dates[mask], self.symbols, self.codes[mask], self.sides[mask],
+                           self.prices[mask], self.weights[mask])
+
+    def counts(self):
+        """每只ETF的买入/卖出次数，pd.DataFrame，index为ETF代码"""
+        n = len(self.symbols)
+        buys = np.bincount(self.codes[self.sides > 0], minlength=n)
+        sells = np.bincount(self.codes[self.sides < 0], minlength=n)
+        return pd.DataFrame({'买入次数': buys, '卖出次数': sells}, index=self.symbols)
+
+    def to_frame(self):
+        """转换为 pd.DataFrame：日期/代码/方向/价格/权重，代码与方向为 category 类型"""
+        return pd.DataFrame({
+            '日期': self.dates,
+            '代码': pd.Categorical.from_codes(self.codes, self.symbols),
+            '方向': pd.Categorical.from_codes((self.sides > 0).astype(np.int8), SIDE_LABELS),
+            '价格': self.prices,
+            '权重': self.weights,
+        })
+
+    def export(self, path):
+        """按扩展名导出：.parquet（需要安装 pyarrow 或 fastparquet），其余为 CSV"""
+        frame = self.to_frame()
+        if path.endswith('.parquet'):
+            if not parquet_available():
+                raise ImportError("导出 Parquet 需要安装 pyarrow 或 fastparquet，或改用 .csv 路径")
+            frame.to_parquet(path, index=False)
+        else:
+            frame.to_csv(path, index=False)
+        return path
+
+
+def parquet_available():
+    """是否安装了 pandas 写 Parquet 所需的 pyarrow 或 fastparquet（只查找，不导入）"""
+    return any(importlib.util.find_spec(name) is not None for name in ('pyarrow', 'fastparquet'))
+
+
+def holding_stats(weights, symbols):
+    """
+    由每日持仓权重矩阵 (日期 × ETF) 统计每只ETF的持仓天数、持仓比例、建仓次数与平均每次持仓天数。
+
+    返回：
+    - pd.DataFrame，index为ETF代码
+    """
+    held = np.asarray(weights) > 0
+    n_days = len(held)
+    days = held.sum(axis=0)
+    # 从空仓变为持仓的次数（第一日已持仓也算一次）
+    entries = (held & ~np.vstack([np.zeros((1, held.shape[1]), dtype=bool), held[:-1]])).sum(axis=0)
+    return pd.DataFrame({
+        '持仓天数': days,
+        '持仓比例': days / max(n_days, 1),
+        '建仓次数': entries,
+        '平均持仓天数': days / np.maximum(entries, 1),
+    }, index=list(symbols))
+
+
+def invested_days(weights):
+    """至少持有一只ETF的天数"""
+    return int(np.count_nonzero((np.asarray(weights) > 0).any(axis=1)))
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+_STATE_FIELDS = ('ema_short', 'ema_long', 'dea', 'prev_diff', 'prev_dea', 'count', 'last_date')
+
+
+class MACDStream:
+    """
+    增量MACD指标：按ETF保存 EMA短/EMA长/DEA 以及上一根K线的 DIFF/DEA，
+    每来一根新K线只做 O(1) 更新，并给出金叉(1)/死叉(-1)信号。
+
+    EMA 的递推与 pandas 的 ewm(span=..., adjust=False) 逐步一致：
+    ema = ((1-α)·ema + α·x) / ((1-α) + α)，首个观测值直接作为初值，
+    因此对同一序列逐根喂入，DIFF/DEA/MACD 与 calculate_macd 完全相同。
+    （calculate_macd 在序列短于 long 时不输出任何结果，流式版本不做此截断。）
+    """
+
+    def __init__(self, short=12, long=26, signal=9):
+        self.short = short
+        self.long = long
+        self.signal = signal
+        self.symbols = []
+        self._index = {}
+        self._state = {name: np.empty(0, dtype=np.float64) for name in _STATE_FIELDS[:-2]}
+        self._state['count'] = np.empty(0, dtype=np.int64)
+        self._state['last_date'] = np.empty(0, dtype='datetime64[D]')
+
+    @staticmethod
+    def _alpha(span):
+        alpha = 2.0 / (span + 1.0)
+        return alpha, 1.0 - alpha
+
+    def _positions(self, symbols):
+        new = [code for code in dict.fromkeys(symbols) if code not in self._index]
+        if new:
+            for code in new:
+                self._index[code] = len(self.symbols)
+                self.symbols.append(code)
+            for name, arr in self._state.items():
+                if name == 'count':
+                    fill = np.zeros(len(new), dtype=np.int64)
+                elif name == 'last_date':
+                    fill = np.full(len(new), np.datetime64('NaT'), dtype='datetime64[D]')
+                else:
+                    fill = np.full(len(new), np.nan)
+                self._state[name] = np.concatenate([arr, fill])
+        return np.array([self._index[code] for code in symbols], dtype=np.int64)
+
+    def update_many(self, prices, date=None):
+        """
+        用一根新K线同时更新多只ETF。
+
+        参数：
+        - prices: pd.Series，index为ETF代码，值为收盘价；NaN 的ETF本次不更新
+        - date: 该K线日期；给出时，早于或等于该ETF已处理日期的数据会被忽略（重复喂入是安全的）
+
+        返回：
+        - pd.DataFrame，index为本次更新的ETF代码，列为 diff/dea/macd/信号
+        """
+        prices = prices[prices.notna()]
+        idx = self._positions(list(prices.index))
+        x = prices.to_numpy(dtype=np.float64)
+        st = self._state
+        if date is not None:
+            day = np.datetime64(pd.Timestamp(date), 'D')
+            fresh = np.isnat(st['last_date'][idx]) | (st['last_date'][idx] < day)
+            idx, x, prices = idx[fresh], x[fresh], prices[fresh]
+            st['last_date'][idx] = day
+        first = st['count'][idx] == 0
+
+        a_s, w_s = self._alpha(self.short)
+        a_l, w_l = self._alpha(self.long)
+        a_d, w_d = self._alpha(self.signal)
+        ema_short = np.where(first, x, (w_s * st['ema_short'][idx] + a_s * x) / (w_s + a_s))
+        ema_long = np.where(first, x, (w_l * st['ema_long'][idx] + a_l * x) / (w_l + a_l))
+        diff = ema_short - ema_long
+        dea = np.where(first, diff, (w_d * st['dea'][idx] + a_d * diff) / (w_d + a_d))
+
+        prev_diff, prev_dea = st['prev_diff'][idx], st['prev_dea'][idx]
+        golden = ~first & (diff > dea) & (prev_diff <= prev_dea)
+        death = ~first & (diff < dea) & (prev_diff >= prev_dea)
+        signals = np.where(golden, 1, np.where(death, -1, 0))
+
+        st['ema_short'][idx] = ema_short
+        st['ema_long'][idx] = ema_long
+        st['dea'][idx] = dea
+        st['prev_diff'][idx] = diff
+        st['prev_dea'][idx] = dea
+        st['count'][idx] += 1
+        return pd.DataFrame({'diff': diff, 'dea': dea, 'macd': 2 * (diff - dea), '信号': signals},
+                            index=prices.index)
+
+    def update(self, symbol, price, date=None):
+        """更新单只ETF，返回 dict(diff, dea, macd, 信号)；数据被忽略时返回 None"""
+        out = self.update_many(pd.Series([price], index=[symbol], dtype=np.float64), date)
+        if out.empty:
+            return None
+        row = out.iloc[0]
+        return {'diff': row['diff'], 'dea': row['dea'], 'macd': row['macd'], '信号': int(row['信号'])}
+
+    def feed(self, symbol, price_series):
+        """
+        逐根喂入一段历史（如冷启动），返回与 calculate_macd 相同的 diff/dea/macd 及信号列。
+        """
+        series = price_series.dropna()
+        use_dates = isinstance(series.index, pd.DatetimeIndex)
+        rows = {}
+        for date, price in series.items():
+            row = self.update(symbol, price, date if use_dates else None)
+            if row is not None:
+                rows[date] = row
+        return pd.DataFrame.from_dict(rows, orient='index', columns=['diff', 'dea', 'macd', '信号'])
+
+    def save(self, path):
+        """将参数与每只ETF的状态保存为 .npz 文件"""
+        np.savez(path, params=np.array([self.short, self.long, self.signal]),
+                 symbols=np.array(self.symbols, dtype=str), **self._state)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            short, long, signal = (int(v) for v in f['params'])
+            stream = cls(short, long, signal)
+            stream.symbols = [str(code) for code in f['symbols']]
+            stream._index = {code: i for i, code in enumerate(stream.symbols)}
+            stream._state = {name: f[name].copy() for name in _STATE_FIELDS}
+        return stream
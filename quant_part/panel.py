@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+
+class Panel:
+    """
+    紧凑的 ETF × 字段 × 日期 三维数组面板，替代 信号_/diff_/涨幅_ 等按字符串命名、
+    随ETF数不断加宽的 DataFrame 列。
+
+    - values: np.ndarray，形状 (ETF数, 字段数, 日期数)，C顺序，每只ETF每个字段的时间序列连续存放
+    - dtype: float64（默认，与原宽表结果逐位一致）或 float32（内存减半，适合几千只ETF的大池子）
+    - aliases: 别名 -> 字段名，内容相同的字段（如MACD策略的 涨幅 与 日收益率）只存一份
+    - 按名称取视图：panel['涨幅'] 为 (ETF × 日期) 二维视图，panel['涨幅', '510300'] 为一维视图，
+      均不复制数据；frame()/series() 包装为 pandas 对象，to_frame() 导出原来的宽表
+    """
+
+    def __init__(self, symbols, fields, index, dtype=np.float64, values=None, aliases=None):
+        self.symbols = list(symbols)
+        self.fields = list(fields)
+        self.index = index
+        self.aliases = dict(aliases or {})
+        self._symbol_pos = {code: i for i, code in enumerate(self.symbols)}
+        self._field_pos = {name: i for i, name in enumerate(self.fields)}
+        for alias, field in self.aliases.items():
+            self._field_pos[alias] = self._field_pos[field]
+        shape = (len(self.symbols), len(self.fields), len(index))
+        if values is None:
+            values = np.full(shape, np.nan, dtype=dtype)
+        elif values.shape != shape:
+            raise ValueError(f"values 形状 {values.shape} 与面板 {shape} 不一致")
+        self.values = values
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def _key(self, key):
+        if isinstance(key, tuple):
+            field, code = key
+            return self._symbol_pos[code], self._field_pos[field]
+        return slice(None), self._field_pos[key]
+
+    def __getitem__(self, key):
+        return self.values[self._key(key)]
+
+    def __setitem__(self, key, value):
+        if isinstance(value, (pd.Series, pd.DataFrame)):
+            # 按日期对齐；DataFrame 的列按 self.symbols 顺序取
+            value = value.reindex(self.index)
+            if isinstance(value, pd.DataFrame):
+                value = value.reindex(columns=self.symbols).to_numpy().T
+            else:
+                value = value.to_numpy()
+        self.values[self._key(key)] = value
+
+    def __contains__(self, field):
+        return field in self._field_pos
+
+    def series(self, field, code):
+        """单只ETF单个字段的 pd.Series（共享内存，不复制）"""
+        return pd.Series(self[field, code], index=self.index, name=code, copy=False)
+
+    def frame(self, field, symbols=None):
+        """单个字段的 (日期 × ETF) pd.DataFrame，列名为ETF代码"""
+        symbols = self.symbols if symbols is None else list(symbols)
+        values = self[field]
+        if symbols != self.symbols:
+            values = values[[self._symbol_pos[code] for code in symbols]]
+        return pd.DataFrame(values.T, index=self.index, columns=symbols, copy=False)
+
+    def take(self, rows):
+        """
+        按日期取子面板。rows 为布尔掩码或整数位置；选中的日期连续时返回视图，否则复制。
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        if len(rows) and rows[-1] - rows[0] + 1 == len(rows) and (np.diff(rows) == 1).all():
+            selector = slice(rows[0], rows[-1] + 1)
+        elif len(rows):
+            selector = rows
+        else:
+            selector = slice(0, 0)
+        return Panel(self.symbols, self.fields, self.index[selector], values=self.values[:, :, selector],
+                     aliases=self.aliases)
+
+    def to_frame(self, fields=None, symbols=None):
+        """导出为原来的宽表：列名为 '<字段>_<ETF代码>'，按字段分组（含别名）"""
+        fields = list(self._field_pos) if fields is None else list(fields)
+        symbols = self.symbols if symbols is None else list(symbols)
+        columns = {}
+        for field in fields:
+            for code in symbols:
+                columns[f'{field}_{code}'] = self[field, code]
+        return pd.DataFrame(columns, index=self.index)
@@ -1,24 +1,197 @@
-import matplotlib.pyplot as plt
+import os
+from concurrent.futures import ProcessPoolExecutor
 
-def plot_nav(data, name_list, etf_names):
-    plt.rcParams['font.sans-serif'] = ['SimHei']
-    plt.rcParams['axes.unicode_minus'] = False
-    fig, ax = plt.subplots(figsize=(15, 6))
+import numpy as np
+import pandas as pd
+
+try:
+    from quant_part.profiling import profiled
+    from quant_part.trading_calendar import TradingCalendar
+except ImportError:  # quant_test.py 等脚本在 quant_part 目录内以顶层模块导入本文件
+    from profiling import profiled
+    from trading_calendar import TradingCalendar
+
+# 中文字体与负号显示；只在绘图期间生效（rc_context），不改动调用方的全局设置
+_STYLE = {'font.sans-serif': ['SimHei'], 'axes.unicode_minus': False}
+
+
+# 点数不超过 输出点数 × 该倍数 时不降采样：桶太窄时降采样本身比直接画出所有点还慢
+MIN_RATIO = 4
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets 降采样：保留首尾两点，其余点均分为 n_out-2 个桶，
+    每个桶取与「上一个选中点、下一个桶均值点」组成三角形面积最大的点，保留曲线的峰谷形状。
+
+    各桶的点一次性排成 (桶数 × 最大桶宽) 的二维数组（不足的用桶内最后一点补齐，不影响取最大值），
+    桶均值由 np.add.reduceat 一次算出；逐桶的循环只剩一行向量运算与 argmax。
+
+    参数：
+    - x / y: 一维数组（x 单调递增，不含 NaN）
+    - n_out: 输出点数，不小于3；不少于原始点数时原样返回
+
+    返回：
+    - 选中点的下标 np.ndarray(int)，递增
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # 第 i 个桶为 [edges[i], edges[i+1])，最后一个桶之后是末点
+    edges = np.r_[np.linspace(1, n - 1, n_out - 1).astype(np.int64), n]
+    starts, stops = edges[:-1], edges[1:]
+    # 各桶均值；第 i 个桶用到的是第 i+1 个桶（最后一个桶的下一个"桶"为末点）的均值
+    avg_x = np.add.reduceat(x, starts) / (stops - starts)
+    avg_y = np.add.reduceat(y, starts) / (stops - starts)
+    lo, hi = starts[:-1], stops[:-1]
+    width = int((hi - lo).max())
+    rows = np.minimum(lo[:, None] + np.arange(width), hi[:, None] - 1)
+    xb, yb = x[rows], y[rows]
+    picks = np.empty(n_out, dtype=np.int64)
+    picks[0], picks[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        xa, ya = x[a], y[a]
+        ax, ay = avg_x[i + 1], avg_y[i + 1]
+        # |(xa-ax)(y-ya) - (xa-x)(ay-ya)| 展开为 y、x 的一次式
+        area = np.abs(yb[i] * (xa - ax) + xb[i] * (ay - ya) + (ax * ya - xa * ay))
+        a = rows[i, int(np.argmax(area))]
+        picks[i + 1] = a
+    return picks
+
+
+def downsample(series, n_out):
+    """
+    对 pd.Series 做 LTTB 降采样（先去掉 NaN），返回选中点组成的新 Series。
+    点数不超过 n_out × MIN_RATIO 时原样返回。
+    """
+    series = series.dropna()
+    if len(series) <= n_out * MIN_RATIO:
+        return series
+    index = series.index
+    x = index.asi8 if isinstance(index, pd.DatetimeIndex) else np.arange(len(series))
+    return series.iloc[lttb(x, series.to_numpy(dtype=np.float64), n_out)]
+
+
+def nav_frame(data, name_list):
+    """
+    由收盘价计算各ETF净值（除以 TradingCalendar 给出的第一个有效价格，上市前保持 NaN、不画出），
+    与 轮动策略净值 组成新的 pd.DataFrame，列为 name_list（+ '轮动策略'）。不修改 data。
+    """
+    calendar = TradingCalendar.from_frame(data, name_list)
+    navs = {}
+    for name in name_list:
+        prices = data[name]
+        first = calendar.first[name]
+        navs[name] = prices / prices.iloc[first] if first >= 0 else prices
+    if '轮动策略净值' in data.columns:
+        navs['轮动策略'] = data['轮动策略净值']
+    return pd.DataFrame(navs, index=data.index)
+
+
+def _style():
+    import matplotlib
+    return matplotlib.rc_context(_STYLE)
+
+
+def _draw(fig, navs, labels, title, max_points):
+    ax = fig.add_subplot()
     ax.set_xlabel('日期')
     ax.set_ylabel('净值')
+    for name in navs.columns:
+        series = downsample(navs[name], max_points) if max_points else navs[name].dropna()
+        if name == '轮动策略':
+            ax.plot(series.index, series.values, linestyle='-', color='#FF8124', label='轮动策略')
+        else:
+            ax.plot(series.index, series.values, linestyle='--', label=labels.get(name, name))
+    ax.legend()
+    ax.set_title(title)
+    fig.tight_layout()
 
-    # 建立 ETF 代码 和 中文名称 的映射字典
-    name_map = dict(zip(name_list, etf_names))
 
-    for name in name_list + ['轮动策略']:
-        if name in name_list:
-            data[name + '净值'] = data[name] / data[name].iloc[0]
-            label = name_map.get(name, name)  # 显示中文名
-            ax.plot(data[name + '净值'].index, data[name + '净值'].values, linestyle='--', label=label)
-        else:
-            ax.plot(data['轮动策略净值'].index, data['轮动策略净值'].values, linestyle='-', color='#FF8124', label='轮动策略')
+def render_nav(navs, path, labels=None, title='轮动策略净值曲线对比', width_px=1500, height_px=600, dpi=100,
+               max_points=None):
+    """
+    不经过 pyplot、不打开窗口地把净值曲线写入图片文件，适合服务器与多进程批量出图。
 
-    ax.legend()
-    ax.set_title('轮动策略净值曲线对比')
-    plt.tight_layout()
-    plt.show()
+    参数：
+    - navs: pd.DataFrame（每列一条净值曲线，列名 '轮动策略' 画为实线）或 pd.Series
+    - path: 输出路径，格式由扩展名决定（.png / .svg / .pdf）
+    - labels: 列名 -> 图例名称
+    - width_px / height_px / dpi: 图片尺寸
+    - max_points: 每条曲线降采样后的最多点数，默认等于像素宽度；0 表示不降采样
+
+    返回：
+    - path
+    """
+    from matplotlib.figure import Figure
+
+    if isinstance(navs, pd.Series):
+        navs = navs.to_frame()
+    max_points = width_px if max_points is None else max_points
+    with _style():
+        fig = Figure(figsize=(width_px / dpi, height_px / dpi), dpi=dpi)
+        _draw(fig, navs, labels or {}, title, max_points)
+        fig.savefig(path)
+    return path
+
+
+@profiled('plot_nav')
+def plot_nav(data, name_list, etf_names, path=None, width_px=1500, max_points=None):
+    """
+    绘制各ETF与轮动策略的净值曲线。不修改 data；曲线按图宽降采样（LTTB）。
+
+    path 给出时写入图片文件（见 render_nav），否则用 pyplot 弹出窗口显示。
+    """
+    navs = nav_frame(data, name_list)
+    labels = dict(zip(name_list, etf_names))
+    if path is not None:
+        return render_nav(navs, path, labels, width_px=width_px, max_points=max_points)
+
+    import matplotlib.pyplot as plt
+    max_points = width_px if max_points is None else max_points
+    with _style():
+        fig = plt.figure(figsize=(15, 6))
+        _draw(fig, navs, labels, '轮动策略净值曲线对比', max_points)
+        plt.show()
+
+
+def _render_job(job):
+    navs, path, kwargs = job
+    return render_nav(navs, path, **kwargs)
+
+
+def render_many(navs, out_dir, fmt='png', workers=None, width_px=1500, **kwargs):
+    """
+    批量出图：每条净值曲线写入 <out_dir>/<名称>.<fmt>，在多个进程中并行渲染。
+
+    曲线先在当前进程中降采样到 width_px 个点，再发给工作进程，长序列也只需传输少量数据。
+
+    参数：
+    - navs: dict 名称 -> 净值 pd.Series（或 pd.DataFrame，多条曲线画在同一张图），
+      或 pd.DataFrame（每列一张图）
+    - workers: 进程数，默认CPU核数；为1时在当前进程内顺序执行
+    - 其余参数传给 render_nav
+
+    返回：
+    - 输出文件路径列表，与 navs 的顺序一致
+    """
+    if isinstance(navs, pd.DataFrame):
+        navs = {name: navs[name] for name in navs.columns}
+    os.makedirs(out_dir, exist_ok=True)
+    kwargs = dict(kwargs, width_px=width_px, max_points=0)
+    jobs = []
+    for name, nav in navs.items():
+        if isinstance(nav, pd.Series):
+            nav = nav.to_frame(name=str(name) if nav.name is None else nav.name)
+        nav = pd.DataFrame({col: downsample(nav[col], width_px) for col in nav.columns})
+        job_kwargs = dict(kwargs)
+        job_kwargs.setdefault('title', str(name))
+        jobs.append((nav, os.path.join(out_dir, f'{name}.{fmt}'), job_kwargs))
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    if workers == 1:
+        return [_render_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_render_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
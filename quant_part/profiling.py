@@ -0,0 +1,167 @@
+import contextlib
+import functools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# 当前启用的 Profiler；为 None 时 span()/profiled 不做任何记录
+_ACTIVE = None
+_NULL = contextlib.nullcontext()
+
+
+class _Frame:
+    __slots__ = ('path', 'start', 'mem_start', 'peak')
+
+    def __init__(self, path, start, mem_start, peak):
+        self.path = path
+        self.start = start
+        self.mem_start = mem_start
+        self.peak = peak
+
+
+class Profiler:
+    """
+    流水线各阶段（取数 → 信号 → 回测 → 报告 → 画图）的耗时与内存记录。
+
+    阶段用 span(name) 或 @profiled(name) 标记，可以嵌套，按路径（如 'backtest/signals'）汇总
+    调用次数、总耗时、峰值内存（相对进入阶段时已分配内存的增量）与净分配量。
+    tracemalloc 的峰值是全局的，进入/退出每个阶段时把当前峰值并入所有外层阶段后再重置，
+    因此嵌套阶段与外层阶段的峰值都准确。
+
+    参数：
+    - memory: 是否用 tracemalloc 记录内存（会使被测代码变慢约一倍，计时需注意）
+    - cprofile: cProfile 结果（.prof）保存路径，给出时同时记录函数级耗时
+    """
+
+    def __init__(self, memory=True, cprofile=None):
+        self.memory = memory
+        self.cprofile = cprofile
+        self.stats = {}
+        self._stack = []
+        self._profile = None
+        self._started = None
+        self._total = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.memory:
+            tracemalloc.start()
+        if self.cprofile:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def stop(self):
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.cprofile)
+        if self.memory:
+            tracemalloc.stop()
+        self._total = time.perf_counter() - self._started
+
+    def _fold_peak(self):
+        """把 tracemalloc 自上次重置以来的峰值并入所有未结束的阶段，再重置峰值"""
+        current, peak = tracemalloc.get_traced_memory()
+        for frame in self._stack:
+            frame.peak = max(frame.peak, peak)
+        tracemalloc.reset_peak()
+        return current
+
+    @contextlib.contextmanager
+    def span(self, name):
+        path = f'{self._stack[-1].path}/{name}' if self._stack else name
+        record = self.stats.setdefault(path, {'calls': 0, 'seconds': 0.0, 'peak_mb': 0.0, 'alloc_mb': 0.0})
+        mem_start = self._fold_peak() if self.memory else 0
+        frame = _Frame(path, time.perf_counter(), mem_start, mem_start)
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - frame.start
+            mem_end = self._fold_peak() if self.memory else 0
+            self._stack.pop()
+            record['calls'] += 1
+            record['seconds'] += seconds
+            if self.memory:
+                record['peak_mb'] = max(record['peak_mb'], (frame.peak - frame.mem_start) / 2 ** 20)
+                record['alloc_mb'] += (mem_end - frame.mem_start) / 2 ** 20
+
+    def _top_functions(self, n=30):
+        """cProfile 中累计耗时最长的 n 个函数"""
+        import pstats
+        stats = pstats.Stats(self._profile)
+        rows = []
+        for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({'function': f'{filename}:{line}({func})', 'calls': ncalls,
+                         'tottime': round(tottime, 6), 'cumtime': round(cumtime, 6)})
+        return sorted(rows, key=lambda row: row['cumtime'], reverse=True)[:n]
+
+    def report(self, command=None):
+        """返回可序列化为JSON的 dict：运行环境、总耗时与各阶段汇总（按首次进入的顺序）"""
+        report = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'command': command if command is not None else sys.argv,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'memory': self.memory,
+            'total_seconds': self._total,
+            'stages': [dict(stage=path, depth=path.count('/'), **{k: round(v, 6) if isinstance(v, float) else v
+                                                                   for k, v in record.items()})
+                       for path, record in self.stats.items()],
+        }
+        if self._profile is not None:
+            report['cprofile'] = self.cprofile
+            report['top_functions'] = self._top_functions()
+        return report
+
+    def save(self, path, command=None):
+        """把 report() 写入 JSON 文件，并返回该 dict"""
+        report = self.report(command)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
+
+
+def span(name):
+    """标记一个阶段：with span('signals'): ...；未启用 Profiler 时为空操作"""
+    if _ACTIVE is None:
+        return _NULL
+    return _ACTIVE.span(name)
+
+
+def profiled(name):
+    """装饰器形式的 span，未启用 Profiler 时只多一次全局变量判断"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _ACTIVE is None:
+                return func(*args, **kwargs)
+            with _ACTIVE.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def profile_session(path, memory=True, cprofile=None, command=None):
+    """
+    在 with 块内启用 Profiler，结束时把报告写入 path（JSON），并打印各阶段耗时摘要。
+    """
+    global _ACTIVE
+    profiler = Profiler(memory=memory, cprofile=cprofile).start()
+    _ACTIVE = profiler
+    try:
+        yield profiler
+    finally:
+        _ACTIVE = None
+        profiler.stop()
+        report = profiler.save(path, command)
+        print(f"\n性能分析（总耗时 {report['total_seconds']:.3f}s，报告已保存到 {path}）:")
+        for stage in report['stages']:
+            memory_text = f"  峰值内存 {stage['peak_mb']:.1f}MB" if memory else ""
+            print(f"{'  ' * stage['depth']}{stage['stage'].rsplit('/', 1)[-1]}: {stage['seconds']:.3f}s"
+                  f" ×{stage['calls']}{memory_text}")
@@ -1,15 +1,9 @@
-import akshare as ak
 import numpy as np
 import pandas as pd
 from datetime import datetime
-import matplotlib.pyplot as plt
-import quantstats as qs
-from plot_nav import plot_nav  # 保证已导入
 from report_detail import report_detail
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score
-from plot_nav import plot_nav
 from etf_data import fetch_etf_data
+from backtest_core import run_signal_backtest
 
 
 class ETFMACDStrategy:
@@ -129,42 +123,19 @@ class ETFMACDStrategy:
             print("错误: 处理后数据为空")
             return
         
-        # 初始化持仓状态和策略收益
-        portfolio_returns = []
-        active_signals = []  # 记录当前持有的ETF
-        
         print(f"回测数据范围: {self.data.index[0]} 到 {self.data.index[-1]}")
         print(f"每个ETF分配权重: {self.weight_per_etf:.4f}")
         
-        for date in self.data.index:
-            daily_return = 0.0
-            current_holdings = []
-            
-            for code in self.name_list:
-                signal = self.data.loc[date, f'信号_{code}']
-                price_return = self.data.loc[date, f'日收益率_{code}']
-                
-                # 处理信号
-                if signal == 1:  # 金叉买入
-                    if self.positions[code] == 0:
-                        self.positions[code] = 1
-                        print(f"{date.date()} {code} MACD金叉买入")
-                elif signal == -1:  # 死叉卖出
-                    if self.positions[code] == 1:
-                        self.positions[code] = 0
-                        print(f"{date.date()} {code} MACD死叉卖出")
-                
-                # 如果持仓，计算收益
-                if self.positions[code] == 1:
-                    daily_return += self.weight_per_etf * price_return
-                    current_holdings.append(code)
-            
-            portfolio_returns.append(daily_return)
-            active_signals.append(','.join(current_holdings) if current_holdings else 'Cash')
+        # 信号矩阵 → 持仓矩阵 → 组合收益，一次性完成
+        return_cols = [f'日收益率_{code}' for code in self.name_list]
+        initial = [self.positions[code] for code in self.name_list]
+        daily_returns, holdings, positions = run_signal_backtest(
+            self.data[signal_cols], self.data[return_cols], self.name_list, self.weight_per_etf, initial)
+        self.positions = {code: int(positions[code].iloc[-1]) for code in self.name_list}
         
         # 将结果添加到数据框
-        self.data['轮动策略日收益率'] = portfolio_returns
-        self.data['信号'] = active_signals
+        self.data['轮动策略日收益率'] = daily_returns
+        self.data['信号'] = holdings
         
         # 计算累计净值
         self.data['轮动策略净值'] = (1.0 + self.data['轮动策略日收益率']).cumprod()
@@ -237,6 +208,7 @@ class ETFMACDStrategy:
 
 
 if __name__ == "__main__":
+    from plot_nav import plot_nav
     pool_list = ['510300','510880', '159915', '513100', '518880']
     etf_names = ['沪深300ETF', '红利ETF','创业板ETF','纳指ETF', '黄金ETF']
     start_date = '20250101'
@@ -1,15 +1,9 @@
-import akshare as ak
 import numpy as np
 import pandas as pd
 from datetime import datetime
-import matplotlib.pyplot as plt
-import quantstats as qs
-from plot_nav import plot_nav  # 保证已导入
 from report_detail import report_detail
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score
-from plot_nav import plot_nav
 from etf_data import fetch_etf_data
+from rolling_score import rolling_score
 
 
 class ETFMomentumStrategy:
@@ -29,6 +23,9 @@ class ETFMomentumStrategy:
 
     # 计算强弱得分 (Calculate momentum score for strength/weakness)
     def calculate_score(self, srs, N=25):
+        # 逐窗口回归的参考实现，仅在调用时导入 sklearn
+        from sklearn.linear_model import LinearRegression
+        from sklearn.metrics import r2_score
         if srs.shape[0] < N:
             return np.nan
         x = np.arange(1, N+1)
@@ -61,11 +58,13 @@ class ETFMomentumStrategy:
     def calculate_momentum(self):
         # 斜率计算长度
         N = self.N if hasattr(self, 'N') else 25
+        # 所有ETF的斜率得分一次性计算（与 calculate_score 逐窗口回归结果一致）
+        scores = rolling_score(self.data[self.name_list], N)
         for name in self.name_list:
             self.data['日收益率_'+name] = self.data[name] / self.data[name].shift(1) - 1.0
             # 动量涨幅窗口与斜率窗口一致
             self.data['涨幅_'+name] = self.data[name] / self.data[name].shift(N) - 1.0
-            self.data['得分_'+name] = self.data[name].rolling(N).apply(lambda x: self.calculate_score(x, N))
+            self.data['得分_'+name] = scores[name]
         relevant_cols = ['得分_'+v for v in self.name_list] + ['涨幅_'+v for v in self.name_list]
         self.data = self.data.dropna(subset=relevant_cols)
         print(f"\n各ETF的{N}日斜率得分（前10行）:")
@@ -91,6 +90,7 @@ class ETFMomentumStrategy:
 
 
 if __name__ == "__main__":
+    from plot_nav import plot_nav
     pool_list = ['510300','510880', '159915', '513100', '518880']
     etf_names = ['沪深300ETF', '红利ETF','创业板ETF','纳指ETF', '黄金ETF']
     start_date = '20250101'
@@ -1,102 +1,408 @@
 import numpy as np
+import pandas as pd
 
-def report_detail(data, pool_list, etf_names):
-    print(f"\n轮动策略结果表格（前10行）:")
-    momentum_cols = ['涨幅_'+v for v in pool_list]
-    result_table = data[momentum_cols+['信号','轮动策略日收益率','轮动策略净值']]
-    print(result_table.head(10))
-    print(f"\n轮动策略结果表格（最后10行）:")
-    print(result_table.tail(10))
+try:
+    from quant_part.ledger import holding_stats
+    from quant_part.profiling import profiled
+except ImportError:  # quant_macd.py 等脚本在 quant_part 目录内以顶层模块导入本文件
+    from ledger import holding_stats
+    from profiling import profiled
 
-    print(f"\n策略绩效统计:")
-    total_return = data['轮动策略净值'].iloc[-1] - 1
-    annual_return = (data['轮动策略净值'].iloc[-1] ** (252/len(data))) - 1
-    volatility = data['轮动策略日收益率'].std() * np.sqrt(252)
-    sharpe_ratio = annual_return / volatility if volatility > 0 else 0
-    max_drawdown = (data['轮动策略净值'] / data['轮动策略净值'].cummax() - 1).min()
-    print(f"总收益率: {total_return:.4f} ({total_return*100:.2f}%)")
-    print(f"年化收益率: {annual_return:.4f} ({annual_return*100:.2f}%)")
-    print(f"年化波动率: {volatility:.4f} ({volatility*100:.2f}%)")
-    print(f"夏普比率: {sharpe_ratio:.4f}")
-    print(f"最大回撤: {max_drawdown:.4f} ({max_drawdown*100:.2f}%)")
+# K线周期 -> 分钟数（OKX 的 bar 写法）
+BAR_MINUTES = {
+    '1m': 1, '3m': 3, '5m': 5, '15m': 15, '30m': 30,
+    '1H': 60, '2H': 120, '4H': 240, '6H': 360, '12H': 720,
+    '1D': 1440, '1W': 10080,
+}
 
-    print(f"\n各ETF持仓天数统计:")
-    signal_counts = data['信号'].value_counts()
-    for etf_code in pool_list:
-        etf_name = etf_names[pool_list.index(etf_code)]
-        days = signal_counts.get(etf_code, 0)
-        percentage = days / len(data) * 100
-        print(f"{etf_code}({etf_name}): {days}天 ({percentage:.1f}%)")
 
-    # === 详细回测分析报告（替代quantstats）===
+def periods_per_year(bar='1D', days_per_year=252):
+    """
+    年化系数：一年内的K线根数。
+
+    - bar: K线周期，如 '1m'/'1H'/'4H'/'1D'
+    - days_per_year: 每年交易天数，A股ETF为252，7×24小时交易的加密货币为365
+      （日内K线按全天24小时计，只适用于连续交易的品种）
+    """
+    if bar not in BAR_MINUTES:
+        raise ValueError(f"未知K线周期: {bar}")
+    return days_per_year * 1440 / BAR_MINUTES[bar]
+
+
+def infer_bar(index):
+    """由时间索引的相邻间隔中位数推断K线周期，返回 BAR_MINUTES 中最接近的一项"""
+    if len(index) < 2:
+        raise ValueError("数据过短，无法推断K线周期")
+    minutes = np.median(np.diff(pd.DatetimeIndex(index).asi8)) / 60e9
+    return min(BAR_MINUTES, key=lambda bar: abs(np.log(BAR_MINUTES[bar] / max(minutes, 1e-9))))
+
+
+def _period_returns(r, keys):
+    """按连续的周期键（如 年*12+月）累乘收益，中间没有交易日的周期记 0，与 resample 一致"""
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    growth = np.multiply.reduceat(1.0 + r, starts, axis=1) - 1.0
+    periods = np.arange(keys[0], keys[-1] + 1)
+    out = np.zeros((r.shape[0], len(periods)))
+    out[:, keys[starts] - keys[0]] = growth
+    return periods, out
+
+
+def _batch_metrics(r, dates, b, periods_per_year):
+    n_days = r.shape[1]
+    sqrt_year = np.sqrt(periods_per_year)
+    nav = np.cumprod(1.0 + r, axis=1)
+    total_return = nav[:, -1] - 1
+    annual_return = nav[:, -1] ** (periods_per_year/n_days) - 1
+    volatility = r.std(axis=1, ddof=1) * sqrt_year
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe_ratio = np.where(volatility > 0, annual_return / volatility, 0.0)
+        max_drawdown = (nav / np.maximum.accumulate(nav, axis=1) - 1).min(axis=1)
+
+        wins, losses = r > 0, r < 0
+        n_win, n_loss = wins.sum(axis=1), losses.sum(axis=1)
+        avg_win = np.where(n_win > 0, np.where(wins, r, 0.0).sum(axis=1) / n_win, 0.0)
+        avg_loss = np.where(n_loss > 0, np.where(losses, r, 0.0).sum(axis=1) / n_loss, 0.0)
+        win_loss_ratio = np.where(avg_loss != 0, np.abs(avg_win / avg_loss), np.inf)
+        var_95, var_99 = np.percentile(r, [5, 1], axis=1)
+        tail = r <= var_95[:, None]
+        cvar_95 = np.where(tail, r, 0.0).sum(axis=1) / tail.sum(axis=1)
+
+    metrics = {
+        '总收益率': total_return,
+        '年化收益率': annual_return,
+        '年化波动率': volatility,
+        '夏普比率': sharpe_ratio,
+        '最大回撤': max_drawdown,
+        '胜率': n_win / n_days,
+        '败率': n_loss / n_days,
+        '平均盈利': avg_win,
+        '平均亏损': avg_loss,
+        '盈亏比': win_loss_ratio,
+        '95% VaR': var_95,
+        '99% VaR': var_99,
+        '95% CVaR': cvar_95,
+    }
+
+    if b is not None:
+        benchmark = _batch_metrics(np.atleast_2d(b), None, None, periods_per_year)
+        bench = {k: np.broadcast_to(benchmark[k], total_return.shape)
+                 for k in ('总收益率', '年化收益率', '年化波动率', '夏普比率', '最大回撤')}
+        tracking_error = (r - b).std(axis=1, ddof=1) * sqrt_year
+        excess_annual_return = annual_return - bench['年化收益率']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            information_ratio = np.where(tracking_error > 0, excess_annual_return / tracking_error, 0.0)
+        metrics.update({
+            '基准总收益率': bench['总收益率'],
+            '基准年化收益率': bench['年化收益率'],
+            '基准年化波动率': bench['年化波动率'],
+            '基准夏普比率': bench['夏普比率'],
+            '基准最大回撤': bench['最大回撤'],
+            '超额总收益': total_return - bench['总收益率'],
+            '超额年化收益': excess_annual_return,
+            '跟踪误差': tracking_error,
+            '信息比率': information_ratio,
+        })
+
+    if dates is not None:
+        months = dates.year.to_numpy() * 12 + dates.month.to_numpy() - 1
+        _, monthly = _period_returns(r, months)
+        metrics['平均月收益'] = monthly.mean(axis=1)
+        metrics['月收益标准差'] = monthly.std(axis=1, ddof=1) if monthly.shape[1] > 1 else np.full(len(r), np.nan)
+        metrics['正收益月份'] = (monthly > 0).sum(axis=1)
+        metrics['月份数'] = np.full(len(r), monthly.shape[1])
+        years, yearly = _period_returns(r, dates.year.to_numpy())
+        for j, year in enumerate(years):
+            metrics[f'年度收益_{year}'] = yearly[:, j]
+    return metrics
+
+
+def batch_metrics(returns, benchmark=None, periods_per_year=252, chunk_size=2000):
+    """
+    批量计算 report_detail 报告的全部指标（不打印），每行一个策略/参数组。
+
+    参数：
+    - returns: pd.DataFrame（index为日期，每列一个策略的日收益率）或 pd.Series；
+      也可以是二维数组 (策略数 × 日期数)，此时不计算月度/年度收益
+    - benchmark: 基准日收益率，pd.Series / 一维数组（与日期等长），给出时附带基准与超额收益指标
+    - periods_per_year: 年化系数，日线为252
+    - chunk_size: 每次计算的策略数，控制大批量时的内存占用
+
+    返回：
+    - pd.DataFrame，index为策略名，列为各项指标；年度收益列名为 '年度收益_<年份>'
+    """
+    if isinstance(returns, pd.Series):
+        returns = returns.to_frame()
+    if isinstance(returns, pd.DataFrame):
+        dates = pd.DatetimeIndex(returns.index)
+        names = list(returns.columns)
+        r = returns.to_numpy(dtype=np.float64).T
+    else:
+        dates = None
+        r = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+        names = list(range(r.shape[0]))
+    b = None if benchmark is None else np.asarray(benchmark, dtype=np.float64)
+
+    chunks = []
+    for lo in range(0, r.shape[0], chunk_size):
+        metrics = _batch_metrics(r[lo:lo + chunk_size], dates, b, periods_per_year)
+        chunks.append(pd.DataFrame(metrics, index=names[lo:lo + chunk_size]))
+    return pd.concat(chunks) if chunks else pd.DataFrame()
+
+
+def calc_metrics(strategy_returns, strategy_nav=None, benchmark_returns=None, periods_per_year=252):
+    """
+    计算单个策略的 report_detail 指标（不打印），返回 dict，是 batch_metrics 的单行版本。
+
+    参数：
+    - strategy_returns: pd.Series，策略每根K线的收益率（日线即日收益率）
+    - strategy_nav: 为兼容保留，净值总是由日收益率累乘得到
+    - benchmark_returns: pd.Series，基准收益率，给出时附带基准与超额收益指标
+    - periods_per_year: 年化系数，见 periods_per_year()
+    """
+    return batch_metrics(strategy_returns, benchmark_returns, periods_per_year).iloc[0].to_dict()
+
+class StreamingMetrics:
+    """
+    分块累计的绩效指标，用于放不进内存的长序列（如多年1分钟K线）：每次 update 一段收益率，
+    只保留净值、回撤、一二阶矩、胜负统计、月度/年度收益与一个固定分箱的收益直方图，
+    内存占用与序列长度无关。
+
+    result() 返回与 calc_metrics 相同键的 dict（不含基准）。除 VaR/CVaR 外与整段计算一致
+    （波动率由 Σr、Σr² 得到，差异在浮点误差量级）；VaR/CVaR 由直方图得到，误差不超过一个
+    分箱宽度（1e-5）：分位数两侧的收益与 CVaR 尾部边界所在分箱的收益都按分箱均值计，
+    CVaR 在边界分箱中只计入落在尾部的个数。
+    分位点附近有大量完全相同的收益时，整段计算会把并列值都算进尾部，CVaR 误差可能更大。
+    """
+
+    _LOW, _HIGH, _BINS = -1.0, 1.0, 200_000
+
+    def __init__(self, periods_per_year=252):
+        self.periods_per_year = periods_per_year
+        self.n = 0
+        self.total = 0.0
+        self.sum_sq = 0.0
+        self.nav = 1.0
+        self.peak = 1.0
+        self.max_drawdown = 0.0
+        self.n_win = self.n_loss = 0
+        self.sum_win = self.sum_loss = 0.0
+        self.months = {}
+        self.years = {}
+        # 分箱 0 与 _BINS+1 分别收集低于 _LOW、高于 _HIGH 的收益
+        self.counts = np.zeros(self._BINS + 2, dtype=np.int64)
+        self.sums = np.zeros(self._BINS + 2)
+
+    @staticmethod
+    def _merge_periods(store, keys, r):
+        periods, growth = _period_returns(r[None, :], keys)
+        for key, value in zip(periods.tolist(), growth[0]):
+            store[key] = (1.0 + store.get(key, 0.0)) * (1.0 + value) - 1.0
+
+    def update(self, returns):
+        """累计一段收益率（pd.Series，index为时间，需按时间顺序依次传入；NaN 视为0）"""
+        r = np.nan_to_num(returns.to_numpy(dtype=np.float64))
+        if len(r) == 0:
+            return
+        nav = self.nav * np.cumprod(1.0 + r)
+        peak = np.maximum(self.peak, np.maximum.accumulate(nav))
+        self.max_drawdown = min(self.max_drawdown, (nav / peak - 1).min())
+        self.nav, self.peak = nav[-1], peak[-1]
+
+        self.n += len(r)
+        self.total += r.sum()
+        self.sum_sq += np.dot(r, r)
+        wins, losses = r > 0, r < 0
+        self.n_win += int(wins.sum())
+        self.n_loss += int(losses.sum())
+        self.sum_win += r[wins].sum()
+        self.sum_loss += r[losses].sum()
+
+        dates = pd.DatetimeIndex(returns.index)
+        self._merge_periods(self.months, dates.year.to_numpy() * 12 + dates.month.to_numpy() - 1, r)
+        self._merge_periods(self.years, dates.year.to_numpy(), r)
+
+        width = (self._HIGH - self._LOW) / self._BINS
+        bins = np.clip(np.floor((r - self._LOW) / width), -1, self._BINS).astype(np.int64) + 1
+        # 只更新出现过的分箱，小块更新时不必遍历整个直方图
+        np.add.at(self.counts, bins, 1)
+        np.add.at(self.sums, bins, r)
+
+    def _quantile(self, q):
+        """
+        直方图上的第 q 分位数：与 np.percentile 一样在第 floor/ceil(q*(n-1)) 个收益之间线性插值，
+        这两个收益用各自所在分箱的均值代替（分箱内只有一个收益时即为精确值）。
+        """
+        rank = q * (self.n - 1)
+        lo = int(np.floor(rank))
+        cum = np.cumsum(self.counts)
+        b_lo, b_hi = np.searchsorted(cum, [lo, min(lo + 1, self.n - 1)], side='right')
+        low, high = self.sums[b_lo] / self.counts[b_lo], self.sums[b_hi] / self.counts[b_hi]
+        return low + (rank - lo) * (high - low)
+
+    def _tail_mean(self, q):
+        """
+        直方图上的尾部均值（CVaR）：整段计算取不高于第 q 分位数的 floor(q*(n-1))+1 个收益的均值。
+        分位数以下的分箱按精确的和计入，分位数所在分箱只取尾部个数、按该分箱均值计。
+        """
+        k = int(np.floor(q * (self.n - 1))) + 1
+        cum = np.cumsum(self.counts)
+        b = int(np.searchsorted(cum, k - 1, side='right'))
+        before = cum[b - 1] if b else 0
+        return (self.sums[:b].sum() + (k - before) * self.sums[b] / self.counts[b]) / k
+
+    @staticmethod
+    def _fill_periods(store):
+        """补齐首尾之间没有K线的周期（收益记0），与 batch_metrics 一致"""
+        keys = np.arange(min(store), max(store) + 1)
+        return keys, np.array([store.get(int(k), 0.0) for k in keys])
+
+    def result(self):
+        if self.n < 2:
+            raise ValueError("收益率序列过短")
+        n, ppy = self.n, self.periods_per_year
+        annual_return = self.nav ** (ppy / n) - 1
+        variance = max(self.sum_sq - self.total * self.total / n, 0.0) / (n - 1)
+        volatility = np.sqrt(variance) * np.sqrt(ppy)
+        avg_win = self.sum_win / self.n_win if self.n_win else 0.0
+        avg_loss = self.sum_loss / self.n_loss if self.n_loss else 0.0
+        var_95 = self._quantile(0.05)
+        var_99 = self._quantile(0.01)
+        _, monthly = self._fill_periods(self.months)
+        years, yearly = self._fill_periods(self.years)
+        metrics = {
+            '总收益率': self.nav - 1,
+            '年化收益率': annual_return,
+            '年化波动率': volatility,
+            '夏普比率': annual_return / volatility if volatility > 0 else 0.0,
+            '最大回撤': self.max_drawdown,
+            '胜率': self.n_win / n,
+            '败率': self.n_loss / n,
+            '平均盈利': avg_win,
+            '平均亏损': avg_loss,
+            '盈亏比': abs(avg_win / avg_loss) if avg_loss != 0 else np.inf,
+            '95% VaR': var_95,
+            '99% VaR': var_99,
+            '95% CVaR': self._tail_mean(0.05),
+            '平均月收益': monthly.mean(),
+            '月收益标准差': monthly.std(ddof=1) if len(monthly) > 1 else np.nan,
+            '正收益月份': int((monthly > 0).sum()),
+            '月份数': len(monthly),
+        }
+        for year, value in zip(years.tolist(), yearly):
+            metrics[f'年度收益_{year}'] = value
+        return metrics
+
+
+def print_summary(metrics):
+    """打印 总收益率/年化收益率/年化波动率/夏普比率/最大回撤"""
+    print(f"总收益率: {metrics['总收益率']:.4f} ({metrics['总收益率']*100:.2f}%)")
+    print(f"年化收益率: {metrics['年化收益率']:.4f} ({metrics['年化收益率']*100:.2f}%)")
+    print(f"年化波动率: {metrics['年化波动率']:.4f} ({metrics['年化波动率']*100:.2f}%)")
+    print(f"夏普比率: {metrics['夏普比率']:.4f}")
+    print(f"最大回撤: {metrics['最大回撤']:.4f} ({metrics['最大回撤']*100:.2f}%)")
+
+
+def print_details(metrics):
+    """打印详细回测分析：基准对比（如有）、风险指标、VaR、月度/年度收益"""
     print("\n=== 详细回测分析报告 ===")
-    strategy_returns = data['轮动策略日收益率'].copy()
 
     # 基准对比分析（510300）
-    if '510300' in data.columns:
-        benchmark_returns = data['日收益率_510300'].copy()
-        benchmark_nav = (1 + benchmark_returns).cumprod()
-
+    if '基准总收益率' in metrics:
         print(f"\n基准对比分析（沪深300ETF）:")
-        benchmark_total_return = benchmark_nav.iloc[-1] - 1
-        benchmark_annual_return = (benchmark_nav.iloc[-1] ** (252/len(benchmark_nav))) - 1
-        benchmark_volatility = benchmark_returns.std() * np.sqrt(252)
-        benchmark_sharpe = benchmark_annual_return / benchmark_volatility if benchmark_volatility > 0 else 0
-        benchmark_max_dd = (benchmark_nav / benchmark_nav.cummax() - 1).min()
-
-        print(f"基准总收益率: {benchmark_total_return:.4f} ({benchmark_total_return*100:.2f}%)")
-        print(f"基准年化收益率: {benchmark_annual_return:.4f} ({benchmark_annual_return*100:.2f}%)")
-        print(f"基准年化波动率: {benchmark_volatility:.4f} ({benchmark_volatility*100:.2f}%)")
-        print(f"基准夏普比率: {benchmark_sharpe:.4f}")
-        print(f"基准最大回撤: {benchmark_max_dd:.4f} ({benchmark_max_dd*100:.2f}%)")
+        for label in ('总收益率', '年化收益率', '年化波动率', '夏普比率', '最大回撤'):
+            value = metrics['基准' + label]
+            if label == '夏普比率':
+                print(f"基准{label}: {value:.4f}")
+            else:
+                print(f"基准{label}: {value:.4f} ({value*100:.2f}%)")
 
         # 超额收益分析
-        excess_return = total_return - benchmark_total_return
-        excess_annual_return = annual_return - benchmark_annual_return
-        tracking_error = (strategy_returns - benchmark_returns).std() * np.sqrt(252)
-        information_ratio = excess_annual_return / tracking_error if tracking_error > 0 else 0
-
         print(f"\n超额收益分析:")
-        print(f"超额总收益: {excess_return:.4f} ({excess_return*100:.2f}%)")
-        print(f"超额年化收益: {excess_annual_return:.4f} ({excess_annual_return*100:.2f}%)")
-        print(f"跟踪误差: {tracking_error:.4f} ({tracking_error*100:.2f}%)")
-        print(f"信息比率: {information_ratio:.4f}")
+        for label in ('超额总收益', '超额年化收益', '跟踪误差'):
+            print(f"{label}: {metrics[label]:.4f} ({metrics[label]*100:.2f}%)")
+        print(f"信息比率: {metrics['信息比率']:.4f}")
 
     # 风险指标分析
     print(f"\n风险指标分析:")
-    winning_rate = (strategy_returns > 0).sum() / len(strategy_returns)
-    loss_rate = (strategy_returns < 0).sum() / len(strategy_returns)
-    avg_win = strategy_returns[strategy_returns > 0].mean() if (strategy_returns > 0).any() else 0
-    avg_loss = strategy_returns[strategy_returns < 0].mean() if (strategy_returns < 0).any() else 0
-    win_loss_ratio = abs(avg_win / avg_loss) if avg_loss != 0 else float('inf')
-
-    print(f"胜率: {winning_rate:.4f} ({winning_rate*100:.2f}%)")
-    print(f"败率: {loss_rate:.4f} ({loss_rate*100:.2f}%)")
-    print(f"平均盈利: {avg_win:.4f} ({avg_win*100:.2f}%)")
-    print(f"平均亏损: {avg_loss:.4f} ({avg_loss*100:.2f}%)")
-    print(f"盈亏比: {win_loss_ratio:.4f}")
+    for label in ('胜率', '败率', '平均盈利', '平均亏损'):
+        print(f"{label}: {metrics[label]:.4f} ({metrics[label]*100:.2f}%)")
+    print(f"盈亏比: {metrics['盈亏比']:.4f}")
 
     # VaR风险度量
-    var_95 = np.percentile(strategy_returns, 5)
-    var_99 = np.percentile(strategy_returns, 1)
-    cvar_95 = strategy_returns[strategy_returns <= var_95].mean()
-
     print(f"\n风险度量:")
-    print(f"95% VaR: {var_95:.4f} ({var_95*100:.2f}%)")
-    print(f"99% VaR: {var_99:.4f} ({var_99*100:.2f}%)")
-    print(f"95% CVaR: {cvar_95:.4f} ({cvar_95*100:.2f}%)")
+    for label in ('95% VaR', '99% VaR', '95% CVaR'):
+        print(f"{label}: {metrics[label]:.4f} ({metrics[label]*100:.2f}%)")
 
     # 月度/年度收益分析
     print(f"\n时间维度收益分析:")
-    monthly_returns = strategy_returns.resample('M').apply(lambda x: (1+x).prod()-1)
-    yearly_returns = strategy_returns.resample('Y').apply(lambda x: (1+x).prod()-1)
-
+    monthly_mean, monthly_std = metrics['平均月收益'], metrics['月收益标准差']
+    positive_months, n_months = int(metrics['正收益月份']), int(metrics['月份数'])
     print(f"月度收益统计:")
-    print(f"  平均月收益: {monthly_returns.mean():.4f} ({monthly_returns.mean()*100:.2f}%)")
-    print(f"  月收益标准差: {monthly_returns.std():.4f} ({monthly_returns.std()*100:.2f}%)")
-    print(f"  正收益月份: {(monthly_returns > 0).sum()}/{len(monthly_returns)} ({(monthly_returns > 0).sum()/len(monthly_returns)*100:.1f}%)")
+    print(f"  平均月收益: {monthly_mean:.4f} ({monthly_mean*100:.2f}%)")
+    print(f"  月收益标准差: {monthly_std:.4f} ({monthly_std*100:.2f}%)")
+    print(f"  正收益月份: {positive_months}/{n_months} ({positive_months/n_months*100:.1f}%)")
 
+    yearly_returns = {int(k.split('_')[1]): v for k, v in metrics.items() if k.startswith('年度收益_')}
     if len(yearly_returns) > 1:
         print(f"年度收益统计:")
         for year, ret in yearly_returns.items():
-            print(f"  {year.year}年: 收益率 {ret:.4f} ({ret*100:.2f}%)")
\ No newline at end of file
+            print(f"  {year}年: 收益率 {ret:.4f} ({ret*100:.2f}%)")
+
+
+@profiled('report_detail')
+def report_detail(data, pool_list, etf_names, panel=None, periods_per_year=252, metrics=None):
+    """
+    打印回测结果表格与绩效报告。
+
+    参数：
+    - data: pd.DataFrame，至少包含 信号/轮动策略日收益率/轮动策略净值 列
+    - pool_list / etf_names: ETF代码与名称
+    - panel: 策略的 Panel（ETF × 字段 × 日期），给出时从中读取 涨幅/日收益率；
+      否则从 data 的 涨幅_<代码>/日收益率_<代码> 宽表列读取
+    - periods_per_year: 年化系数，日线为252
+    - metrics: 已算好的 calc_metrics 结果（如结果缓存中保存的），给出时不再重新计算
+
+    返回：
+    - 绩效指标 dict
+    """
+    print(f"\n轮动策略结果表格（前10行）:")
+    portfolio_cols = ['信号','轮动策略日收益率','轮动策略净值']
+    if panel is not None:
+        result_table = pd.concat([panel.to_frame(['涨幅'], pool_list), data[portfolio_cols]], axis=1)
+    else:
+        result_table = data[['涨幅_'+v for v in pool_list]+portfolio_cols]
+    print(result_table.head(10))
+    print(f"\n轮动策略结果表格（最后10行）:")
+    print(result_table.tail(10))
+
+    print(f"\n策略绩效统计:")
+    if metrics is None:
+        strategy_returns = data['轮动策略日收益率'].copy()
+        if panel is not None:
+            benchmark_returns = panel.series('日收益率', '510300') if '510300' in panel.symbols else None
+        else:
+            benchmark_returns = data['日收益率_510300'] if '510300' in data.columns else None
+        metrics = calc_metrics(strategy_returns, benchmark_returns=benchmark_returns,
+                               periods_per_year=periods_per_year)
+    print_summary(metrics)
+
+    print(f"\n各ETF持仓天数统计:")
+    if panel is not None and '权重' in panel:
+        # 由持仓权重矩阵统计，同一天持有多只ETF时每只都计入
+        stats = holding_stats(panel['权重'].T, panel.symbols)
+        for etf_code in pool_list:
+            etf_name = etf_names[pool_list.index(etf_code)]
+            row = stats.loc[etf_code]
+            print(f"{etf_code}({etf_name}): {int(row['持仓天数'])}天 ({row['持仓比例']*100:.1f}%)，"
+                  f"建仓{int(row['建仓次数'])}次，平均每次{row['平均持仓天数']:.1f}天")
+    else:
+        signal_counts = data['信号'].value_counts()
+        for etf_code in pool_list:
+            etf_name = etf_names[pool_list.index(etf_code)]
+            days = signal_counts.get(etf_code, 0)
+            percentage = days / len(data) * 100
+            print(f"{etf_code}({etf_name}): {days}天 ({percentage:.1f}%)")
+
+    # === 详细回测分析报告（替代quantstats）===
+    print_details(metrics)
+    return metrics
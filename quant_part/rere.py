@@ -1,44 +1,166 @@
-import requests
-import pandas as pd
+import csv
+import json
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from quant_part.etf_data import RateLimiter
+
+OKX_BASE_URL = "https://www.okx.com"
+CANDLES_PATH = "/api/v5/market/history-candles"
+COLUMNS = ["ts", "open", "high", "low", "close", "vol", "volCcy", "volCcyQuote", "confirm"]
+# OKX 限流返回的业务错误码（Too Many Requests），与请求异常一样退避后重试
+RATE_LIMIT_CODES = ("50011", "50061")
+
+
+class RequestsTransport:
+    """默认HTTP传输：复用同一个 requests.Session，返回解析后的JSON"""
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self._session = None
+
+    def __call__(self, url, params):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session.get(url, params=params, timeout=self.timeout).json()
+
+
+def _write_json(path, obj):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    """读取JSON文件，不存在或已损坏时返回 None"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, UnicodeDecodeError, json.JSONDecodeError):
+        return None
 
-def fetch_okx_candles(symbol="BTC-USDT", start_time="2022-01-01", end_time="2025-07-01", bar="4H"):
-    url = "https://www.okx.com/api/v5/market/candles"
+
+def fetch_okx_candles(symbol="BTC-USDT", start_time="2022-01-01", end_time="2025-07-01", bar="4H",
+                      out_dir=".", transport=None, limiter=None, base_url=OKX_BASE_URL,
+                      limit=100, retries=3, backoff=1.0):
+    """
+    从OKX向前分页下载K线，保存为 <symbol>_<bar>.csv（按时间升序，ts 为 datetime）。
+
+    每页数据到达后立即追加到 .part 文件，并更新 .ckpt 断点文件（记录已下载到的最早时间戳）；
+    中途失败或进程中断后，用相同参数再次调用即从断点继续。完成后下载参数记录在 .meta.json 中，
+    再次调用时参数相同则直接复用已有CSV，不同则重新下载。
+
+    参数：
+    - symbol / bar: OKX 的 instId 与 K线周期，如 'BTC-USDT'、'4H'
+    - start_time / end_time: 下载区间 [start_time, end_time)
+    - out_dir: 输出目录
+    - transport: HTTP传输函数 transport(url, params) -> dict，默认 RequestsTransport
+    - limiter: RateLimiter，多个任务共享时实现整体限速
+    - base_url: 接口地址，可指向本地模拟服务器
+    - retries / backoff: 请求异常或被限流时的重试次数与首次退避秒数（之后翻倍）
+
+    返回：
+    - 最终CSV路径；接口返回错误或重试用尽时返回 None（断点保留，可再次调用续传）
+    """
+    transport = transport or RequestsTransport()
+    limiter = limiter or RateLimiter(5.0)
     start_ts = int(pd.to_datetime(start_time).timestamp() * 1000)
     end_ts = int(pd.to_datetime(end_time).timestamp() * 1000)
-    all_data = []
-
-    while start_ts < end_ts:
-        params = {
-            "instId": symbol,
-            "bar": bar,
-            "before": end_ts,
-            "limit": 100,
-        }
-        resp = requests.get(url, params=params).json()
-        if resp["code"] != "0" or not resp["data"]:
+    path = os.path.join(out_dir, f"{symbol.replace('-', '_')}_{bar}.csv")
+    part_path, ckpt_path, meta_path = path + '.part', path + '.ckpt', path + '.meta.json'
+    job = {"symbol": symbol, "bar": bar, "start_ts": start_ts, "end_ts": end_ts}
+
+    ckpt = None
+    if os.path.exists(ckpt_path):
+        ckpt = _read_json(ckpt_path)
+        # 断点损坏（写入时被中断）、参数不同或 .part 已丢失时都视为没有断点，从头下载
+        if (not isinstance(ckpt, dict) or any(ckpt.get(k) != v for k, v in job.items())
+                or not isinstance(ckpt.get("cursor"), int) or not os.path.exists(part_path)):
+            ckpt = None
+    elif os.path.exists(path):
+        # 已完成的CSV只在下载参数与本次一致时复用，区间不同（或旧版本没有记录参数）时重新下载
+        if _read_json(meta_path) == job:
+            print(f"{path} 已存在，跳过")
+            return path
+        print(f"{path} 的下载区间与本次不同，重新下载")
+    if ckpt is None:
+        # 参数变化或首次下载，从头开始
+        ckpt = dict(job, cursor=end_ts, rows=0)
+        with open(part_path, 'w', newline='') as f:
+            csv.writer(f).writerow(COLUMNS)
+        _write_json(ckpt_path, ckpt)
+
+    url = base_url.rstrip('/') + CANDLES_PATH
+    while ckpt["cursor"] > start_ts:
+        params = {"instId": symbol, "bar": bar, "after": ckpt["cursor"], "limit": limit}
+        for attempt in range(retries + 1):
+            limiter.wait()
+            try:
+                resp = transport(url, params)
+                if resp.get("code") not in RATE_LIMIT_CODES:
+                    break
+                error = f"被限流: {resp}"
+            except Exception as e:
+                error = e
+            if attempt == retries:
+                print(f"{symbol} {bar} 请求失败（已重试{retries}次）: {error}")
+                return None
+            time.sleep(backoff * 2 ** attempt)
+        if resp.get("code") != "0":
             print("Error:", resp)
+            return None
+        data = resp["data"]
+        if not data:
             break
+        rows = [row for row in data if int(row[0]) >= start_ts]
+        with open(part_path, 'a', newline='') as f:
+            csv.writer(f).writerows(rows)
+        ckpt["cursor"] = int(data[-1][0])  # after 参数返回早于该时间戳的数据
+        ckpt["rows"] += len(rows)
+        _write_json(ckpt_path, ckpt)
 
-        data = resp["data"]
-        all_data.extend(data)
-        end_ts = int(data[-1][0]) - 1  # 向前推进
+    # 断点恢复时可能重复追加同一页，合并时按时间戳去重
+    df = pd.read_csv(part_path)
+    df = df.drop_duplicates("ts").sort_values("ts")
+    df["ts"] = pd.to_datetime(df["ts"].astype('int64'), unit='ms')
+    df.to_csv(path, index=False)
+    _write_json(meta_path, job)
+    os.remove(part_path)
+    os.remove(ckpt_path)
+    print(f"保存完成，共 {len(df)} 条数据")
+    return path
 
-        time.sleep(0.3)
 
-    df = pd.DataFrame(all_data, columns=[
-        "ts", "open", "high", "low", "close", "vol", "volCcy", "volCcyQuote", "confirm"
-    ])
-    df["ts"] = pd.to_datetime(df["ts"].astype(int), unit='ms')
-    df = df.sort_values("ts")
-    df.to_csv(f"{symbol.replace('-', '_')}_{bar}.csv", index=False)
-    print(f"保存完成，共 {len(df)} 条数据")
+def download_candles(jobs, max_workers=4, rate=5.0, **kwargs):
+    """
+    并发下载多个 instId/bar，所有任务共享同一个限速器。
+
+    参数：
+    - jobs: 任务列表，每项为 fetch_okx_candles 的关键字参数字典，如
+      {'symbol': 'BTC-USDT', 'bar': '1H', 'start_time': '2024-01-01', 'end_time': '2025-01-01'}
+    - max_workers: 同时进行的任务数
+    - rate: 所有任务合计每秒请求数
+    - kwargs: 传给每个 fetch_okx_candles 的公共参数（如 out_dir、transport、base_url）
+
+    返回：
+    - 与 jobs 顺序一致的CSV路径列表（失败为 None）
+    """
+    limiter = RateLimiter(rate)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+        futures = [executor.submit(fetch_okx_candles, **dict(kwargs, **job), limiter=limiter) for job in jobs]
+        return [future.result() for future in futures]
 
-# 示例调用
-fetch_okx_candles(
-    symbol="BTC-USDT",
-    start_time="2022-01-01",
-    end_time="2025-07-01",
-    bar="4H"
-)
 
+# 示例调用（在项目根目录运行：python -m quant_part.rere）
+if __name__ == "__main__":
+    fetch_okx_candles(
+        symbol="BTC-USDT",
+        start_time="2022-01-01",
+        end_time="2025-07-01",
+        bar="4H"
+    )
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PATH = 'result_cache'
+SUFFIX = '.pkl'
+
+
+def data_version(data):
+    """
+    价格数据切片的内容版本：对日期、列名与数值做哈希。
+    get_etf_data 追加了新交易日或复权价格有变化，版本即变，旧结果不会再被命中。
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(pd.DatetimeIndex(data.index).asi8).tobytes())
+    h.update(json.dumps([str(code) for code in data.columns]).encode('utf-8'))
+    h.update(np.ascontiguousarray(data.to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()
+
+
+def result_key(data, strategy, version, params):
+    """
+    回测结果的缓存键：数据版本 + 策略标识（如 'strategies.macd_strategy.MACDStrategy'）与版本号 + 参数。
+
+    参数：
+    - data: pd.DataFrame，策略使用的价格切片（index为日期，列为ETF代码）
+    - strategy / version: 策略标识与版本号，策略逻辑改变时提高版本号即可让旧结果失效
+    - params: dict，影响结果的全部参数（需可被 JSON 序列化）
+    """
+    text = json.dumps({'data': data_version(data), 'strategy': strategy, 'version': version, 'params': params},
+                      sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=20).hexdigest()
+
+
+class ResultCache:
+    """
+    磁盘上的回测结果缓存：每个结果 pickle 成一个 <键>.pkl 文件，键由 result_key 按内容生成。
+
+    命中时更新文件的修改时间，写入后若目录总大小超过 max_bytes，按修改时间从最久未使用的结果开始删除（LRU）。
+    数据更新后键随之改变，旧数据的结果不再被访问，自然最先被淘汰。
+    每个文件先写临时文件再原子替换，多个进程同时读写也不会读到写了一半的结果。
+
+    参数：
+    - path: 缓存目录
+    - max_bytes: 缓存总大小上限（字节）
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=512 * 2 ** 20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _file(self, key):
+        return os.path.join(self.path, key + SUFFIX)
+
+    def _entries(self):
+        """[(修改时间, 大小, 路径)]，目录不存在时为空"""
+        if not os.path.isdir(self.path):
+            return []
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def __len__(self):
+        return len(self._entries())
+
+    def __contains__(self, key):
+        return os.path.exists(self._file(key))
+
+    @property
+    def nbytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def get(self, key, default=None):
+        """读取缓存的结果，未命中（或文件已损坏）时返回 default"""
+        path = self._file(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # 损坏的文件或已不兼容的旧结果，删除后按未命中处理
+            self._remove(path)
+            self.misses += 1
+            return default
+        self.hits += 1
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return value
+
+    def put(self, key, value):
+        """写入结果并按 LRU 淘汰；单个结果超过 max_bytes 时不写入"""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return False
+        os.makedirs(self.path, exist_ok=True)
+        path = self._file(key)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        self._evict()
+        return True
+
+    def get_or_compute(self, key, compute):
+        """命中则返回缓存的结果，否则调用 compute() 计算并写入"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self._entries():
+            self._remove(path)
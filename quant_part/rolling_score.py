@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# 每次一起计算的列数
+_BLOCK_COLUMNS = 256
+# 窗口离差平方和不超过 Σp² 的这个比例时视为常数窗口
+_FLAT_EPS = 1e-12
+
+
+def _score_block(values, N):
+    """计算一组列的得分，返回每个完整窗口（第 N-1 行起）的结果"""
+    n_rows = values.shape[0]
+    missing = np.isnan(values)
+    # 减去列均值以降低累加和相减时的精度损失（协方差、方差对平移不变）
+    with np.errstate(invalid='ignore'):
+        offset = np.nan_to_num(np.nanmean(values, axis=0))
+    p = np.where(missing, 0.0, values - offset)
+    t = np.arange(1, n_rows + 1, dtype=np.float64)[:, None]
+
+    def window_sum(arr):
+        # 以 N 为窗口的滑动和，第 i 行对应窗口 [i-N+1, i]
+        csum = np.cumsum(arr, axis=0)
+        out = csum[N - 1:].copy()
+        out[1:] -= csum[:-N]
+        return out
+
+    s_y = window_sum(p)
+    s_yy = window_sum(p * p)
+    s_ty = window_sum(t * p)
+    n_missing = window_sum(missing.astype(np.float64))
+
+    # 窗口内的局部序号 k = t - (窗口起点 - 1)，故 Σk·p = Σt·p - start·Σp
+    start = t[:n_rows - N + 1] - 1.0
+    s_ky = s_ty - start * s_y
+    x_mean = (N + 1) / 2.0
+    s_xx = N * (N * N - 1) / 12.0
+    s_xy = s_ky - x_mean * s_y
+    s_yy_c = s_yy - s_y * s_y / N
+
+    first = values[:n_rows - N + 1]
+    slope = s_xy / s_xx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 近似常数的窗口里 s_yy_c 只剩舍入误差，按常数处理（R²=1，此时斜率也约为0）；
+        # 舍入可能使 R² 略大于1，截断到 [0, 1]，以免放大 斜率×R²
+        flat = s_yy_c <= _FLAT_EPS * s_yy
+        r_squared = np.clip(np.where(flat, 1.0, s_xy * s_xy / (s_xx * s_yy_c)), 0.0, 1.0)
+        score = 10000 * (slope / first) * r_squared
+    valid = (n_missing == 0) & (first != 0)
+    return np.where(valid, score, np.nan)
+
+
+def rolling_score(prices, N=25):
+    """
+    一次性计算所有ETF的N日斜率得分（10000 * 斜率 * R²），结果与逐窗口
+    LinearRegression + r2_score 的 calculate_score 一致。
+
+    对窗口内的 y = p / p[0] 与 x = 1..N 做一元线性回归：
+    - 斜率 = cov(x, p) / var(x) / p[0]
+    - R²   = cov(x, p)² / (var(x) * var(p))，与 y 的缩放无关
+    cov、var 所需的窗口和 Σp、Σp²、Σk·p 均由累加和差分得到，整体为 O(n)。
+
+    参数：
+    - prices: pd.DataFrame 或 pd.Series，index为日期，每列为一只ETF的收盘价
+    - N: 窗口长度
+
+    返回：
+    - 与 prices 形状相同的 pd.DataFrame / pd.Series，窗口不足N、窗口内含缺失值
+      或窗口首值为0时为 NaN
+    """
+    is_series = isinstance(prices, pd.Series)
+    frame = prices.to_frame() if is_series else prices
+    values = frame.to_numpy(dtype=np.float64)
+    n_rows = values.shape[0]
+    scores = np.full(values.shape, np.nan)
+    if N < 2 or n_rows < N:
+        result = pd.DataFrame(scores, index=frame.index, columns=frame.columns)
+        return result.iloc[:, 0] if is_series else result
+
+    # 按列分块计算，中间数组约为输入的十余倍，分块后峰值内存与ETF数无关
+    for lo in range(0, values.shape[1], _BLOCK_COLUMNS):
+        scores[N - 1:, lo:lo + _BLOCK_COLUMNS] = _score_block(values[:, lo:lo + _BLOCK_COLUMNS], N)
+
+    result = pd.DataFrame(scores, index=frame.index, columns=frame.columns)
+    return result.iloc[:, 0] if is_series else result
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+
+class TradingCalendar:
+    """
+    主交易日历：价格面板的日期索引，加上每只ETF第一个/最后一个有效价格的整数位置。
+
+    价格库按所有ETF日期的并集存放，上市前（如2012年初的510300）与停牌日为 NaN。
+    指标在每只ETF的有效行上计算（无缺失时为连续切片，有停牌时为有效行的整数位置），
+    再按整数位置直接写回 日期 × ETF 的数组，不需要 dropna/reindex 按日期对齐。
+    策略、报告与画图统一用这里的位置处理上市前的 NaN 前缀。
+
+    - index: 主交易日历（pd.DatetimeIndex）
+    - first / last: dict 代码 -> 第一个/最后一个有效价格的位置，无有效价格的ETF为 -1
+    - count: dict 代码 -> 有效价格个数
+    """
+
+    def __init__(self, index, symbols, first, last, count, gaps=None):
+        self.index = index
+        self.symbols = list(symbols)
+        self.first = dict(zip(self.symbols, (int(v) for v in first)))
+        self.last = dict(zip(self.symbols, (int(v) for v in last)))
+        self.count = dict(zip(self.symbols, (int(v) for v in count)))
+        # 区间 [first, last] 内有缺失的ETF：代码 -> 有效行的位置
+        self._gaps = dict(gaps or {})
+
+    @classmethod
+    def from_frame(cls, data, symbols=None):
+        """由价格面板（index为日期，列为ETF代码）扫描一次缺失值生成日历"""
+        symbols = list(data.columns) if symbols is None else list(symbols)
+        valid = data[symbols].notna().to_numpy()
+        n_days = len(valid)
+        count = valid.sum(axis=0)
+        listed = count > 0
+        first = np.where(listed, valid.argmax(axis=0), -1)
+        last = np.where(listed, n_days - 1 - valid[::-1].argmax(axis=0), -1)
+        gaps = {}
+        for j in np.flatnonzero(listed & (count < last - first + 1)):
+            gaps[symbols[j]] = first[j] + np.flatnonzero(valid[first[j]:last[j] + 1, j])
+        return cls(data.index, symbols, first, last, count, gaps)
+
+    def __len__(self):
+        return len(self.index)
+
+    def span(self, code):
+        """代码从第一个到最后一个有效价格的行切片（含停牌日），无数据时为空切片"""
+        if self.first[code] < 0:
+            return slice(0, 0)
+        return slice(self.first[code], self.last[code] + 1)
+
+    def rows(self, code):
+        """代码有效价格所在的行：无停牌时为切片（取数不复制），否则为整数位置数组"""
+        return self._gaps.get(code, self.span(code))
+
+    def has_gaps(self, code):
+        return code in self._gaps
+
+    def valid(self, data, code):
+        """data[code] 中有效价格组成的 pd.Series（与 dropna() 结果相同，但按位置取）"""
+        return data[code].iloc[self.rows(code)]
+
+    def common_span(self, symbols=None):
+        """所有ETF都已上市且尚未停止更新的行切片：[最晚的第一个有效位置, 最早的最后一个有效位置]"""
+        symbols = self.symbols if symbols is None else list(symbols)
+        if not symbols or any(self.first[code] < 0 for code in symbols):
+            return slice(0, 0)
+        start = max(self.first[code] for code in symbols)
+        stop = min(self.last[code] for code in symbols) + 1
+        return slice(start, max(start, stop))
+
+    def first_dates(self):
+        """每只ETF第一个有效价格的日期，pd.Series，无数据的ETF为 NaT"""
+        return pd.Series([self.index[self.first[code]] if self.first[code] >= 0 else pd.NaT
+                          for code in self.symbols], index=self.symbols)
+
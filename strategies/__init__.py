@@ -1 +1,22 @@
-# 策略包初始化文件 
\ No newline at end of file
+# 策略包初始化文件
+import importlib
+
+# 策略注册表：名称 -> (模块, 类名, 策略参数)。只在用到时才导入对应模块
+STRATEGIES = {
+    'macd': ('strategies.macd_strategy', 'MACDStrategy',
+             ('short', 'long', 'signal', 'stop_loss', 'trailing_stop', 'cooldown', 'max_hold')),
+    'momentum': ('strategies.momentum_strategy', 'MomentumStrategy', ('N', 'top_k', 'rank_by', 'weighting')),
+}
+
+
+def load_strategy(name):
+    """按名称导入并返回策略类"""
+    if name not in STRATEGIES:
+        raise ValueError(f"未知策略类型: {name}")
+    module, cls, _ = STRATEGIES[name]
+    return getattr(importlib.import_module(module), cls)
+
+
+def strategy_params(name):
+    """返回策略构造函数接受的参数名"""
+    return STRATEGIES[name][2]
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+from data_manager import get_etf_data
+from quant_part.panel import Panel
+from quant_part.result_cache import result_key
+from quant_part.trading_calendar import TradingCalendar
+from strategies.feature_cache import FEATURE_CACHE, series_version
+
+
+def _daily_returns(prices):
+    return prices / prices.shift(1) - 1.0
+
+
+def _momentum(prices, N):
+    return prices / prices.shift(N) - 1.0
+
+
+def _ema(prices, span):
+    # 输入为只含有效价格的序列（TradingCalendar.valid），与 calculate_macd 对去掉缺失值后的序列计算一致
+    return prices.ewm(span=span, adjust=False).mean()
+
+
+# 特征名 -> 计算函数(价格序列, *参数)
+FEATURES = {
+    'returns': _daily_returns,
+    'momentum': _momentum,
+    'ema': _ema,
+}
+
+
+def cached_feature(prices, name, *params, cache=None, version=None):
+    """
+    计算价格序列的特征并缓存，键为 (prices.name, 特征名, 参数, 数据版本)。
+
+    - 'returns': 日收益率 p/p.shift(1)-1
+    - 'momentum', N: N日涨幅 p/p.shift(N)-1
+    - 'ema', span: ewm(span, adjust=False) 均线，prices 应只含有效价格（见 TradingCalendar.valid）
+
+    version 为调用方已知的数据版本（如整个价格面板的哈希），默认由 series_version(prices) 计算。
+    """
+    cache = cache if cache is not None else FEATURE_CACHE
+    key = (prices.name, name, params, series_version(prices) if version is None else version)
+    return cache.get_or_compute(key, lambda: FEATURES[name](prices, *params))
+
+
+class BaseStrategy:
+    """
+    策略基类：统一的构造参数、数据获取，以及经特征缓存共享的收益率、动量、EMA等特征。
+
+    self.data 只保存收盘价与组合层面的列（信号、轮动策略日收益率、轮动策略净值），
+    每只ETF的中间结果写入 self.panel（ETF × 字段 × 日期 的 Panel），dtype 可选 float32 以节省内存；
+    需要原来的宽表时调用 to_frame()。
+    """
+
+    # 年化系数（一年内的K线根数），非日线数据由子类或实例改为 report_detail.periods_per_year(bar)
+    periods_per_year = 252
+    # 策略逻辑版本号，修改信号或回测逻辑后加1，结果缓存中的旧结果随之失效
+    version = 1
+    # 回测结果缓存保存/恢复的属性
+    RESULT_ATTRS = ('data', 'panel', 'ledger', 'positions', 'metrics')
+
+    def __init__(self, pool_list, etf_names, start_date, end_date, cache=None, dtype=np.float64):
+        self.pool_list = pool_list
+        self.etf_names = etf_names
+        self.start_date = start_date
+        self.end_date = end_date
+        self.data = None
+        self.name_list = pool_list
+        self.cache = cache if cache is not None else FEATURE_CACHE
+        self.dtype = dtype
+        self.panel = None
+        self.ledger = None
+        self.metrics = None
+        self.cache_key = None
+        self._calendar = None
+
+    def fetch_data(self, refresh=True):
+        self.data = get_etf_data(self.pool_list, self.etf_names, self.start_date, self.end_date, refresh=refresh)
+        if self.data is None:
+            print("数据获取失败")
+            exit()
+
+    def set_data(self, data):
+        """
+        使用已加载的价格面板（如 portfolio 中多个策略共享的同一份），只取本策略ETF池的列。
+        pandas 写时复制，策略之后对 self.data 的切片与增删列都不会改动 data。
+        """
+        self.data = data[self.pool_list]
+
+    def params(self):
+        """影响回测结果的策略参数，由子类给出，用于结果缓存的键"""
+        return {}
+
+    def result_key(self):
+        """本策略在当前价格数据上的结果缓存键（见 quant_part.result_cache.result_key）"""
+        cls = type(self)
+        params = dict(self.params(), periods_per_year=self.periods_per_year, dtype=np.dtype(self.dtype).name)
+        return result_key(self.data[self.pool_list], f'{cls.__module__}.{cls.__qualname__}', self.version, params)
+
+    def load_result(self, results):
+        """
+        从结果缓存（ResultCache）恢复回测结果（收盘价与组合收益/净值、面板、成交记录、持仓、绩效指标）。
+        需先取数；命中返回 True，此时无需再计算信号与回测。
+        """
+        # 回测会截掉无信号的日期并增加列，键在回测前按原始数据算好，save_result 沿用
+        self.cache_key = self.result_key()
+        cached = results.get(self.cache_key)
+        if cached is None:
+            return False
+        for attr in self.RESULT_ATTRS:
+            setattr(self, attr, cached.get(attr))
+        print(f"使用缓存的回测结果（{self.data.index[0]} 到 {self.data.index[-1]}），"
+              f"最终净值: {self.data['轮动策略净值'].iloc[-1]:.4f}")
+        return True
+
+    def save_result(self, results):
+        """把回测结果写入结果缓存，键为 load_result 时按回测前数据算出的键"""
+        results.put(self.cache_key, {attr: getattr(self, attr, None) for attr in self.RESULT_ATTRS})
+
+    @property
+    def calendar(self):
+        """self.data 的交易日历与各ETF有效价格位置（TradingCalendar），self.data 换成新的切片后重新生成"""
+        if self._calendar is None or self._calendar.index is not self.data.index:
+            self._calendar = TradingCalendar.from_frame(self.data, self.name_list)
+        return self._calendar
+
+    def feature(self, name, code, *params):
+        """返回 self.data[code] 的特征序列（见 cached_feature），相同数据与参数只计算一次"""
+        return cached_feature(self.data[code], name, *params, cache=self.cache)
+
+    def valid_feature(self, name, code, *params):
+        """
+        在 code 的有效价格上计算特征（如 'ema'），结果只含有效行，
+        按 self.calendar.rows(code) 的整数位置写回全日历数组
+        """
+        return cached_feature(self.calendar.valid(self.data, code), name, *params, cache=self.cache)
+
+    def new_panel(self, fields, aliases=None):
+        """按 self.data 的日期与 self.name_list 新建空面板"""
+        self.panel = Panel(self.name_list, fields, self.data.index, dtype=self.dtype, aliases=aliases)
+        return self.panel
+
+    def to_frame(self):
+        """导出兼容旧版的宽表：self.data 加上面板中的 '<字段>_<ETF代码>' 列"""
+        if self.panel is None:
+            return self.data.copy()
+        return pd.concat([self.data, self.panel.to_frame().reindex(self.data.index)], axis=1)
@@ -0,0 +1,90 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def series_version(series):
+    """
+    价格序列的数据版本：长度、首尾索引，加上数值和与至多64个等距抽样值的哈希。
+    只读一遍数值、不对整段序列做哈希，长历史上查缓存也很快；任意类型的索引都可用。
+    区间变化、追加数据、复权导致的整体变化都会改变版本；只改动中间个别价格且恰好
+    保持数值和不变时检测不到，对此有要求的调用方可向 cached_feature 传入自己的 version。
+    """
+    values = series.to_numpy(dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return (0,)
+    sample = values[np.linspace(0, n - 1, min(n, 64)).astype(np.int64)]
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(sample).tobytes())
+    total, n_nan = values.sum(), 0
+    if np.isnan(total):
+        # 有缺失值（如上市前的 NaN 前缀）时，只对有效值求和并计入缺失个数
+        valid = ~np.isnan(values)
+        total, n_nan = values[valid].sum(), n - int(valid.sum())
+    h.update(np.float64(total).tobytes())
+    h.update(np.int64(n_nan).tobytes())
+    return (n, series.index[0], series.index[-1], h.hexdigest())
+
+
+def _nbytes(value):
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(index=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+    return int(getattr(value, 'nbytes', 0))
+
+
+class FeatureCache:
+    """
+    特征缓存：键为 (代码, 特征名, 参数, 数据版本)，按最近最少使用淘汰。
+
+    参数：
+    - max_bytes: 缓存总大小上限（字节），超过时从最久未使用的特征开始淘汰
+    - max_items: 缓存条目数上限，None 表示不限
+    """
+
+    def __init__(self, max_bytes=256 * 2 ** 20, max_items=None):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def get_or_compute(self, key, compute):
+        """命中则返回缓存值，否则调用 compute() 计算并缓存。返回值为共享对象，调用方不应原地修改"""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key][0]
+            self.misses += 1
+        value = compute()
+        size = _nbytes(value)
+        with self._lock:
+            if key not in self._items and size <= self.max_bytes:
+                self._items[key] = (value, size)
+                self.nbytes += size
+                self._evict()
+        return value
+
+    def _evict(self):
+        while self._items and (self.nbytes > self.max_bytes or
+                               (self.max_items is not None and len(self._items) > self.max_items)):
+            _, (_, size) = self._items.popitem(last=False)
+            self.nbytes -= size
+
+
+# 进程内所有策略共享的默认缓存
+FEATURE_CACHE = FeatureCache()
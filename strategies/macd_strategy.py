@@ -1,39 +1,75 @@
 import numpy as np
 import pandas as pd
 from datetime import datetime
-from data_manager import get_etf_data
-from quant_part.plot_nav import plot_nav
+from strategies.base import BaseStrategy
 from quant_part.report_detail import report_detail
+from quant_part.backtest_core import run_signal_backtest
+from quant_part.ledger import TradeLedger, invested_days
+from quant_part.profiling import span
 
-class MACDStrategy:
-    def __init__(self, pool_list, etf_names, start_date, end_date, short=12, long=26, signal=9):
-        self.pool_list = pool_list
-        self.etf_names = etf_names
-        self.start_date = start_date
-        self.end_date = end_date
+def macd_from_emas(ema_short, ema_long, signal=9):
+    diff = ema_short - ema_long
+    dea = diff.ewm(span=signal, adjust=False).mean()
+    macd = 2 * (diff - dea)
+    return pd.DataFrame({'diff': diff, 'dea': dea, 'macd': macd})
+
+def calculate_macd(price_series, short=12, long=26, signal=9):
+    if len(price_series) < long:
+        return pd.DataFrame(columns=['diff', 'dea', 'macd'])
+    ema_short = price_series.ewm(span=short, adjust=False).mean()
+    ema_long = price_series.ewm(span=long, adjust=False).mean()
+    return macd_from_emas(ema_short, ema_long, signal)
+
+def cross_signals(macd_df):
+    """DIFF上穿DEA为金叉(1)，下穿为死叉(-1)，其余为0"""
+    golden_cross = ((macd_df['diff'] > macd_df['dea']) & (macd_df['diff'].shift(1) <= macd_df['dea'].shift(1)))
+    death_cross = ((macd_df['diff'] < macd_df['dea']) & (macd_df['diff'].shift(1) >= macd_df['dea'].shift(1)))
+    signals = pd.Series(0, index=macd_df.index)
+    signals.loc[golden_cross] = 1
+    signals.loc[death_cross] = -1
+    return signals
+
+def macd_signals(price_series, short=12, long=26, signal=9):
+    """
+    计算单只ETF的MACD金叉/死叉信号（不打印、不修改任何数据）。
+
+    返回：
+    - (signals, macd_df)：signals 取值 1(金叉)/-1(死叉)/0，index与 price_series 一致；
+      数据不足时 signals 为 None
+    """
+    macd_df = calculate_macd(price_series, short, long, signal)
+    if macd_df.empty or len(macd_df) < 2:
+        return None, macd_df
+    return cross_signals(macd_df), macd_df
+
+# 每只ETF写入面板的字段；涨幅 即日收益率，只存一份；权重 为每日收盘后的持仓权重
+MACD_FIELDS = ('信号', 'diff', 'dea', 'macd', '日收益率', '权重')
+MACD_ALIASES = {'涨幅': '日收益率'}
+
+class MACDStrategy(BaseStrategy):
+    """
+    MACD金叉买入、死叉卖出，每只ETF等权分配资金。
+
+    可选风控规则（0 为不启用）：stop_loss 止损比例、trailing_stop 移动止损比例、
+    cooldown 平仓后的冷却交易日数、max_hold 最长持仓交易日数，由 kernels.risk_positions 计算持仓。
+    """
+
+    def __init__(self, pool_list, etf_names, start_date, end_date, short=12, long=26, signal=9, cache=None,
+                 dtype=np.float64, stop_loss=0.0, trailing_stop=0.0, cooldown=0, max_hold=0):
+        super().__init__(pool_list, etf_names, start_date, end_date, cache, dtype)
         self.short = short
         self.long = long
         self.signal = signal
-        self.data = None
-        self.name_list = pool_list
+        rules = {'stop_loss': stop_loss, 'trailing_stop': trailing_stop, 'cooldown': cooldown, 'max_hold': max_hold}
+        self.rules = {name: value for name, value in rules.items() if value}
         self.positions = {code: 0 for code in pool_list}
         self.weight_per_etf = 1.0 / len(pool_list)
 
-    def fetch_data(self):
-        self.data = get_etf_data(self.pool_list, self.etf_names, self.start_date, self.end_date)
-        if self.data is None:
-            print("数据获取失败")
-            exit()
+    def params(self):
+        return {'short': self.short, 'long': self.long, 'signal': self.signal, 'rules': self.rules}
 
     def calculate_macd(self, price_series, short=12, long=26, signal=9):
-        if len(price_series) < long:
-            return pd.DataFrame(columns=['diff', 'dea', 'macd'])
-        ema_short = price_series.ewm(span=short, adjust=False).mean()
-        ema_long = price_series.ewm(span=long, adjust=False).mean()
-        diff = ema_short - ema_long
-        dea = diff.ewm(span=signal, adjust=False).mean()
-        macd = 2 * (diff - dea)
-        return pd.DataFrame({'diff': diff, 'dea': dea, 'macd': macd})
+        return calculate_macd(price_series, short, long, signal)
 
     def generate_macd_signals(self):
         print(f"正在计算MACD信号... (参数: {self.short}, {self.long}, {self.signal})")
@@ -41,94 +77,76 @@ class MACDStrategy:
         if len(self.data) < min_required_days:
             print(f"警告: 数据不足，需要至少{min_required_days}天数据，当前只有{len(self.data)}天")
             print("建议调整开始日期或MACD参数")
+        panel = self.new_panel(MACD_FIELDS, MACD_ALIASES)
+        panel['信号'] = 0
+        calendar = self.calendar
         for code in self.name_list:
-            price_series = self.data[code].dropna()
-            macd_df = self.calculate_macd(price_series, self.short, self.long, self.signal)
-            if macd_df.empty or len(macd_df) < 2:
+            if calendar.count[code] < max(self.long, 2):
                 print(f"警告: {code} 数据不足，无法计算MACD")
-                self.data[f'信号_{code}'] = 0
-                self.data[f'diff_{code}'] = np.nan
-                self.data[f'dea_{code}'] = np.nan
-                self.data[f'macd_{code}'] = np.nan
                 continue
-            signals = pd.Series(0, index=price_series.index)
-            if len(macd_df) >= 2:
-                golden_cross = ((macd_df['diff'] > macd_df['dea']) & (macd_df['diff'].shift(1) <= macd_df['dea'].shift(1)))
-                death_cross = ((macd_df['diff'] < macd_df['dea']) & (macd_df['diff'].shift(1) >= macd_df['dea'].shift(1)))
-                signals.loc[golden_cross] = 1
-                signals.loc[death_cross] = -1
-            self.data[f'信号_{code}'] = signals.reindex(self.data.index, fill_value=0)
-            self.data[f'diff_{code}'] = macd_df['diff'].reindex(self.data.index)
-            self.data[f'dea_{code}'] = macd_df['dea'].reindex(self.data.index)
-            self.data[f'macd_{code}'] = macd_df['macd'].reindex(self.data.index)
+            # 指标在有效价格上计算（上市前与停牌日不参与），EMA 经特征缓存在不同参数组合、不同策略间共享
+            macd_df = macd_from_emas(self.valid_feature('ema', code, self.short),
+                                     self.valid_feature('ema', code, self.long), self.signal)
+            signals = cross_signals(macd_df)
+            # 按有效行的整数位置写回面板，其余日期信号为0、指标为 NaN
+            rows = calendar.rows(code)
+            panel['信号', code][rows] = signals.to_numpy()
+            for field in ('diff', 'dea', 'macd'):
+                panel[field, code][rows] = macd_df[field].to_numpy()
             buy_signals = (signals == 1).sum()
             sell_signals = (signals == -1).sum()
             print(f"{code}: 买入信号{buy_signals}次, 卖出信号{sell_signals}次")
 
     def calculate_returns(self):
         for code in self.name_list:
-            self.data[f'日收益率_{code}'] = self.data[code].pct_change().fillna(0)
-            self.data[f'涨幅_{code}'] = self.data[code].pct_change().fillna(0)
+            self.panel['日收益率', code] = self.feature('returns', code).fillna(0)
 
     def run_strategy(self):
         print("开始运行MACD策略...")
-        self.generate_macd_signals()
-        self.calculate_returns()
-        signal_cols = [f'信号_{code}' for code in self.name_list]
-        self.data = self.data.dropna(subset=signal_cols)
+        self.metrics = None
+        with span('signals'):
+            self.generate_macd_signals()
+            self.calculate_returns()
+        valid = ~np.isnan(self.panel['信号']).any(axis=0)
+        self.data = self.data[valid]
+        self.panel = self.panel.take(valid)
         if self.data.empty:
             print("错误: 处理后数据为空")
             return
-        portfolio_returns = []
-        active_signals = []
         print(f"回测数据范围: {self.data.index[0]} 到 {self.data.index[-1]}")
         print(f"每个ETF分配权重: {self.weight_per_etf:.4f}")
-        for date in self.data.index:
-            daily_return = 0.0
-            current_holdings = []
-            for code in self.name_list:
-                signal = self.data.loc[date, f'信号_{code}']
-                price_return = self.data.loc[date, f'日收益率_{code}']
-                if signal == 1:
-                    if self.positions[code] == 0:
-                        self.positions[code] = 1
-                        print(f"{date.date()} {code} MACD金叉买入")
-                elif signal == -1:
-                    if self.positions[code] == 1:
-                        self.positions[code] = 0
-                        print(f"{date.date()} {code} MACD死叉卖出")
-                if self.positions[code] == 1:
-                    daily_return += self.weight_per_etf * price_return
-                    current_holdings.append(code)
-            portfolio_returns.append(daily_return)
-            active_signals.append(','.join(current_holdings) if current_holdings else 'Cash')
-        self.data['轮动策略日收益率'] = portfolio_returns
-        self.data['信号'] = active_signals
-        self.data['轮动策略净值'] = (1.0 + self.data['轮动策略日收益率']).cumprod()
+        initial = [self.positions[code] for code in self.name_list]
+        with span('backtest'):
+            daily_returns, holdings, positions = run_signal_backtest(
+                self.panel.frame('信号'), self.panel.frame('日收益率'), self.name_list, self.weight_per_etf, initial,
+                prices=self.data[self.name_list], rules=self.rules)
+            self.positions = {code: int(positions[code].iloc[-1]) for code in self.name_list}
+            self.panel['权重'] = positions.to_numpy().T * self.weight_per_etf
+            self.ledger = TradeLedger.from_weights(self.panel['权重'].T, self.data[self.name_list].to_numpy(),
+                                                   self.data.index, self.name_list,
+                                                   np.asarray(initial) * self.weight_per_etf)
+            self.data['轮动策略日收益率'] = daily_returns
+            self.data['信号'] = holdings
+            self.data['轮动策略净值'] = (1.0 + self.data['轮动策略日收益率']).cumprod()
         print(f"策略回测完成！")
         print(f"最终净值: {self.data['轮动策略净值'].iloc[-1]:.4f}")
         print(f"总收益率: {(self.data['轮动策略净值'].iloc[-1] - 1.0) * 100:.2f}%")
 
     def show_latest_signals(self):
-        signal_cols = [f'信号_{code}' for code in self.name_list]
-        if not all(col in self.data.columns for col in signal_cols):
+        if self.panel is None or '信号' not in self.panel:
             print("MACD信号尚未生成，请先运行策略")
             return
         print(f"\n最新MACD信号状态:")
-        latest_date = self.data.index[-1]
         for i, code in enumerate(self.name_list):
             try:
                 etf_name = self.etf_names[i]
             except:
                 etf_name = "未知ETF"
-            signal = self.data.loc[latest_date, f'信号_{code}']
+            signal = self.panel['信号', code][-1]
             position = self.positions[code]
-            if f'diff_{code}' in self.data.columns:
-                diff = self.data.loc[latest_date, f'diff_{code}']
-                dea = self.data.loc[latest_date, f'dea_{code}']
-                diff_text = f"DIFF:{diff:.4f} DEA:{dea:.4f}"
-            else:
-                diff_text = "MACD数据未计算"
+            diff = self.panel['diff', code][-1]
+            dea = self.panel['dea', code][-1]
+            diff_text = f"DIFF:{diff:.4f} DEA:{dea:.4f}"
             signal_text = "金叉买入" if signal == 1 else "死叉卖出" if signal == -1 else "无信号"
             position_text = "持仓" if position == 1 else "空仓"
             print(f"{code}({etf_name}): {signal_text} | {position_text} | {diff_text}")
@@ -136,13 +154,14 @@ class MACDStrategy:
     def show_results(self):
         print("\n策略统计信息:")
         total_days = len(self.data)
-        holding_days = len(self.data[self.data['信号'] != 'Cash'])
+        holding_days = invested_days(self.panel['权重'].T)
         holding_ratio = holding_days / total_days * 100
         print(f"总交易日数: {total_days}")
         print(f"持仓日数: {holding_days}")
         print(f"持仓比例: {holding_ratio:.2f}%")
         self.show_latest_signals()
-        report_detail(self.data, self.pool_list, self.etf_names)
+        self.metrics = report_detail(self.data, self.pool_list, self.etf_names, panel=self.panel,
+                                     periods_per_year=self.periods_per_year, metrics=self.metrics)
 
     def calculate_momentum(self):
         pass
@@ -1,28 +1,44 @@
 import numpy as np
 import pandas as pd
 from datetime import datetime
-from data_manager import get_etf_data
-from quant_part.plot_nav import plot_nav
+from strategies.base import BaseStrategy
+from quant_part.backtest_core import select_top_k, gather_returns, weight_matrix, holdings_labels
+from quant_part.ledger import TradeLedger
+from quant_part.profiling import profiled
 from quant_part.report_detail import report_detail
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score
+from quant_part.rolling_score import rolling_score
 
-class MomentumStrategy:
-    def __init__(self, pool_list, etf_names, start_date, end_date, N=20):
-        self.pool_list = pool_list
-        self.etf_names = etf_names
-        self.start_date = start_date
-        self.end_date = end_date
+# 每只ETF写入面板的字段
+MOMENTUM_FIELDS = ('日收益率', '涨幅', '得分', '权重')
+
+class MomentumStrategy(BaseStrategy):
+    """
+    动量轮动：每日按前一日的 涨幅（N日涨幅）或 得分（N日斜率得分）排名，持有前 top_k 只ETF。
+
+    - top_k: 持有ETF数，默认1（只持有第一名）
+    - rank_by: 排名依据，'涨幅' 或 '得分'
+    - weighting: 'equal' 等权，'score' 按排名依据的正值加权
+    """
+
+    def __init__(self, pool_list, etf_names, start_date, end_date, N=20, top_k=1, rank_by='涨幅',
+                 weighting='equal', cache=None, dtype=np.float64):
+        super().__init__(pool_list, etf_names, start_date, end_date, cache, dtype)
+        if rank_by not in ('涨幅', '得分'):
+            raise ValueError(f"未知排名依据: {rank_by}")
+        if weighting not in ('equal', 'score'):
+            raise ValueError(f"未知权重方式: {weighting}")
         self.N = N
-        self.data = None
-        self.name_list = pool_list
+        self.top_k = top_k
+        self.rank_by = rank_by
+        self.weighting = weighting
 
-    def fetch_data(self):
-        self.data = get_etf_data(self.pool_list, self.etf_names, self.start_date, self.end_date)
-        if self.data is None:
-            exit()
+    def params(self):
+        return {'N': self.N, 'top_k': self.top_k, 'rank_by': self.rank_by, 'weighting': self.weighting}
 
     def calculate_score(self, srs, N=25):
+        # 逐窗口回归的参考实现，仅在调用时导入 sklearn
+        from sklearn.linear_model import LinearRegression
+        from sklearn.metrics import r2_score
         if srs.shape[0] < N:
             return np.nan
         x = np.arange(1, N+1)
@@ -38,41 +54,58 @@ class MomentumStrategy:
         return score
 
     def show_latest_momentum(self):
-        momentum_cols = ['涨幅_'+v for v in self.name_list]
-        latest_momentum = self.data[momentum_cols].iloc[-1]
+        latest_momentum = self.panel['涨幅'][:, -1]
         print(f"\n最新的{self.N}日动量数据:")
-        for i, col in enumerate(momentum_cols):
-            etf_code = col.replace('涨幅_', '')
-            N = self.N
+        for etf_code, momentum in zip(self.name_list, latest_momentum):
             try:
                 etf_name = self.etf_names[self.pool_list.index(etf_code)]
             except ValueError:
                 etf_name = "未知ETF"
-            print(f"{etf_code}({etf_name}): {latest_momentum[col]:.4f} ({latest_momentum[col]*100:.2f}%)")
+            print(f"{etf_code}({etf_name}): {momentum:.4f} ({momentum*100:.2f}%)")
 
+    @profiled('signals')
     def calculate_momentum(self):
         N = self.N if hasattr(self, 'N') else 25
+        # 排名需要所有ETF都有价格，先截到全部上市后的区间，上市前的 NaN 前缀不参与计算
+        self.data = self.data.iloc[self.calendar.common_span()]
+        panel = self.new_panel(MOMENTUM_FIELDS)
+        panel['得分'] = rolling_score(self.data[self.name_list], N)
         for name in self.name_list:
-            self.data['日收益率_'+name] = self.data[name] / self.data[name].shift(1) - 1.0
-            self.data['涨幅_'+name] = self.data[name] / self.data[name].shift(N) - 1.0
-            self.data['得分_'+name] = self.data[name].rolling(N).apply(lambda x: self.calculate_score(x, N))
-        relevant_cols = ['得分_'+v for v in self.name_list] + ['涨幅_'+v for v in self.name_list]
-        self.data = self.data.dropna(subset=relevant_cols)
+            panel['日收益率', name] = self.feature('returns', name)
+            panel['涨幅', name] = self.feature('momentum', name, N)
+        valid = ~(np.isnan(panel['得分']).any(axis=0) | np.isnan(panel['涨幅']).any(axis=0))
+        self.data = self.data[valid]
+        self.panel = panel.take(valid)
         print(f"\n各ETF的{N}日斜率得分（前10行）:")
-        print(self.data[['得分_'+v for v in self.name_list]].head(10))
+        print(self.panel.to_frame(['得分']).head(10))
         print(f"\n各ETF的{N}日动量涨幅（前10行）:")
-        print(self.data[['涨幅_'+v for v in self.name_list]].head(10))
+        print(self.panel.to_frame(['涨幅']).head(10))
         print(f"\n各ETF的{N}日动量统计信息:")
-        print(self.data[['涨幅_'+v for v in self.name_list]].describe())
+        print(self.panel.to_frame(['涨幅']).describe())
 
+    @profiled('backtest')
     def run_strategy(self):
-        momentum_cols = ['涨幅_'+v for v in self.name_list]
-        self.data['信号'] = self.data[momentum_cols].idxmax(axis=1).str.replace('涨幅_', '')
-        self.data['信号'] = self.data['信号'].shift(1)
-        self.data = self.data.dropna()
-        self.data['轮动策略日收益率'] = self.data.apply(lambda x: x['日收益率_'+x['信号']], axis=1)
-        self.data.loc[self.data.index[0],'轮动策略日收益率'] = 0.0
+        self.metrics = None
+        # 第 t-1 日收盘后的排名决定第 t 日的持仓，按位置直接取持仓ETF的日收益率
+        picks, weights = select_top_k(self.panel[self.rank_by].T, self.top_k, self.weighting)
+        returns = self.panel['日收益率'].T
+        valid = (np.arange(len(self.data)) > 0) & ~np.isnan(returns).any(axis=1)
+        valid &= self.data[self.name_list].notna().all(axis=1).to_numpy()
+        rows = np.flatnonzero(valid)
+        picks, weights = picks[rows - 1], weights[rows - 1]
+        self.data = self.data[valid].copy()
+        self.panel = self.panel.take(valid)
+        weights_by_code = weight_matrix(picks, weights, len(self.name_list))
+        self.panel['权重'] = weights_by_code.T
+        # 第 t 日的持仓在第 t-1 日收盘后决定，成交记在第 t-1 日（首日收益记0，其权重不成交）
+        self.ledger = TradeLedger.from_weights(weights_by_code[1:], self.data[self.name_list].to_numpy()[:-1],
+                                               self.data.index[:-1], self.name_list)
+        self.data['信号'] = holdings_labels(weights_by_code > 0, self.name_list).tolist()
+        daily_returns = gather_returns(self.panel['日收益率'].T, picks, weights)
+        daily_returns[:1] = 0.0
+        self.data['轮动策略日收益率'] = daily_returns
         self.data['轮动策略净值'] = (1.0 + self.data['轮动策略日收益率']).cumprod()
 
     def show_results(self):
-        report_detail(self.data, self.pool_list, self.etf_names) 
\ No newline at end of file
+        self.metrics = report_detail(self.data, self.pool_list, self.etf_names, panel=self.panel,
+                                     periods_per_year=self.periods_per_year, metrics=self.metrics) 
\ No newline at end of file
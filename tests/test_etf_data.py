@@ -0,0 +1,101 @@
+import time
+
+import pandas as pd
+import pytest
+
+from quant_part import etf_data
+from quant_part.etf_data import ETFFetcher, RateLimiter, is_transient
+
+requests = pytest.importorskip('requests')
+
+
+def _frame(symbol):
+    return pd.DataFrame({'日期': ['2024-01-02', '2024-01-03'], '收盘': [1.0, 1.1]})
+
+
+class StubSource:
+    """按顺序抛出 errors 中的异常，之后返回正常数据；记录每次调用的时间"""
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.calls = []
+
+    def __call__(self, symbol, period, start_date, end_date, adjust):
+        self.calls.append(time.monotonic())
+        if self.errors:
+            raise self.errors.pop(0)
+        return _frame(symbol)
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status}", response=response)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(etf_data.time, 'sleep', recorded.append)
+    return recorded
+
+
+@pytest.mark.parametrize('error, expected', [
+    (requests.ConnectionError("reset"), True),
+    (requests.Timeout("timeout"), True),
+    (ConnectionResetError(), True),
+    (TimeoutError(), True),
+    (_http_error(429), True),
+    (_http_error(503), True),
+    (_http_error(404), False),
+    (ImportError("No module named 'akshare'"), False),
+    (KeyError('收盘'), False),
+    (ValueError("bad"), False),
+])
+def test_is_transient(error, expected):
+    assert is_transient(error) is expected
+
+
+def test_transient_errors_retried_with_backoff(sleeps):
+    source = StubSource([requests.ConnectionError("reset"), _http_error(429)])
+    fetcher = ETFFetcher(source=source, rate=0, retries=3, backoff=0.5)
+    series, message = fetcher.fetch_symbol('510300', '20240101', '20240105')
+    assert len(series) == 2 and len(source.calls) == 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_gives_up_after_retries(sleeps):
+    source = StubSource([requests.Timeout("timeout")] * 10)
+    fetcher = ETFFetcher(source=source, rate=0, retries=2, backoff=0.5)
+    series, message = fetcher.fetch_symbol('510300', '20240101', '20240105')
+    assert series is None and '已重试2次' in message
+    assert len(source.calls) == 3 and sleeps == [0.5, 1.0]
+
+
+@pytest.mark.parametrize('error', [ImportError("No module named 'akshare'"), KeyError('收盘')])
+def test_other_errors_raised_immediately(sleeps, error):
+    source = StubSource([error])
+    fetcher = ETFFetcher(source=source, rate=0, retries=3, backoff=0.5)
+    with pytest.raises(type(error)):
+        fetcher.fetch_symbol('510300', '20240101', '20240105')
+    assert len(source.calls) == 1 and sleeps == []
+
+
+def test_rate_limit_spaces_requests():
+    rate = 50.0
+    source = StubSource()
+    fetcher = ETFFetcher(source=source, max_workers=4, rate=rate)
+    codes = [f'51030{i}' for i in range(8)]
+    data = fetcher.fetch(codes, codes, '20240101', '20240105')
+    assert list(data.columns) == codes
+    calls = sorted(source.calls)
+    assert calls[-1] - calls[0] >= (len(codes) - 1) / rate * 0.95
+
+
+def test_rate_limiter_interval():
+    limiter = RateLimiter(100.0)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.wait()
+    assert time.monotonic() - start >= 5 / 100.0 * 0.95
+    assert RateLimiter(0).interval == 0.0
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategies.base import cached_feature
+from strategies.feature_cache import FeatureCache, series_version
+
+
+def _series(index):
+    return pd.Series(np.linspace(1.0, 2.0, len(index)), index=index, name='510300')
+
+
+@pytest.mark.parametrize('index', [
+    pd.date_range('2024-01-01', periods=300),
+    pd.RangeIndex(300),
+    pd.Index([f'd{i:03d}' for i in range(300)]),
+])
+def test_cached_feature_any_index(index):
+    cache = FeatureCache()
+    prices = _series(index)
+    first = cached_feature(prices, 'ema', 12, cache=cache)
+    again = cached_feature(prices.copy(), 'ema', 12, cache=cache)
+    assert again is first and (cache.hits, cache.misses) == (1, 1)
+
+
+def test_series_version_changes_with_data():
+    prices = _series(pd.date_range('2024-01-01', periods=300))
+    version = series_version(prices)
+    assert series_version(prices.copy()) == version
+    assert series_version(prices.iloc[1:]) != version  # 区间变化
+    assert series_version(prices * 0.98) != version  # 复权后整体变化
+    edited = prices.copy()
+    edited.iloc[150] += 0.01  # 中间单个价格变化
+    assert series_version(edited) != version
+    gap = prices.copy()
+    gap.iloc[10:20] = np.nan
+    assert series_version(gap) != version
+    assert series_version(prices.iloc[:0]) == (0,)
+
+
+def test_cached_feature_explicit_version():
+    cache = FeatureCache()
+    prices = _series(pd.date_range('2024-01-01', periods=50))
+    first = cached_feature(prices, 'ema', 5, cache=cache, version='v1')
+    assert cached_feature(prices * 2, 'ema', 5, cache=cache, version='v1') is first
+    assert cached_feature(prices, 'ema', 5, cache=cache, version='v2') is not first
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from quant_part.backtest_core import signals_to_positions
+from quant_part.kernels import HAS_NUMBA, risk_positions
+
+RULES = [
+    {},
+    {'stop_loss': 0.05},
+    {'trailing_stop': 0.08, 'cooldown': 3},
+    {'stop_loss': 0.03, 'trailing_stop': 0.05, 'cooldown': 5, 'max_hold': 10},
+    {'max_hold': 1},
+]
+
+
+def _random_inputs(seed, n_days=300, n_codes=6):
+    """随机信号（1/0/-1）与随机游走价格，部分ETF带上市前 NaN 前缀与零星缺失"""
+    rng = np.random.default_rng(seed)
+    signals = rng.choice([1, 0, 0, 0, -1], size=(n_days, n_codes)).astype(np.int8)
+    prices = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, n_codes)), axis=0))
+    prices[:40, 1] = np.nan
+    prices[rng.random((n_days, n_codes)) < 0.02] = np.nan
+    initial = rng.random(n_codes) < 0.5
+    return signals, prices, initial
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+@pytest.mark.parametrize('rules', RULES)
+@pytest.mark.parametrize('engine', [
+    'numpy',
+    pytest.param('numba', marks=pytest.mark.skipif(not HAS_NUMBA, reason="未安装 numba")),
+])
+def test_engines_identical(seed, rules, engine):
+    signals, prices, initial = _random_inputs(seed)
+    expected = risk_positions(signals, prices, initial=initial, engine='python', **rules)
+    result = risk_positions(signals, prices, initial=initial, engine=engine, **rules)
+    np.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_no_rules_equals_signals_to_positions(seed):
+    signals, prices, initial = _random_inputs(seed)
+    for engine in ('python', 'numpy'):
+        result = risk_positions(signals, prices, initial=initial, engine=engine)
+        np.testing.assert_array_equal(result, signals_to_positions(signals, initial))
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_part.macd_stream import MACDStream
+from strategies.macd_strategy import calculate_macd, cross_signals
+
+PARAMS = [(12, 26, 9), (5, 35, 5)]
+
+
+def _prices(n_days=400, n_codes=3, seed=0):
+    """随机游走收盘价，第二只ETF带上市前 NaN 前缀，第三只有停牌日"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2020-01-01', periods=n_days)
+    values = 3 * np.exp(np.cumsum(rng.normal(0, 0.015, (n_days, n_codes)), axis=0))
+    prices = pd.DataFrame(values, index=index, columns=[f'51030{j}' for j in range(n_codes)])
+    prices.iloc[:60, 1] = np.nan
+    prices.iloc[rng.choice(np.arange(100, n_days), 20, replace=False), 2] = np.nan
+    return prices
+
+
+def _expected(series, short, long, signal):
+    valid = series.dropna()
+    macd_df = calculate_macd(valid, short, long, signal)
+    macd_df['信号'] = cross_signals(macd_df)
+    return macd_df
+
+
+def _assert_matches(result, expected):
+    np.testing.assert_array_equal(result.index, expected.index)
+    np.testing.assert_allclose(result[['diff', 'dea', 'macd']].to_numpy(dtype=np.float64),
+                               expected[['diff', 'dea', 'macd']].to_numpy(dtype=np.float64), rtol=1e-10, atol=1e-12)
+    np.testing.assert_array_equal(result['信号'].to_numpy(dtype=np.int64), expected['信号'].to_numpy(dtype=np.int64))
+
+
+@pytest.mark.parametrize('short, long, signal', PARAMS)
+def test_feed_matches_calculate_macd(short, long, signal):
+    prices = _prices()
+    stream = MACDStream(short, long, signal)
+    for code in prices.columns:
+        _assert_matches(stream.feed(code, prices[code]), _expected(prices[code], short, long, signal))
+
+
+@pytest.mark.parametrize('short, long, signal', PARAMS)
+def test_update_many_across_save_load(tmp_path, short, long, signal):
+    prices = _prices(seed=1)
+    split = 250
+    stream = MACDStream(short, long, signal)
+    rows = {code: {} for code in prices.columns}
+
+    def run(stream, dates):
+        for date in dates:
+            out = stream.update_many(prices.loc[date], date)
+            for code, row in out.iterrows():
+                rows[code][date] = row
+
+    run(stream, prices.index[:split])
+    path = tmp_path / 'macd_state.npz'
+    stream.save(path)
+    restored = MACDStream.load(path)
+    assert (restored.short, restored.long, restored.signal) == (short, long, signal)
+    # 重复喂入已处理的日期会被忽略
+    assert restored.update_many(prices.loc[prices.index[split - 1]], prices.index[split - 1]).empty
+    run(restored, prices.index[split:])
+    for code in prices.columns:
+        result = pd.DataFrame.from_dict(rows[code], orient='index')
+        _assert_matches(result, _expected(prices[code], short, long, signal))
@@ -0,0 +1,135 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_manager
+from price_store import PriceStore
+
+
+def _panel(codes=('510300', '510880'), start='2024-01-01', periods=20, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(start, periods=periods)
+    data = pd.DataFrame(10 * np.exp(np.cumsum(rng.normal(0, 0.01, (periods, len(codes))), axis=0)),
+                        index=index, columns=list(codes))
+    data.iloc[:3, -1] = np.nan
+    return data
+
+
+def _assert_same(left, right):
+    """比较日期索引、列与数值（价格库按纳秒精度返回日期，构造数据的精度可能不同）"""
+    assert list(left.columns) == list(right.columns)
+    np.testing.assert_array_equal(left.index.values.astype('datetime64[D]'), right.index.values.astype('datetime64[D]'))
+    np.testing.assert_allclose(left.to_numpy(), right.to_numpy(), equal_nan=True)
+
+
+def _expected(store_before, data):
+    columns = list(store_before.columns) + [c for c in data.columns if c not in store_before.columns]
+    return data.combine_first(store_before)[columns]
+
+
+def test_merge_appends_in_place(tmp_path):
+    store = PriceStore(str(tmp_path))
+    full = _panel(periods=30)
+    store.write(full.iloc[:20])
+    inode = os.stat(tmp_path / 'prices.npy').st_ino
+    before = store.read()
+    tail = full.iloc[19:].copy()
+    tail.iloc[0, 0] = np.nan  # 新数据为 NaN 处保留原值
+    store.merge(tail)
+    assert os.stat(tmp_path / 'prices.npy').st_ino == inode  # 原地写入，没有整体重写
+    result = store.read()
+    _assert_same(result, _expected(before, tail))
+    assert store.last_dates()['510300'] == full.index[-1]
+    _assert_same(store.read('2024-01-25', '2024-02-05'), result.loc['2024-01-25':'2024-02-05'])
+
+
+def test_merge_new_symbol_rewrites(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.write(_panel(periods=20))
+    before = store.read()
+    extra = _panel(codes=('159915',), periods=25, seed=1)
+    store.merge(extra)
+    _assert_same(store.read(), _expected(before, extra))
+
+
+def test_merge_old_format_store(tmp_path):
+    # 旧版本价格库：没有预留空位，meta.json 只有 symbols
+    data = _panel(periods=20)
+    np.save(tmp_path / 'dates.npy', data.index.values.astype('datetime64[D]'))
+    np.save(tmp_path / 'prices.npy', np.ascontiguousarray(data.to_numpy().T))
+    with open(tmp_path / 'meta.json', 'w') as f:
+        json.dump({'symbols': list(data.columns)}, f)
+    store = PriceStore(str(tmp_path))
+    assert store.last_dates()['510880'] == data.index[-1]
+    tail = _panel(start='2024-01-29', periods=5, seed=2)
+    store.merge(tail)
+    _assert_same(store.read(), _expected(data, tail))
+
+
+class FakeSource:
+    """替代 fetch_etf_data：从完整面板中按日期切片返回，记录每次请求"""
+
+    def __init__(self, panel):
+        self.panel = panel
+        self.calls = []
+
+    def __call__(self, pool_list, etf_names, start_date, end_date):
+        self.calls.append((tuple(pool_list), start_date, end_date))
+        data = self.panel.loc[pd.Timestamp(start_date):pd.Timestamp(end_date), list(pool_list)].dropna(how='all')
+        return data if len(data) else None
+
+
+@pytest.fixture
+def source(monkeypatch):
+    def install(panel):
+        fake = FakeSource(panel)
+        monkeypatch.setattr(data_manager, 'fetch_etf_data', fake)
+        return fake
+    return install
+
+
+def test_update_store_holiday_checked_once(tmp_path, source):
+    full = _panel(periods=20)  # 最后一天 2024-01-26（周五）
+    store = PriceStore(str(tmp_path))
+    store.write(full)
+    fake = source(full)
+    # 2024-01-29（周一）收盘后：数据源没有这一天，当作节假日
+    holiday = datetime(2024, 1, 29, 16)
+    assert data_manager.update_store(store, list(full.columns), list(full.columns), now=holiday) == []
+    assert len(fake.calls) == 1
+    data_manager.update_store(store, list(full.columns), list(full.columns), now=holiday)
+    assert len(fake.calls) == 1  # 已确认过，不再联网
+    _assert_same(store.read(), full)
+
+
+def test_update_store_missing_overlap_appends(tmp_path, source):
+    full = _panel(periods=25)
+    store = PriceStore(str(tmp_path))
+    store.write(full.iloc[:20])
+    served = full.copy()
+    served.iloc[19, 0] = np.nan  # 数据源缺少重叠日
+    fake = source(served)
+    now = datetime.combine(full.index[-1].date(), datetime.min.time()).replace(hour=16)
+    updated = data_manager.update_store(store, list(full.columns), list(full.columns), now=now)
+    assert updated == ['510300', '510880']
+    assert all(start != data_manager.HISTORY_START for _, start, _ in fake.calls)  # 没有重下全部历史
+    _assert_same(store.read(), full)
+
+
+def test_update_store_adjusted_price_change_redownloads(tmp_path, source):
+    full = _panel(periods=25)
+    store = PriceStore(str(tmp_path))
+    store.write(full.iloc[:20])
+    adjusted = full.copy()
+    adjusted['510300'] *= 0.9  # 除权后前复权价整体变化
+    fake = source(adjusted)
+    now = datetime.combine(full.index[-1].date(), datetime.min.time()).replace(hour=16)
+    data_manager.update_store(store, list(full.columns), list(full.columns), now=now)
+    assert (('510300',), data_manager.HISTORY_START, full.index[-1].strftime('%Y%m%d')) in fake.calls
+    result = store.read()
+    _assert_same(result[['510300']], adjusted[['510300']])
+    _assert_same(result[['510880']], full[['510880']])
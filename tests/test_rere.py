@@ -0,0 +1,106 @@
+import os
+
+import pandas as pd
+import pytest
+
+from quant_part.etf_data import RateLimiter
+from quant_part.rere import RequestsTransport, fetch_okx_candles
+
+START, END, STEP = "2024-01-01", "2024-01-11", 3600 * 1000  # 10天的1小时K线，共240根
+
+
+class Killed(BaseException):
+    """模拟进程被杀：不是 Exception，不会被下载函数的重试捕获"""
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """
+    模拟 OKX history-candles 接口的 requests.Session：按 after 参数向前分页返回降序K线。
+    kill_after: 成功返回这么多页后抛出 Killed；rate_limit_every: 每第几个请求返回限流错误码 50011
+    """
+
+    def __init__(self, kill_after=None, rate_limit_every=0):
+        start = int(pd.Timestamp(START).timestamp() * 1000)
+        end = int(pd.Timestamp(END).timestamp() * 1000)
+        self.ts = list(range(end - STEP, start - 1, -STEP))
+        self.kill_after = kill_after
+        self.rate_limit_every = rate_limit_every
+        self.requests = 0
+        self.pages = 0
+
+    def get(self, url, params, timeout):
+        self.requests += 1
+        if self.rate_limit_every and self.requests % self.rate_limit_every == 0:
+            return FakeResponse({"code": "50011", "msg": "Too Many Requests", "data": []})
+        if self.kill_after is not None and self.pages >= self.kill_after:
+            raise Killed()
+        self.pages += 1
+        page = [t for t in self.ts if t < int(params["after"])][:int(params["limit"])]
+        data = [[str(t), "1", "2", "0.5", str(t % 97), "10", "10", "10", "1"] for t in page]
+        return FakeResponse({"code": "0", "msg": "", "data": data})
+
+
+def _fetch(out_dir, session, **kwargs):
+    transport = RequestsTransport()
+    transport._session = session
+    return fetch_okx_candles("BTC-USDT", START, END, bar="1H", out_dir=str(out_dir), transport=transport,
+                             limiter=RateLimiter(0), limit=50, backoff=0.0, **kwargs)
+
+
+def _check_complete(path, session):
+    df = pd.read_csv(path)
+    assert len(df) == len(session.ts) == 240
+    assert not df["ts"].duplicated().any()
+    assert pd.to_datetime(df["ts"]).is_monotonic_increasing
+
+
+def test_resume_after_kill(tmp_path):
+    with pytest.raises(Killed):
+        _fetch(tmp_path, FakeSession(kill_after=2))
+    assert os.path.exists(tmp_path / "BTC_USDT_1H.csv.ckpt")
+    session = FakeSession()
+    path = _fetch(tmp_path, session)
+    _check_complete(path, session)
+    # 续传只请求剩下的页：240根共5页，被杀前已完成2页
+    assert session.pages == 3
+    assert not os.path.exists(path + ".ckpt") and not os.path.exists(path + ".part")
+
+
+def test_corrupt_checkpoint_restarts(tmp_path):
+    with pytest.raises(Killed):
+        _fetch(tmp_path, FakeSession(kill_after=2))
+    with open(tmp_path / "BTC_USDT_1H.csv.ckpt", "w") as f:
+        f.write('{"symbol": "BTC-')  # 写入时被中断的断点
+    session = FakeSession()
+    _check_complete(_fetch(tmp_path, session), session)
+    assert session.pages == 5
+
+
+def test_missing_part_discards_checkpoint(tmp_path):
+    with pytest.raises(Killed):
+        _fetch(tmp_path, FakeSession(kill_after=2))
+    os.remove(tmp_path / "BTC_USDT_1H.csv.part")
+    session = FakeSession()
+    _check_complete(_fetch(tmp_path, session), session)
+    assert session.pages == 5
+
+
+def test_rate_limit_is_retried(tmp_path):
+    session = FakeSession(rate_limit_every=2)
+    _check_complete(_fetch(tmp_path, session), session)
+    assert session.requests > session.pages
+
+
+def test_rate_limit_gives_up_and_keeps_checkpoint(tmp_path):
+    session = FakeSession(rate_limit_every=1)
+    assert _fetch(tmp_path, session, retries=2) is None
+    assert session.requests == 3
+    assert os.path.exists(tmp_path / "BTC_USDT_1H.csv.ckpt")
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_part.rolling_score import rolling_score
+from strategies.momentum_strategy import MomentumStrategy
+
+pytest.importorskip('sklearn')
+
+
+def _synthetic_prices(n_days=160, seed=0):
+    """几何随机游走的收盘价，部分ETF带上市前的 NaN 前缀，其中一只中途停牌一天"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2020-01-01', periods=n_days)
+    codes = ['A', 'B', 'C', 'D']
+    prices = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, len(codes))), axis=0))
+    prices = pd.DataFrame(prices, index=index, columns=codes)
+    prices.iloc[:30, 1] = np.nan
+    prices.iloc[:75, 2] = np.nan
+    prices.iloc[100, 3] = np.nan
+    return prices
+
+
+@pytest.mark.parametrize('N', [5, 20])
+def test_rolling_score_matches_sklearn_calculate_score(N):
+    prices = _synthetic_prices()
+    strategy = MomentumStrategy(list(prices.columns), list(prices.columns), '20200101', '20201231', N=N)
+    expected = prices.apply(lambda col: col.rolling(N).apply(lambda window: strategy.calculate_score(window, N), raw=False))
+    result = rolling_score(prices, N)
+    assert result.shape == expected.shape
+    np.testing.assert_array_equal(result.isna().to_numpy(), expected.isna().to_numpy())
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-7, atol=1e-6)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_rolling_score_near_constant_windows(seed):
+    """
+    大幅波动之后接近常数的窗口：累加和相减后窗口离差平方和只剩舍入误差，R² 不应超过1。
+    x=1..N 上的最小二乘斜率不超过窗口极差，故 R² ≤ 1 时 |得分| ≤ 10000 * 极差 / 首值。
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    rng = np.random.default_rng(seed)
+    volatile = 100 * np.exp(np.cumsum(rng.normal(0, 0.05, 300)))
+    flat = np.full(30, 100.0)
+    tiny_trend = 100 + 1e-7 * np.arange(60) + rng.normal(0, 1e-12, 60)
+    prices = np.r_[volatile, flat, tiny_trend]
+    N = 20
+    result = rolling_score(pd.Series(prices), N).to_numpy()[N - 1:]
+    windows = sliding_window_view(prices, N)
+    bound = 10000 * (windows.max(axis=1) - windows.min(axis=1)) / windows[:, 0]
+    assert np.isfinite(result).all()
+    # 常数窗口的斜率本身也有 1e-14 量级的舍入误差
+    assert (np.abs(result) <= bound + 1e-9).all()
@@ -0,0 +1,44 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quant_part.report_detail import StreamingMetrics, calc_metrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BIN_WIDTH = (StreamingMetrics._HIGH - StreamingMetrics._LOW) / StreamingMetrics._BINS
+HISTOGRAM_KEYS = ('95% VaR', '99% VaR', '95% CVaR')
+
+
+def _etf_returns():
+    data = pd.read_csv(os.path.join(ROOT, 'etf_data_20120101_today.csv'), index_col=0, parse_dates=True)
+    return [data[code].dropna().pct_change().dropna() for code in data.columns]
+
+
+def _synthetic_returns():
+    # 1分钟K线量级的厚尾收益：分位点附近分箱里有很多收益
+    rng = np.random.default_rng(0)
+    index = pd.date_range('2021-01-01', periods=200_000, freq='min')
+    return [pd.Series(rng.standard_t(3, len(index)) * 0.002, index=index)]
+
+
+def _streamed(returns, chunk):
+    metrics = StreamingMetrics()
+    for start in range(0, len(returns), chunk):
+        metrics.update(returns.iloc[start:start + chunk])
+    return metrics.result()
+
+
+@pytest.mark.parametrize('returns', _etf_returns() + _synthetic_returns())
+@pytest.mark.parametrize('chunk', [997, 100_000])
+def test_streaming_matches_calc_metrics(returns, chunk):
+    expected = calc_metrics(returns)
+    result = _streamed(returns, chunk)
+    assert set(result) == set(expected)
+    for key, value in expected.items():
+        # VaR/CVaR 由直方图得到，文档承诺误差不超过一个分箱宽度
+        if key in HISTOGRAM_KEYS:
+            assert abs(result[key] - value) <= BIN_WIDTH, key
+        else:
+            np.testing.assert_allclose(result[key], value, rtol=1e-8, atol=1e-12, err_msg=key)
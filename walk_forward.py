@@ -0,0 +1,131 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import param_sweep
+from quant_part.report_detail import batch_metrics, calc_metrics
+
+
+def walk_forward_windows(n_days, train, test, anchored=False):
+    """
+    划分 walk-forward 的训练/测试区间（按交易日位置，左闭右开）。
+
+    参数：
+    - n_days: 总交易日数
+    - train / test: 训练窗口与测试窗口的交易日数
+    - anchored: True 时训练窗口起点固定为第0天（逐步扩大），否则为长度 train 的滚动窗口
+
+    返回：
+    - list[(train_start, train_end, test_start, test_end)]，测试区间首尾相接、覆盖 [train, n_days)
+    """
+    if train <= 0 or test <= 0:
+        raise ValueError("train 与 test 必须为正整数")
+    folds = []
+    test_start = train
+    while test_start < n_days:
+        test_end = min(test_start + test, n_days)
+        train_start = 0 if anchored else test_start - train
+        folds.append((train_start, test_start, test_start, test_end))
+        test_start = test_end
+    return folds
+
+
+def _score_fold(returns, fold, metric):
+    """在训练区间上批量计算所有参数组的指标，返回 (最优参数组序号, 全部参数组的指标值)"""
+    train_start, train_end, _, _ = fold
+    scores = batch_metrics(returns.iloc[train_start:train_end])[metric].to_numpy()
+    return int(np.nanargmax(scores)), scores
+
+
+def walk_forward(strategy, grid, prices, train=756, test=252, anchored=False, metric='夏普比率',
+                 workers=None, chunksize=None):
+    """
+    walk-forward 优化：在每个训练窗口上选出 metric 最大的参数组，用于随后的测试窗口，
+    再把各测试窗口的样本外收益拼接为一条净值曲线。
+
+    每组参数只在整个区间上回测一次（param_sweep.sweep_returns，多进程并行），各折的
+    训练/测试区间直接对这份收益率切片，重叠窗口不会从头重算指标与回测；各折的样本内
+    评估在线程池中并行。测试窗口使用的是该组参数连续运行下的收益，即指标与持仓状态
+    都带有窗口之前的历史，与实盘中切换参数时的情形一致。
+
+    参数：
+    - strategy / grid / prices / workers / chunksize: 同 param_sweep.run_sweep
+    - train / test: 训练与测试窗口的交易日数（从所有参数组都有收益的第一天起算）
+    - anchored: True 为锚定（扩张）窗口，False 为滚动窗口
+    - metric: batch_metrics 的指标列名，取最大值
+
+    返回：
+    - (folds, oos_returns)：folds 为每折的区间、选中参数及样本内/样本外指标的 pd.DataFrame；
+      oos_returns 为拼接后的样本外日收益率 pd.Series
+    """
+    combos, returns = param_sweep.sweep_returns(strategy, grid, prices, workers=workers, chunksize=chunksize)
+    if not combos:
+        raise ValueError("参数网格为空")
+    returns = returns[returns.notna().all(axis=1)]
+    windows = walk_forward_windows(len(returns), train, test, anchored)
+    if not windows:
+        raise ValueError(f"数据不足：共 {len(returns)} 个交易日，训练窗口需要 {train} 天")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        scored = list(executor.map(lambda fold: _score_fold(returns, fold, metric), windows))
+
+    rows, pieces = [], []
+    dates = returns.index
+    for i, (fold, (best, scores)) in enumerate(zip(windows, scored)):
+        train_start, train_end, test_start, test_end = fold
+        oos = returns.iloc[test_start:test_end, best]
+        pieces.append(oos)
+        row = {
+            '折': i + 1,
+            '训练开始': dates[train_start], '训练结束': dates[train_end - 1],
+            '测试开始': dates[test_start], '测试结束': dates[test_end - 1],
+        }
+        row.update(combos[best])
+        row[f'样本内{metric}'] = scores[best]
+        oos_metrics = calc_metrics(oos)
+        row[f'样本外{metric}'] = oos_metrics[metric]
+        row['样本外总收益率'] = oos_metrics['总收益率']
+        rows.append(row)
+    oos_returns = pd.concat(pieces).rename('样本外日收益率')
+    return pd.DataFrame(rows), oos_returns
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="MACD / 动量策略 walk-forward 优化")
+    param_sweep.add_grid_args(parser)
+    parser.add_argument('--train', type=int, default=756, help="训练窗口交易日数")
+    parser.add_argument('--test', type=int, default=252, help="测试窗口交易日数")
+    parser.add_argument('--anchored', action='store_true', help="锚定（扩张）训练窗口，默认滚动窗口")
+    parser.add_argument('--metric', default='夏普比率', help="训练窗口上最大化的指标")
+    parser.add_argument('--out', default=None, help="每折结果CSV路径，样本外收益另存为 <名称>_oos.csv")
+    parser.set_defaults(start='20120101')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    pool_list = args.pool.split(',')
+    prices = param_sweep.load_prices(pool_list, pool_list, args.start, args.end, args.refresh)
+    folds, oos_returns = walk_forward(args.strategy, param_sweep.grid_from_args(args), prices,
+                                      train=args.train, test=args.test, anchored=args.anchored,
+                                      metric=args.metric, workers=args.workers)
+    print(folds.to_string(index=False))
+
+    benchmark = None
+    if param_sweep.BENCHMARK in prices.columns:
+        benchmark = prices[param_sweep.BENCHMARK].pct_change().reindex(oos_returns.index).fillna(0)
+    metrics = calc_metrics(oos_returns, benchmark_returns=benchmark)
+    print(f"\n样本外拼接区间: {oos_returns.index[0]} 到 {oos_returns.index[-1]}")
+    for label in ('总收益率', '年化收益率', '年化波动率', '夏普比率', '最大回撤'):
+        print(f"样本外{label}: {metrics[label]:.4f}")
+    if benchmark is not None:
+        print(f"基准年化收益率: {metrics['基准年化收益率']:.4f}，信息比率: {metrics['信息比率']:.4f}")
+    if args.out:
+        folds.to_csv(args.out, index=False)
+        oos_returns.to_csv(args.out.rsplit('.', 1)[0] + '_oos.csv')
+
+
+if __name__ == "__main__":
+    main()